@@ -1,10 +1,13 @@
-from typing import Optional
+from collections import OrderedDict
+from typing import Any, Dict, Optional
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
 from pydantic import ValidationError
 import secrets
+import time
 
 from app.core.database import get_db
 from app.core.security import verify_token
@@ -12,6 +15,7 @@ from app.core.config import settings
 from app.models.user import User
 from app.models.audit_log import AuditLog
 from app.schemas.user import TokenData
+from app.services.audit_logger import audit_buffer
 
 
 # OAuth2 scheme with scopes as per FastAPI best practices
@@ -25,6 +29,53 @@ oauth2_scheme = OAuth2PasswordBearer(
     }
 )
 
+# Column values of recently authenticated active users by email, so requests
+# with a valid token skip the users SELECT. Entries expire after
+# USER_CACHE_TTL_SECONDS (bounds staleness across worker processes) and are
+# dropped locally by invalidate_user_cache() when a user is changed.
+USER_CACHE_MAX_SIZE = 5000
+USER_CACHE_TTL_SECONDS = 30
+_user_cache: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+def invalidate_user_cache(email: Optional[str] = None) -> None:
+    """Forget one cached user (or all when no email is given)"""
+    if email is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(email, None)
+
+
+def _cached_user(db: AsyncSession, email: str) -> Optional[User]:
+    """Attach a cached user to the session without a query, or None on miss"""
+    cached = _user_cache.get(email)
+    if cached is None:
+        return None
+    expires_at, values = cached
+    if expires_at <= time.monotonic():
+        del _user_cache[email]
+        return None
+    _user_cache.move_to_end(email)
+
+    # Reuse the instance if this session already holds it (e.g. a second
+    # get_current_user dependency in the same request)
+    user = db.identity_map.get(db.identity_key(User, values["id"]))
+    if user is None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        db.add(user)
+    return user
+
+
+def _cache_user(user: User) -> None:
+    _user_cache[user.email] = (
+        time.monotonic() + USER_CACHE_TTL_SECONDS,
+        {key: getattr(user, key) for key in User.__table__.columns.keys()}
+    )
+    _user_cache.move_to_end(user.email)
+    while len(_user_cache) > USER_CACHE_MAX_SIZE:
+        _user_cache.popitem(last=False)
+
 
 async def get_current_user(
     security_scopes: SecurityScopes,
@@ -58,27 +109,30 @@ async def get_current_user(
             raise credentials_exception
             
         token_scopes = payload.get("scopes", [])
-        token_data = TokenData(username=username, scopes=token_scopes)
+        # No validation needed: the payload was produced and signed by us
+        token_data = TokenData.model_construct(username=username, scopes=token_scopes)
         
     except (ValidationError, ValueError):
         raise credentials_exception
 
-    # Get user from database
-    stmt = select(User).where(User.email == token_data.username, User.is_active == True)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-    
+    # Get user from the cache or database
+    user = _cached_user(db, token_data.username)
     if user is None:
-        raise credentials_exception
+        stmt = select(User).where(User.email == token_data.username, User.is_active == True)
+        result = await db.execute(stmt)
+        user = result.scalar_one_or_none()
+        
+        if user is None:
+            raise credentials_exception
+        _cache_user(user)
 
     # Verify that all required scopes are present in the token
-    for scope in security_scopes.scopes:
-        if scope not in token_data.scopes:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions",
-                headers={"WWW-Authenticate": authenticate_value},
-            )
+    if security_scopes.scopes and not set(security_scopes.scopes).issubset(token_data.scopes):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+            headers={"WWW-Authenticate": authenticate_value},
+        )
 
     return user
 
@@ -104,8 +158,18 @@ async def get_current_admin_user(
     return current_user
 
 
+# Password grants (ProjectAccess rows) seen recently, by (user_id, project_id).
+# The app only adds grants, and the project itself is still loaded (and checked
+# for deletion) on every call; the TTL bounds how long a grant removed directly
+# in the database keeps being honored.
+ACCESS_CACHE_MAX_SIZE = 10000
+ACCESS_CACHE_TTL_SECONDS = 10
+_access_cache: "OrderedDict[tuple[int, int], float]" = OrderedDict()
+
+
 async def verify_project_access(
     project_id: int,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ) -> bool:
@@ -115,6 +179,7 @@ async def verify_project_access(
     - Project owner: Can view their own projects (bypass password)
     - Other engineers: Need to verify password if project is protected
     Implements collaborative access with optional password protection
+    The loaded project is kept on request.state.project for the handler
     """
     from app.models.project import Project
     from app.models.project_access import ProjectAccess
@@ -133,6 +198,7 @@ async def verify_project_access(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
+    request.state.project = project
 
     # Admins can access all projects (oversight)
     if current_user.role == UserRole.ADMIN:
@@ -146,17 +212,24 @@ async def verify_project_access(
     if not project.password_hash:
         return True
 
-    # Check if user has verified password before
-    access_stmt = select(ProjectAccess).where(
-        and_(
-            ProjectAccess.user_id == current_user.id,
-            ProjectAccess.project_id == project_id
-        )
+    # Check if user has verified password before (recent grants are cached)
+    access_key = (current_user.id, project_id)
+    expires_at = _access_cache.get(access_key)
+    if expires_at is not None and expires_at > time.monotonic():
+        return True
+
+    access_stmt = select(ProjectAccess.id).where(
+        ProjectAccess.user_id == current_user.id,
+        ProjectAccess.project_id == project_id
     )
     access_result = await db.execute(access_stmt)
     project_access = access_result.scalar_one_or_none()
 
     if project_access:
+        _access_cache[access_key] = time.monotonic() + ACCESS_CACHE_TTL_SECONDS
+        _access_cache.move_to_end(access_key)
+        while len(_access_cache) > ACCESS_CACHE_MAX_SIZE:
+            _access_cache.popitem(last=False)
         return True
 
     # Password required but not verified
@@ -171,6 +244,7 @@ async def verify_project_access(
 
 async def verify_project_write_access(
     project_id: int,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ) -> bool:
@@ -179,6 +253,7 @@ async def verify_project_write_access(
     - Admins: Read-only access (cannot modify)
     - Engineers: Can modify all projects
     Implements admin oversight with read-only constraints
+    The loaded project is kept on request.state.project for the handler
     """
     from app.models.project import Project
     from app.models.user import UserRole
@@ -196,6 +271,7 @@ async def verify_project_write_access(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
+    request.state.project = project
 
     # Admins have read-only access
     if current_user.role == UserRole.ADMIN:
@@ -225,8 +301,7 @@ async def log_audit_event(
     user_agent = request.headers.get("user-agent")
     request_id = request.headers.get("x-request-id")
     
-    # Create audit log entry
-    audit_log = AuditLog.create_log(
+    values = AuditLog.build_values(
         user_id=current_user.id,
         action=action,
         entity_type=entity_type,
@@ -236,8 +311,14 @@ async def log_audit_event(
         request_id=request_id,
         details=details
     )
-    
-    db.add(audit_log)
+
+    # Batched write via the background flusher when it is running
+    if audit_buffer.running:
+        await audit_buffer.add(values)
+        return
+
+    # Fallback: insert audit log entry directly (no ORM instance needed)
+    await AuditLog.log_bulk(db, [values])
     await db.commit()
 
 
@@ -2,8 +2,9 @@ import logging
 from typing import List, Any, Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Security, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, tuple_
 from sqlalchemy.orm import selectinload
 
 from app.api.deps import (
@@ -22,6 +23,38 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _paginate(
+    stmt,
+    offset: int,
+    limit: int,
+    before_timestamp: Optional[datetime],
+    before_id: Optional[int]
+):
+    """
+    Apply newest-first ordering and pagination to an audit log query
+    Entries are ordered by (timestamp, id), and the keyset cursor uses the same key:
+    before_timestamp/before_id are the timestamp and ID of the last entry of the
+    previous page. IDs alone do not follow timestamp order (buffered entries are
+    stamped when logged but get their ID at flush), so an ID cursor would skip or
+    repeat entries. The cursor replaces offset; combining the two is rejected.
+    """
+    if (before_timestamp is None) != (before_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="before_timestamp and before_id must be given together"
+        )
+    if before_id is not None:
+        if offset:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="offset cannot be combined with the before_timestamp/before_id cursor"
+            )
+        stmt = stmt.where(
+            tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(before_timestamp, before_id)
+        )
+    return stmt.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).offset(offset).limit(limit)
+
+
 @router.get("/", response_model=List[dict])
 async def get_all_audit_logs(
     current_user: User = Depends(get_current_admin_user),
@@ -33,11 +66,15 @@ async def get_all_audit_logs(
     start_date: Optional[datetime] = Query(None, description="Filter entries after this date"),
     end_date: Optional[datetime] = Query(None, description="Filter entries before this date"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of entries"),
-    offset: int = Query(0, ge=0, description="Number of entries to skip")
+    offset: int = Query(0, ge=0, description="Number of entries to skip (not with the cursor)"),
+    before_timestamp: Optional[datetime] = Query(None, description="Keyset cursor: timestamp of the last entry of the previous page"),
+    before_id: Optional[int] = Query(None, description="Keyset cursor: ID of the last entry of the previous page")
 ) -> Any:
     """
     Get all audit logs - Admin only
     Supports filtering by user, action, entity type/id, and date range
+    For deep pages pass before_timestamp and before_id (the last entry of the
+    previous page) instead of offset
     """
     # Build query with filters
     stmt = select(AuditLog).options(selectinload(AuditLog.user))
@@ -59,12 +96,14 @@ async def get_all_audit_logs(
     if filters:
         stmt = stmt.where(and_(*filters))
 
-    stmt = stmt.order_by(AuditLog.timestamp.desc()).offset(offset).limit(limit)
+    stmt = _paginate(stmt, offset, limit, before_timestamp, before_id)
     result = await db.execute(stmt)
     logs = result.scalars().all()
 
     # Format response with user details
-    return [
+    # Rows are built here from trusted ORM data, so serialize them directly
+    # with orjson instead of re-validating through response_model
+    return ORJSONResponse(content=[
         {
             "id": log.id,
             "user_id": log.user_id,
@@ -84,7 +123,7 @@ async def get_all_audit_logs(
             "session_id": log.session_id
         }
         for log in logs
-    ]
+    ])
 
 
 @router.get("/projects/{project_id}", response_model=List[dict])
@@ -97,7 +136,9 @@ async def get_project_audit_logs(
     start_date: Optional[datetime] = Query(None, description="Filter entries after this date"),
     end_date: Optional[datetime] = Query(None, description="Filter entries before this date"),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of entries"),
-    offset: int = Query(0, ge=0, description="Number of entries to skip")
+    offset: int = Query(0, ge=0, description="Number of entries to skip (not with the cursor)"),
+    before_timestamp: Optional[datetime] = Query(None, description="Keyset cursor: timestamp of the last entry of the previous page"),
+    before_id: Optional[int] = Query(None, description="Keyset cursor: ID of the last entry of the previous page")
 ) -> Any:
     """
     Get audit logs for a specific project
@@ -180,12 +221,14 @@ async def get_project_audit_logs(
     if additional_filters:
         stmt = stmt.where(and_(*additional_filters))
 
-    stmt = stmt.order_by(AuditLog.timestamp.desc()).offset(offset).limit(limit)
+    stmt = _paginate(stmt, offset, limit, before_timestamp, before_id)
     result = await db.execute(stmt)
     logs = result.scalars().all()
 
     # Format response with user details
-    return [
+    # Rows are built here from trusted ORM data, so serialize them directly
+    # with orjson instead of re-validating through response_model
+    return ORJSONResponse(content=[
         {
             "id": log.id,
             "user_id": log.user_id,
@@ -205,4 +248,4 @@ async def get_project_audit_logs(
             "session_id": log.session_id
         }
         for log in logs
-    ]
+    ])
@@ -9,7 +9,7 @@ from sqlalchemy.sql import func
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from app.api.deps import get_current_user, log_audit_event
+from app.api.deps import get_current_user, invalidate_user_cache, log_audit_event
 from app.core.database import get_db
 from app.core.security import (
     create_access_token,
@@ -52,7 +52,7 @@ async def login_for_access_token(
     user = result.scalar_one_or_none()
     
     # Verify user exists and password is correct
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password(form_data.password, user.hashed_password):
         # Log failed login attempt
         if user:
             await log_audit_event(
@@ -226,7 +226,7 @@ async def change_password(
     """Change user password"""
     
     # Verify current password
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await verify_password(password_data.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
@@ -242,6 +242,7 @@ async def change_password(
     )
     await db.execute(stmt)
     await db.commit()
+    invalidate_user_cache(current_user.email)
     
     # Log password change
     await log_audit_event(
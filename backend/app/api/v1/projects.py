@@ -2,10 +2,14 @@ import logging
 from app.core.config import settings
 from typing import List, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Security, Request, UploadFile, File
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import bindparam, select, func, and_
+from sqlalchemy.orm import selectinload, raiseload
 from app.schemas.document import Document as DocumentSchema
+from app.schemas.requirement import Requirement as RequirementSchema
+from app.schemas.matrix import MatrixEntry as MatrixEntrySchema
 
 from app.api.deps import (
     get_current_user,
@@ -33,6 +37,48 @@ router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+# List serializers built once at import (reused across requests)
+_DOCUMENT_LIST_ADAPTER = TypeAdapter(List[DocumentSchema])
+_REQUIREMENT_LIST_ADAPTER = TypeAdapter(List[RequirementSchema])
+_MATRIX_LIST_ADAPTER = TypeAdapter(List[MatrixEntrySchema])
+
+# Project statistics: one single-row aggregate CTE per table, selected together
+# in one statement (built once; executed with a bound project_id)
+_DOCUMENT_STATS = select(
+    func.count(Document.id).label('total'),
+    func.count(Document.id).filter(Document.extraction_status == 'completed').label('extracted'),
+    func.count(Document.id).filter(Document.extraction_status == 'pending').label('pending'),
+    func.count(Document.id).filter(Document.extraction_status == 'failed').label('failed')
+).where(
+    Document.project_id == bindparam("project_id"),
+    Document.deleted_at.is_(None)
+).cte("document_stats")
+
+_REQUIREMENT_STATS = select(
+    func.count(Requirement.id).label('total'),
+    func.count(Requirement.id).filter(Requirement.status == 'completed').label('completed'),
+    func.count(Requirement.id).filter(Requirement.status == 'in_progress').label('in_progress'),
+    func.count(Requirement.id).filter(Requirement.status == 'pending').label('pending')
+).where(
+    Requirement.project_id == bindparam("project_id"),
+    Requirement.deleted_at.is_(None)
+).cte("requirement_stats")
+
+_MATRIX_STATS = select(
+    func.count(MatrixEntry.id).label('total'),
+    func.count(MatrixEntry.id).filter(MatrixEntry.review_status == 'approved').label('approved'),
+    func.count(MatrixEntry.id).filter(MatrixEntry.review_status == 'reviewed').label('reviewed'),
+    func.count(MatrixEntry.id).filter(MatrixEntry.review_status == 'pending').label('pending'),
+    func.count(MatrixEntry.id).filter(MatrixEntry.compliance_status == 'Compliant').label('compliant'),
+    func.count(MatrixEntry.id).filter(MatrixEntry.compliance_status == 'Non-compliant').label('non_compliant')
+).join(Requirement).where(
+    Requirement.project_id == bindparam("project_id"),
+    Requirement.deleted_at.is_(None),
+    MatrixEntry.deleted_at.is_(None)
+).cte("matrix_stats")
+
+_PROJECT_STATISTICS_STMT = select(_DOCUMENT_STATS, _REQUIREMENT_STATS, _MATRIX_STATS)
+
 @router.get("/", response_model=List[ProjectSummary])
 async def list_projects(
     request: Request,
@@ -62,39 +108,50 @@ async def list_projects(
     result = await db.execute(stmt)
     projects = result.scalars().all()
     
-    # Get summary statistics for each project
-    project_summaries = []
-    for project in projects:
-        # Count documents
-        doc_stmt = select(func.count(Document.id)).where(
-            and_(
-                Document.project_id == project.id,
-                Document.deleted_at.is_(None)
-            )
-        )
-        doc_result = await db.execute(doc_stmt)
-        documents_count = doc_result.scalar() or 0
-        
-        # Count requirements
-        req_stmt = select(func.count(Requirement.id)).where(
-            and_(
-                Requirement.project_id == project.id,
-                Requirement.deleted_at.is_(None)
-            )
-        )
-        req_result = await db.execute(req_stmt)
-        requirements_count = req_result.scalar() or 0
-        
-        # Count matrix entries
-        matrix_stmt = select(func.count(MatrixEntry.id)).join(Requirement).where(
-            and_(
-                Requirement.project_id == project.id,
+    # Get summary statistics for all listed projects in one grouped query
+    counts = {}
+    if projects:
+        project_ids = [project.id for project in projects]
+        doc_counts = (
+            select(Document.project_id, func.count(Document.id).label("n"))
+            .where(Document.project_id.in_(project_ids), Document.deleted_at.is_(None))
+            .group_by(Document.project_id)
+            .subquery()
+        )
+        req_counts = (
+            select(Requirement.project_id, func.count(Requirement.id).label("n"))
+            .where(Requirement.project_id.in_(project_ids), Requirement.deleted_at.is_(None))
+            .group_by(Requirement.project_id)
+            .subquery()
+        )
+        matrix_counts = (
+            select(Requirement.project_id, func.count(MatrixEntry.id).label("n"))
+            .join(MatrixEntry, MatrixEntry.requirement_id == Requirement.id)
+            .where(
+                Requirement.project_id.in_(project_ids),
                 Requirement.deleted_at.is_(None),
                 MatrixEntry.deleted_at.is_(None)
             )
+            .group_by(Requirement.project_id)
+            .subquery()
+        )
+        counts_stmt = (
+            select(
+                Project.id,
+                func.coalesce(doc_counts.c.n, 0),
+                func.coalesce(req_counts.c.n, 0),
+                func.coalesce(matrix_counts.c.n, 0)
+            )
+            .outerjoin(doc_counts, doc_counts.c.project_id == Project.id)
+            .outerjoin(req_counts, req_counts.c.project_id == Project.id)
+            .outerjoin(matrix_counts, matrix_counts.c.project_id == Project.id)
+            .where(Project.id.in_(project_ids))
         )
-        matrix_result = await db.execute(matrix_stmt)
-        matrix_entries_count = matrix_result.scalar() or 0
+        counts = {row[0]: row[1:] for row in (await db.execute(counts_stmt)).all()}
+
+    project_summaries = []
+    for project in projects:
+        documents_count, requirements_count, matrix_entries_count = counts.get(project.id, (0, 0, 0))
         
         # Calculate completion percentage
         completion_percentage = 0.0
@@ -145,7 +202,6 @@ async def create_project(
 
     db.add(project)
     await db.commit()
-    await db.refresh(project)
 
     # Log audit event
     await log_audit_event(
@@ -200,7 +256,7 @@ async def verify_project_password(
         )
 
     # Verify password
-    if not verify_password(password_data.password, project.password_hash):
+    if not await verify_password(password_data.password, project.password_hash):
         # Log failed attempt
         await log_audit_event(
             request=request,
@@ -289,20 +345,8 @@ async def update_project(
 ) -> Any:
     """Update project - Engineers only, admins have read-only access"""
     
-    stmt = select(Project).where(
-        and_(
-            Project.id == project_id,
-            Project.deleted_at.is_(None)
-        )
-    )
-    result = await db.execute(stmt)
-    project = result.scalar_one_or_none()
-    
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    # Loaded (and checked for existence) by verify_project_write_access
+    project = request.state.project
     
     # Track changes for audit
     changes = {}
@@ -322,23 +366,17 @@ async def update_project(
         return project  # No changes made
     
     await db.commit()
-    await db.refresh(project)
     
-    # Log audit event for each changed field
-    for field, change in changes.items():
-        await log_audit_event(
-            request=request,
-            current_user=current_user,
-            action="PROJECT_UPDATED",
-            entity_type="project",
-            entity_id=project.id,
-            details={
-                "field": field,
-                "old_value": change["old"],
-                "new_value": change["new"]
-            },
-            db=db
-        )
+    # Log one audit event covering all changed fields
+    await log_audit_event(
+        request=request,
+        current_user=current_user,
+        action="PROJECT_UPDATED",
+        entity_type="project",
+        entity_id=project.id,
+        details={"changes": changes},
+        db=db
+    )
     
     return project
 
@@ -353,20 +391,8 @@ async def delete_project(
 ) -> Any:
     """Soft delete project (GxP compliance - data retention) - Engineers only"""
     
-    stmt = select(Project).where(
-        and_(
-            Project.id == project_id,
-            Project.deleted_at.is_(None)
-        )
-    )
-    result = await db.execute(stmt)
-    project = result.scalar_one_or_none()
-    
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    # Loaded (and checked for existence) by verify_project_write_access
+    project = request.state.project
     
     # Soft delete (set deleted_at timestamp)
     project.deleted_at = func.now()
@@ -390,102 +416,49 @@ async def delete_project(
 @router.get("/{project_id}/statistics")
 async def get_project_statistics(
     project_id: int,
+    request: Request,
     current_user: User = Security(get_current_user, scopes=["engineer"]),
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_project_access)  # Verify access
 ) -> Any:
     """Get detailed project statistics"""
     
-    # Verify project exists
-    stmt = select(Project).where(
-        and_(
-            Project.id == project_id,
-            Project.deleted_at.is_(None)
-        )
-    )
-    result = await db.execute(stmt)
-    project = result.scalar_one_or_none()
-    
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    # Loaded (and checked for existence) by verify_project_access
+    project = request.state.project
     
-    # Get document statistics
-    doc_stmt = select(
-        func.count(Document.id).label('total'),
-        func.count(Document.id).filter(Document.extraction_status == 'completed').label('extracted'),
-        func.count(Document.id).filter(Document.extraction_status == 'pending').label('pending'),
-        func.count(Document.id).filter(Document.extraction_status == 'failed').label('failed')
-    ).where(
-        and_(
-            Document.project_id == project_id,
-            Document.deleted_at.is_(None)
-        )
-    )
-    doc_result = await db.execute(doc_stmt)
-    doc_stats = doc_result.first()
-    
-    # Get requirement statistics
-    req_stmt = select(
-        func.count(Requirement.id).label('total'),
-        func.count(Requirement.id).filter(Requirement.status == 'completed').label('completed'),
-        func.count(Requirement.id).filter(Requirement.status == 'in_progress').label('in_progress'),
-        func.count(Requirement.id).filter(Requirement.status == 'pending').label('pending')
-    ).where(
-        and_(
-            Requirement.project_id == project_id,
-            Requirement.deleted_at.is_(None)
-        )
-    )
-    req_result = await db.execute(req_stmt)
-    req_stats = req_result.first()
-    
-    # Get matrix entry statistics
-    matrix_stmt = select(
-        func.count(MatrixEntry.id).label('total'),
-        func.count(MatrixEntry.id).filter(MatrixEntry.review_status == 'approved').label('approved'),
-        func.count(MatrixEntry.id).filter(MatrixEntry.review_status == 'reviewed').label('reviewed'),
-        func.count(MatrixEntry.id).filter(MatrixEntry.review_status == 'pending').label('pending'),
-        func.count(MatrixEntry.id).filter(MatrixEntry.compliance_status == 'Compliant').label('compliant'),
-        func.count(MatrixEntry.id).filter(MatrixEntry.compliance_status == 'Non-compliant').label('non_compliant')
-    ).join(Requirement).where(
-        and_(
-            Requirement.project_id == project_id,
-            Requirement.deleted_at.is_(None),
-            MatrixEntry.deleted_at.is_(None)
-        )
+    # All three aggregates in one round trip
+    stats = (await db.execute(_PROJECT_STATISTICS_STMT, {"project_id": project_id})).one()._mapping
+    doc_stats, req_stats, matrix_stats = (
+        {column.name: stats[column] for column in cte.c}
+        for cte in (_DOCUMENT_STATS, _REQUIREMENT_STATS, _MATRIX_STATS)
     )
-    matrix_result = await db.execute(matrix_stmt)
-    matrix_stats = matrix_result.first()
     
     return {
         "project_id": project_id,
         "project_name": project.name,
         "documents": {
-            "total": doc_stats.total or 0,
-            "extracted": doc_stats.extracted or 0,
-            "pending": doc_stats.pending or 0,
-            "failed": doc_stats.failed or 0,
-            "extraction_rate": (doc_stats.extracted or 0) / max(doc_stats.total or 1, 1) * 100
+            "total": doc_stats["total"] or 0,
+            "extracted": doc_stats["extracted"] or 0,
+            "pending": doc_stats["pending"] or 0,
+            "failed": doc_stats["failed"] or 0,
+            "extraction_rate": (doc_stats["extracted"] or 0) / max(doc_stats["total"] or 1, 1) * 100
         },
         "requirements": {
-            "total": req_stats.total or 0,
-            "completed": req_stats.completed or 0,
-            "in_progress": req_stats.in_progress or 0,
-            "pending": req_stats.pending or 0,
-            "completion_rate": (req_stats.completed or 0) / max(req_stats.total or 1, 1) * 100
+            "total": req_stats["total"] or 0,
+            "completed": req_stats["completed"] or 0,
+            "in_progress": req_stats["in_progress"] or 0,
+            "pending": req_stats["pending"] or 0,
+            "completion_rate": (req_stats["completed"] or 0) / max(req_stats["total"] or 1, 1) * 100
         },
         "matrix_entries": {
-            "total": matrix_stats.total or 0,
-            "approved": matrix_stats.approved or 0,
-            "reviewed": matrix_stats.reviewed or 0,
-            "pending": matrix_stats.pending or 0,
-            "compliant": matrix_stats.compliant or 0,
-            "non_compliant": matrix_stats.non_compliant or 0,
-            "approval_rate": (matrix_stats.approved or 0) / max(matrix_stats.total or 1, 1) * 100,
-            "compliance_rate": (matrix_stats.compliant or 0) / max(matrix_stats.total or 1, 1) * 100
+            "total": matrix_stats["total"] or 0,
+            "approved": matrix_stats["approved"] or 0,
+            "reviewed": matrix_stats["reviewed"] or 0,
+            "pending": matrix_stats["pending"] or 0,
+            "compliant": matrix_stats["compliant"] or 0,
+            "non_compliant": matrix_stats["non_compliant"] or 0,
+            "approval_rate": (matrix_stats["approved"] or 0) / max(matrix_stats["total"] or 1, 1) * 100,
+            "compliance_rate": (matrix_stats["compliant"] or 0) / max(matrix_stats["total"] or 1, 1) * 100
         }
     }
 @router.get("/{project_id}/documents", response_model=List[DocumentSchema])
@@ -497,7 +470,8 @@ async def list_documents(
 ) -> Any:
     """Get all documents for a project"""
 
-    stmt = select(Document).where(
+    # raiseload guards against N+1 lazy loads during serialization
+    stmt = select(Document).options(raiseload("*")).where(
         and_(
             Document.project_id == project_id,
             Document.deleted_at.is_(None)
@@ -507,7 +481,10 @@ async def list_documents(
     result = await db.execute(stmt)
     documents = result.scalars().all()
 
-    return documents
+    return ORJSONResponse(content=_DOCUMENT_LIST_ADAPTER.dump_python(
+        _DOCUMENT_LIST_ADAPTER.validate_python(documents, from_attributes=True),
+        mode="json"
+    ))
 
 
 @router.post("/{project_id}/documents", response_model=DocumentSchema)
@@ -523,30 +500,20 @@ async def upload_document(
     from app.services.document_processor import DocumentProcessor
     from app.models.document import Document
 
-    # Validate file
+    # Validate and save file (streamed to disk, never held in memory whole)
     processor = DocumentProcessor()
-    content = await file.read()
-
-    validation = await processor.validate_file(
-        filename=file.filename,
-        content=content,
+    save_result = await processor.save_upload(
+        upload=file,
+        project_id=project_id,
         max_size=settings.MAX_UPLOAD_SIZE
     )
 
-    if not validation["valid"]:
+    if not save_result["valid"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=validation["error"]
+            detail=save_result["error"]
         )
 
-    # Save file
-    save_result = await processor.save_file(
-        content=content,
-        original_filename=file.filename,
-        project_id=project_id,
-        validation_result=validation
-    )
-
     if not save_result["success"]:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -682,10 +649,8 @@ async def list_requirements(
     _: bool = Depends(verify_project_access)
 ) -> Any:
     """Get all requirements for a project"""
-    from app.models.requirement import Requirement
-    from app.schemas.requirement import Requirement as RequirementSchema
-
-    stmt = select(Requirement).where(
+    # raiseload guards against N+1 lazy loads during serialization
+    stmt = select(Requirement).options(raiseload("*")).where(
         and_(
             Requirement.project_id == project_id,
             Requirement.deleted_at.is_(None)
@@ -695,8 +660,11 @@ async def list_requirements(
     result = await db.execute(stmt)
     requirements = result.scalars().all()
 
-    # Convert to Pydantic schemas for serialization
-    return [RequirementSchema.model_validate(req) for req in requirements]
+    # Convert to Pydantic schemas and serialize with the cached adapter
+    return ORJSONResponse(content=_REQUIREMENT_LIST_ADAPTER.dump_python(
+        [RequirementSchema.from_orm_fast(req) for req in requirements],
+        mode="json"
+    ))
 
 
 @router.post("/{project_id}/requirements")
@@ -781,7 +749,7 @@ async def analyze_document(
         AnalyzeDocumentRequest,
         MatrixEntry as MatrixEntrySchema
     )
-    from app.services.ai_service import AIService
+    from app.services.ai_service import get_ai_service
 
     # Get request body
     request_body = await request.json()
@@ -827,11 +795,30 @@ async def analyze_document(
             detail="One or more requirements not found"
         )
 
-    # Initialize AI service
-    ai_service = AIService()
+    # Shared AI service (pooled connections)
+    ai_service = get_ai_service()
 
-    # Generate matrix entries for each requirement
-    created_entries = []
+    # Wrap document in expected format for AI service (same for every requirement)
+    formatted_specs = {
+        "documents": [
+            {
+                "filename": document.original_filename,
+                "document_info": document.extracted_json.get("document_info", {}),
+                "sections": document.extracted_json.get("sections", []),
+                "extraction_metadata": document.extracted_json.get("extraction_metadata", {})
+            }
+        ],
+        "document_sources": [
+            {
+                "document_id": document.id,
+                "filename": document.original_filename,
+                "extraction_model": document.extraction_model
+            }
+        ]
+    }
+
+    # Determine which requirements need a (re)generated entry
+    to_generate = []
 
     for requirement in requirements:
         try:
@@ -871,33 +858,32 @@ async def analyze_document(
                     logger.info(f"Matrix entry already exists for requirement {requirement.id} and document {document.id}, skipping")
                     continue
 
-            # Generate matrix entry using AI
-            logger.info(f"Generating matrix entry for requirement {requirement.id}: {requirement.requirement_id}")
-
-            # Wrap document in expected format for AI service
-            formatted_specs = {
-                "documents": [
-                    {
-                        "filename": document.original_filename,
-                        "document_info": document.extracted_json.get("document_info", {}),
-                        "sections": document.extracted_json.get("sections", []),
-                        "extraction_metadata": document.extracted_json.get("extraction_metadata", {})
-                    }
-                ],
-                "document_sources": [
-                    {
-                        "document_id": document.id,
-                        "filename": document.original_filename,
-                        "extraction_model": document.extraction_model
-                    }
-                ]
-            }
+            to_generate.append(requirement)
 
-            matrix_data = await ai_service.generate_matrix_entry(
-                requirement=requirement.description,
-                requirement_category=requirement.category or "General",
-                extracted_specs=formatted_specs
-            )
+        except Exception as e:
+            logger.error(f"Failed to prepare matrix entry for requirement {requirement.id}: {e}")
+            # Continue with other requirements
+            continue
+
+    # Generate matrix entries using AI (concurrently, bounded per provider)
+    logger.info(f"Generating matrix entries for {len(to_generate)} requirements")
+    generated = await ai_service.generate_matrix_entries([
+        {
+            "requirement": requirement.description,
+            "requirement_category": requirement.category or "General",
+            "extracted_specs": formatted_specs,
+            "use_cache": not analyze_request.no_cache
+        }
+        for requirement in to_generate
+    ])
+
+    # Persist entries sequentially (the session is not safe for concurrent use)
+    created_entries = []
+
+    for requirement, matrix_data in zip(to_generate, generated):
+        try:
+            if isinstance(matrix_data, Exception):
+                raise matrix_data
 
             # Create matrix entry
             matrix_entry = MatrixEntryModel(
@@ -949,7 +935,7 @@ async def analyze_document(
     # Convert to Pydantic schemas
     return {
         "message": f"Generated {len(created_entries)} matrix entries",
-        "entries": [MatrixEntrySchema.model_validate(entry) for entry in created_entries],
+        "entries": [MatrixEntrySchema.from_orm_fast(entry) for entry in created_entries],
         "skipped": len(requirements) - len(created_entries)
     }
 
@@ -965,10 +951,9 @@ async def list_matrix_entries(
 ) -> Any:
     """List all matrix entries for a project"""
     from app.models.matrix import MatrixEntry as MatrixEntryModel
-    from app.schemas.matrix import MatrixEntry as MatrixEntrySchema
 
-    # Build query with joins
-    stmt = select(MatrixEntryModel).join(Requirement).where(
+    # Build query with joins (raiseload guards against N+1 lazy loads)
+    stmt = select(MatrixEntryModel).options(raiseload("*")).join(Requirement).where(
         and_(
             Requirement.project_id == project_id,
             Requirement.deleted_at.is_(None),
@@ -988,5 +973,8 @@ async def list_matrix_entries(
     result = await db.execute(stmt)
     entries = result.scalars().all()
 
-    # Convert to Pydantic schemas
-    return [MatrixEntrySchema.model_validate(entry) for entry in entries]
+    # Convert to Pydantic schemas and serialize with the cached adapter
+    return ORJSONResponse(content=_MATRIX_LIST_ADAPTER.dump_python(
+        [MatrixEntrySchema.from_orm_fast(entry) for entry in entries],
+        mode="json"
+    ))
@@ -1,11 +1,13 @@
 import logging
 from typing import List, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Security, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from sqlalchemy.sql import func
 
-from app.api.deps import get_current_user, get_current_admin_user, log_audit_event
+from app.api.deps import get_current_user, get_current_admin_user, invalidate_user_cache, log_audit_event
 from app.core.database import get_db
 from app.core.security import get_password_hash
 from app.models.user import User, UserRole
@@ -18,6 +20,9 @@ from app.schemas.user import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# List serializer built once at import (reused across requests)
+_USER_LIST_ADAPTER = TypeAdapter(List[UserSchema])
+
 
 @router.get("/", response_model=List[UserSchema])
 async def list_users(
@@ -46,7 +51,10 @@ async def list_users(
     result = await db.execute(stmt)
     users = result.scalars().all()
 
-    return users
+    return ORJSONResponse(content=_USER_LIST_ADAPTER.dump_python(
+        _USER_LIST_ADAPTER.validate_python(users, from_attributes=True),
+        mode="json"
+    ))
 
 
 @router.post("/", response_model=UserSchema)
@@ -199,6 +207,8 @@ async def update_user(
 
     await db.commit()
     await db.refresh(user)
+    # Email, role or active flag may have changed
+    invalidate_user_cache()
 
     # Log audit event for each changed field
     for field, change in changes.items():
@@ -260,6 +270,7 @@ async def deactivate_user(
 
     user.is_active = False
     await db.commit()
+    invalidate_user_cache(user.email)
 
     # Log audit event
     await log_audit_event(
@@ -1,6 +1,6 @@
 from typing import Any, Dict, List, Optional, Union
-from pydantic_settings import BaseSettings
-from pydantic import AnyHttpUrl, PostgresDsn, validator, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import AnyHttpUrl, PostgresDsn, field_validator
 import secrets
 
 
@@ -112,6 +112,7 @@ class Settings(BaseSettings):
     DATABASE_URL: Optional[PostgresDsn] = None
 
     @field_validator("DATABASE_URL", mode="before")
+    @classmethod
     def assemble_db_connection(cls, v: Optional[str], info) -> str:
         if isinstance(v, str) and v:
             return v
@@ -130,15 +131,47 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: Optional[str] = None
     OLLAMA_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3.2:3b"
+    OLLAMA_KEEP_ALIVE: str = "30m"  # How long Ollama keeps the model in memory after a request
+    OLLAMA_WARMUP_NUM_CTX: int = 0  # Context window the model is warmed up with; match typical matrix prompts (0 = the 32K maximum)
+    OLLAMA_REQUEST_TIMEOUT: int = 300  # Timeout in seconds for one Ollama call (includes model load)
+    OLLAMA_STREAM_BUDGET_SECONDS: int = 45  # Cut off a streamed matrix response this long after its first token (0 = no limit)
+
+    # Concurrent matrix generation calls per AIService (stay under provider rate limits)
+    GEMINI_MAX_CONCURRENCY: int = 8
+    GEMINI_REQUESTS_PER_MINUTE: int = 0  # Token-bucket cap on Gemini generate calls (0 = no cap)
+    OLLAMA_MAX_CONCURRENCY: int = 2  # Local model: parallel requests mostly queue on the GPU; match the server's OLLAMA_NUM_PARALLEL
 
     # AI Model Selection
     MATRIX_GENERATION_PROVIDER: str = "gemini"  # "gemini" or "ollama"
     GEMINI_MODEL_EXTRACTION: str = "gemini-2.5-flash"
     GEMINI_MODEL_MATRIX: str = "gemini-2.5-pro"
     GEMINI_EXTRACTION_TIMEOUT: int = 300  # Timeout in seconds for document extraction
+    EXTRACTION_CACHE_ENABLED: bool = True  # Reuse extraction results for byte-identical documents
+    EXTRACTION_CACHE_DIR: str = "./uploads/.extraction_cache"  # Shared by API and Celery via the uploads volume
+    GEMINI_BATCH_MODE: bool = False  # Use Gemini Batch Mode (50% cost, up to 24h) for bulk matrix builds
+    GEMINI_BATCH_POLL_INTERVAL: int = 30  # Seconds between batch job status checks
+    GEMINI_BATCH_TIMEOUT: int = 24 * 60 * 60  # Give up waiting on a batch job after this many seconds
+    GEMINI_CONTEXT_CACHE_ENABLED: bool = True  # Cache the shared matrix prompt prefix (specs) per project
+    GEMINI_CONTEXT_CACHE_TTL: int = 3600  # Seconds a Gemini context cache lives after creation
+    MATRIX_USE_RAG: bool = False  # Send only the sections most relevant to each requirement (BM25)
+    MATRIX_RAG_TOP_K: int = 8  # Sections per requirement when MATRIX_USE_RAG is enabled
+    MATRIX_MICRO_BATCH_SIZE: int = 1  # >1 combines concurrent Gemini matrix requests into one prompt
+    MATRIX_MICRO_BATCH_WAIT_MS: int = 500  # Max time a request waits for its micro-batch to fill
+    MATRIX_PACK_SIZE: int = 20  # Requirements packed into one Gemini prompt for project-wide generation
+    LLM_CACHE_ENABLED: bool = True  # Reuse matrix generation responses for identical prompts (temperature 0 only)
+    LLM_CACHE_PATH: str = "./data/llm_cache.db"
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    MATRIX_CACHE_ENABLED: bool = True  # Redis cache of matrix entries shared by API and Celery (temperature 0 only)
+    MATRIX_CACHE_TTL_SECONDS: int = 60 * 60
+    MATRIX_SEMANTIC_CACHE_ENABLED: bool = False  # Reuse entries of near-identical requirement texts (token cosine; off: exact matches only)
+    MATRIX_SEMANTIC_CACHE_THRESHOLD: float = 0.9  # Min requirement text similarity to reuse a cached entry
+    MATRIX_GENERATIVE_CACHE_ENABLED: bool = False  # Answer compound requirements by combining cached clause entries (no model call)
+    MATRIX_GENERATIVE_CACHE_CLAUSE_THRESHOLD: float = 0.8  # Min similarity of each clause to its cached entry
+    MATRIX_GENERATIVE_CACHE_COMBINED_THRESHOLD: float = 1.7  # Min sum of clause similarities
 
     # File Upload
     MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50MB
+    DOCUMENT_VALIDATION_WORKERS: int = 2  # Processes per API worker for PDF parsing during upload validation
     UPLOAD_DIR: str = "./uploads"
     ALLOWED_EXTENSIONS: List[str] = [".pdf", ".docx", ".xlsx"]
 
@@ -151,6 +184,10 @@ class Settings(BaseSettings):
     EMAILS_FROM_EMAIL: Optional[str] = None
     EMAILS_FROM_NAME: Optional[str] = None
 
+    # Response serialization
+    # Build list responses from ORM rows with model_construct() (skips re-validation)
+    SCHEMA_FAST_PATH: bool = True
+
     # Environment
     # SECURITY: DEBUG must be False in production!
     ENVIRONMENT: str = "development"
@@ -167,9 +204,12 @@ class Settings(BaseSettings):
     ELECTRONIC_SIGNATURE_REQUIRED: bool = True
     DATA_RETENTION_DAYS: int = 90  # Days to keep soft-deleted data before permanent purge
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    # Audit log write buffering (entries are batched into one INSERT per flush)
+    AUDIT_BUFFER_SIZE: int = 256  # Flush as soon as this many entries are queued (0 = write directly)
+    AUDIT_FLUSH_INTERVAL_MS: int = 500  # Maximum time an entry waits in the buffer
+    AUDIT_WAL_DIR: Optional[str] = None  # Persistent directory for the buffer's write-ahead log (None = disabled)
+
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
 
 settings = Settings()
@@ -1,25 +1,62 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.pool import NullPool
 import logging
+import orjson
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Create async engine
+
+def json_serializer(obj) -> str:
+    """Serialize JSON columns with orjson (non-str keys coerced like json.dumps)"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+# Create async engine for request handlers
+# No pre-ping: it costs a round-trip per checkout; pool_recycle bounds connection age
+# LIFO checkout keeps the most recently used (warm) connections busy and lets
+# surplus ones idle out; larger statement caches keep asyncpg's prepared
+# statements for all of the app's parameterized queries
 engine = create_async_engine(
     str(settings.DATABASE_URL),
     echo=settings.DEBUG,
     future=True,
-    pool_pre_ping=True,
+    pool_pre_ping=False,
     pool_recycle=300,
-    pool_size=5,
+    pool_size=20,
     max_overflow=10,
+    pool_timeout=10,
+    pool_use_lifo=True,
+    # Compiled SQL cache (default 500 entries); sized so the statements of all
+    # endpoints, including per-filter variants, stay compiled
+    query_cache_size=1200,
+    connect_args={
+        "statement_cache_size": 1024,  # asyncpg per-connection cache
+        "prepared_statement_cache_size": 512,  # SQLAlchemy dialect cache
+    },
+    json_serializer=json_serializer,
+    json_deserializer=orjson.loads,
     # Use NullPool for testing environments
     poolclass=NullPool if settings.ENVIRONMENT == "testing" else None,
 )
 
+# Separate small engine for the background audit log flusher
+# Its connections sit idle between flushes, so pre-ping guards against resets
+audit_engine = create_async_engine(
+    str(settings.DATABASE_URL),
+    echo=settings.DEBUG,
+    future=True,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=2,
+    max_overflow=0,
+    json_serializer=json_serializer,
+    json_deserializer=orjson.loads,
+    poolclass=NullPool if settings.ENVIRONMENT == "testing" else None,
+)
+
 # Create async session maker
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -29,8 +66,17 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
-# Create declarative base
-Base = declarative_base()
+# Session maker bound to the audit engine (used by AuditLogBuffer)
+AuditSessionLocal = async_sessionmaker(
+    audit_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+)
+
+# Create declarative base (SQLAlchemy 2.0 style, supports Mapped[] annotations)
+class Base(DeclarativeBase):
+    pass
 
 
 async def get_db() -> AsyncSession:
@@ -1,9 +1,14 @@
 from datetime import datetime, timedelta
 from typing import Any, Union, Optional, List
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from pydantic import ValidationError
+from collections import OrderedDict
+import asyncio
+import hashlib
 import secrets
+import threading
+import time
 
 from app.core.config import settings
 
@@ -11,6 +16,37 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = settings.JWT_ALGORITHM
 
+# Signing key built once; passing the raw secret makes jose parse and construct
+# the key again on every encode/decode
+JWT_KEY = jwk.construct(settings.JWT_SECRET_KEY, ALGORITHM)
+
+# Our tokens always carry exp and sub and never aud/iss/jti/at_hash, so those
+# claim checks are skipped rather than run on every decode
+JWT_DECODE_OPTIONS = {
+    "require_exp": True,
+    "require_sub": True,
+    "verify_aud": False,
+    "verify_iss": False,
+    "verify_jti": False,
+    "verify_at_hash": False,
+}
+
+# Cache of successful bcrypt verifications (bcrypt is ~100ms per check)
+# Keyed by (stored hash, SHA-256 of candidate) so a password change invalidates
+# entries automatically. Failed attempts are never cached.
+PASSWORD_CACHE_MAX_SIZE = 1024
+PASSWORD_CACHE_TTL_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+_password_cache: "OrderedDict[tuple[str, bytes], float]" = OrderedDict()
+_password_cache_lock = threading.Lock()
+
+# Cache of decoded JWT payloads so repeat requests with the same token skip
+# signature verification. Keyed by SHA-256 of the token (the raw token is never
+# stored); entries never outlive the token's own expiry. Invalid tokens are not cached.
+TOKEN_CACHE_MAX_SIZE = 10000
+TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 
 def create_access_token(
     subject: Union[str, Any], 
@@ -32,7 +68,7 @@ def create_access_token(
     }
     encoded_jwt = jwt.encode(
         to_encode, 
-        settings.JWT_SECRET_KEY, 
+        JWT_KEY, 
         algorithm=ALGORITHM
     )
     return encoded_jwt
@@ -46,15 +82,38 @@ def create_refresh_token(subject: Union[str, Any]) -> str:
     to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
     encoded_jwt = jwt.encode(
         to_encode, 
-        settings.JWT_SECRET_KEY, 
+        JWT_KEY, 
         algorithm=ALGORITHM
     )
     return encoded_jwt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against its hash (successful checks are cached)
+    bcrypt runs in a worker thread so a login does not stall the event loop
+    """
+    cache_key = (hashed_password, hashlib.sha256(plain_password.encode('utf-8')).digest())
+    now = time.monotonic()
+
+    with _password_cache_lock:
+        expires_at = _password_cache.get(cache_key)
+        if expires_at is not None:
+            if expires_at > now:
+                _password_cache.move_to_end(cache_key)
+                return True
+            del _password_cache[cache_key]
+
+    if not await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password):
+        return False
+
+    with _password_cache_lock:
+        _password_cache[cache_key] = now + PASSWORD_CACHE_TTL_SECONDS
+        _password_cache.move_to_end(cache_key)
+        while len(_password_cache) > PASSWORD_CACHE_MAX_SIZE:
+            _password_cache.popitem(last=False)
+
+    return True
 
 
 def get_password_hash(password: str) -> str:
@@ -72,16 +131,40 @@ def verify_token(token: str) -> Optional[dict]:
     Returns:
         Token payload dict or None if invalid
     """
+    cache_key = hashlib.sha256(token.encode('utf-8')).digest()
+    now = time.time()
+
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+        if cached is not None:
+            expires_at, payload = cached
+            if expires_at > now:
+                _token_cache.move_to_end(cache_key)
+                return dict(payload)
+            del _token_cache[cache_key]
+
     try:
         payload = jwt.decode(
             token, 
-            settings.JWT_SECRET_KEY, 
-            algorithms=[ALGORITHM]
+            JWT_KEY, 
+            algorithms=[ALGORITHM],
+            options=JWT_DECODE_OPTIONS
         )
-        return payload
     except JWTError:
         return None
 
+    expires_at = now + TOKEN_CACHE_TTL_SECONDS
+    if isinstance(payload.get("exp"), (int, float)):
+        expires_at = min(expires_at, payload["exp"])
+
+    with _token_cache_lock:
+        _token_cache[cache_key] = (expires_at, dict(payload))
+        _token_cache.move_to_end(cache_key)
+        while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+            _token_cache.popitem(last=False)
+
+    return payload
+
 
 def generate_secure_token() -> str:
     """Generate a cryptographically secure random token"""
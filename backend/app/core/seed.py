@@ -44,13 +44,14 @@ async def create_default_users():
             
             created_count = 0
             
+            # Check which users already exist in one round trip
+            result = await session.execute(
+                select(User.email).where(User.email.in_([u["email"] for u in default_users]))
+            )
+            existing_emails = set(result.scalars().all())
+            
             for user_data in default_users:
-                # Check if user already exists
-                stmt = select(User).where(User.email == user_data["email"])
-                result = await session.execute(stmt)
-                existing_user = result.scalar_one_or_none()
-                
-                if existing_user:
+                if user_data["email"] in existing_emails:
                     logger.info(f"👤 User {user_data['email']} already exists, skipping...")
                     continue
                 
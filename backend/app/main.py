@@ -1,10 +1,10 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -13,7 +13,12 @@ from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
 from app.core.database import create_tables
+from app.core.middleware import CompiledTrustedHostMiddleware
 from app.core.seed import seed_database
+from app.services.audit_logger import audit_buffer
+from app.services.ai_service import close_ai_service, close_gemini_http_client, get_ai_service
+from app.services.document_processor import shutdown_validation_pool
+from app.services.matrix_cache import close_matrix_cache_client
 from app.api.v1 import api_router
 
 # Configure logging
@@ -41,10 +46,30 @@ async def lifespan(app: FastAPI):
         logger.error(f"Database initialization failed: {e}")
         raise
     
+    # Start batched audit log writer
+    await audit_buffer.start()
+
+    # Load the local matrix model in the background so startup is not blocked
+    warmup_task = None
+    if settings.MATRIX_GENERATION_PROVIDER == "ollama":
+        warmup_task = asyncio.create_task(get_ai_service().warmup(), name="ollama-warmup")
+    
     yield
     
     logger.info("Shutting down PharmaSpec Validator API")
 
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    
+    # GxP: flush pending audit entries before exit (runs on SIGTERM via uvicorn)
+    await audit_buffer.stop()
+
+    # Release pooled Gemini REST, Ollama and Redis cache connections
+    await close_gemini_http_client()
+    await close_ai_service()
+    await close_matrix_cache_client()
+    shutdown_validation_pool()
+
 
 def create_application() -> FastAPI:
     """Create FastAPI application with all configurations"""
@@ -56,6 +81,7 @@ def create_application() -> FastAPI:
         openapi_url=f"{settings.API_V1_STR}/openapi.json",
         docs_url=f"{settings.API_V1_STR}/docs",
         redoc_url=f"{settings.API_V1_STR}/redoc",
+        default_response_class=ORJSONResponse,
         lifespan=lifespan
     )
 
@@ -83,8 +109,9 @@ def create_application() -> FastAPI:
 
     # SECURITY: Only allow specific trusted hosts (no wildcards)
     # Configure via TRUSTED_HOSTS environment variable in production
+    # Host patterns are precompiled into a single regex
     app.add_middleware(
-        TrustedHostMiddleware,
+        CompiledTrustedHostMiddleware,
         allowed_hosts=settings.TRUSTED_HOSTS
     )
     
@@ -2,7 +2,7 @@ from app.models.user import User, UserRole
 from app.models.project import Project
 from app.models.project_access import ProjectAccess
 from app.models.document import Document
-from app.models.requirement import Requirement
+from app.models.requirement import Requirement, RequirementPriority, RequirementStatus
 from app.models.matrix import MatrixEntry
 from app.models.audit_log import AuditLog
 
@@ -13,6 +13,8 @@ __all__ = [
     "ProjectAccess",
     "Document",
     "Requirement",
+    "RequirementPriority",
+    "RequirementStatus",
     "MatrixEntry",
     "AuditLog"
 ]
\ No newline at end of file
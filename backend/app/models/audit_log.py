@@ -1,5 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Index
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import String, Text, ForeignKey, DateTime, JSON, Index, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -12,45 +16,49 @@ class AuditLog(Base):
     """
     __tablename__ = "audit_logs"
     
-    # Composite indexes for performance
+    # Composite indexes for performance (match the audit log filter shapes)
+    # Backward index scans serve the "ORDER BY timestamp DESC, id DESC" listings:
+    # filtered ones through the filter's index, unfiltered ones (and their
+    # (timestamp, id) cursor) through ix_audit_timestamp_id
     __table_args__ = (
         Index('ix_audit_user_timestamp', 'user_id', 'timestamp'),
         Index('ix_audit_entity_timestamp', 'entity_type', 'entity_id', 'timestamp'),
         Index('ix_audit_action_timestamp', 'action', 'timestamp'),
+        Index('ix_audit_timestamp_id', 'timestamp', 'id'),
     )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
     
     # User who performed the action
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))  # Indexed via ix_audit_user_timestamp
     
     # Action details
-    action = Column(String(100), nullable=False, index=True)  # CREATE, UPDATE, DELETE, LOGIN, etc.
-    entity_type = Column(String(50), nullable=True, index=True)  # project, document, matrix_entry, etc.
-    entity_id = Column(Integer, nullable=True, index=True)
+    action: Mapped[str] = mapped_column(String(100))  # CREATE, UPDATE, DELETE, LOGIN, etc.
+    entity_type: Mapped[Optional[str]] = mapped_column(String(50))  # project, document, matrix_entry, etc.
+    entity_id: Mapped[Optional[int]] = mapped_column(index=True)
     
     # Change tracking (for UPDATE operations)
-    field_name = Column(String(100), nullable=True)  # Which field was changed
-    old_value = Column(JSON, nullable=True)  # Previous value
-    new_value = Column(JSON, nullable=True)  # New value
+    field_name: Mapped[Optional[str]] = mapped_column(String(100))  # Which field was changed
+    old_value: Mapped[Optional[Any]] = mapped_column(JSON)  # Previous value
+    new_value: Mapped[Optional[Any]] = mapped_column(JSON)  # New value
     
     # Request metadata
-    ip_address = Column(String(45), nullable=True)  # IPv4/IPv6 support
-    user_agent = Column(Text, nullable=True)
-    request_id = Column(String(36), nullable=True, index=True)  # UUID for correlation
+    ip_address: Mapped[Optional[str]] = mapped_column(String(45))  # IPv4/IPv6 support
+    user_agent: Mapped[Optional[str]] = mapped_column(Text)
+    request_id: Mapped[Optional[str]] = mapped_column(String(36), index=True)  # UUID for correlation
     
     # Additional context
-    details = Column(JSON, nullable=True)  # Additional action details
-    error_message = Column(Text, nullable=True)  # For failed actions
+    details: Mapped[Optional[Any]] = mapped_column(JSON)  # Additional action details
+    error_message: Mapped[Optional[str]] = mapped_column(Text)  # For failed actions
     
     # GxP compliance timestamp (immutable)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     
     # Session information
-    session_id = Column(String(255), nullable=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String(255))
     
     # Electronic signature reference (21 CFR Part 11)
-    signature_reference = Column(String(255), nullable=True)
+    signature_reference: Mapped[Optional[str]] = mapped_column(String(255))
     
     # Relationships
     user = relationship("User", back_populates="audit_logs")
@@ -64,7 +72,7 @@ class AuditLog(Base):
         return self.timestamp.strftime("%Y-%m-%d %H:%M:%S UTC")
     
     @classmethod
-    def create_log(
+    def build_values(
         cls,
         user_id: int,
         action: str,
@@ -78,9 +86,9 @@ class AuditLog(Base):
         request_id: str = None,
         details: dict = None,
         session_id: str = None
-    ) -> 'AuditLog':
+    ) -> dict:
         """
-        Factory method to create audit log entries
+        Build column values for an audit log entry
         
         Args:
             user_id: ID of user performing action
@@ -97,19 +105,33 @@ class AuditLog(Base):
             session_id: User session ID
             
         Returns:
-            AuditLog instance
+            Dict of column values suitable for log_bulk()
+        """
+        return {
+            "user_id": user_id,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "field_name": field_name,
+            "old_value": old_value,
+            "new_value": new_value,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "request_id": request_id,
+            "details": details,
+            "session_id": session_id
+        }
+    
+    @classmethod
+    async def log_bulk(cls, session: AsyncSession, rows: list[dict]) -> None:
+        """
+        Insert audit log entries with a single INSERT statement
+        Bypasses the ORM unit of work since callers don't need the instances
+        
+        Args:
+            session: Database session
+            rows: Column value dicts as returned by build_values()
         """
-        return cls(
-            user_id=user_id,
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            field_name=field_name,
-            old_value=old_value,
-            new_value=new_value,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            request_id=request_id,
-            details=details,
-            session_id=session_id
-        )
\ No newline at end of file
+        if not rows:
+            return
+        await session.execute(insert(cls), rows)
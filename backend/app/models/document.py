@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, BigInteger
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import String, Text, ForeignKey, DateTime, JSON, BigInteger, LargeBinary, Index, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -12,32 +15,43 @@ class Document(Base):
     """
     __tablename__ = "documents"
 
-    id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String(255), nullable=False)
-    original_filename = Column(String(255), nullable=False)
-    file_path = Column(String(500), nullable=False)
-    file_size = Column(BigInteger, nullable=False)  # Size in bytes
-    mime_type = Column(String(100), nullable=False)
+    # Partial covering index over live (non-deleted) documents of a project;
+    # project counts/statistics are answered by index-only scans
+    __table_args__ = (
+        Index(
+            'ix_documents_project_active', 'project_id',
+            postgresql_include=['id', 'extraction_status'],
+            postgresql_where=text('deleted_at IS NULL')
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    filename: Mapped[str] = mapped_column(String(255))
+    original_filename: Mapped[str] = mapped_column(String(255))
+    file_path: Mapped[str] = mapped_column(String(500))
+    file_size: Mapped[int] = mapped_column(BigInteger)  # Size in bytes
+    mime_type: Mapped[str] = mapped_column(String(100))
     
     # SHA-256 hash for integrity verification (GxP requirement)
-    file_hash = Column(String(64), nullable=False, index=True)
+    # Stored as the raw 32-byte digest (BYTEA) rather than 64 hex characters
+    file_hash: Mapped[bytes] = mapped_column(LargeBinary(32), index=True)
     
     # Extracted JSON data from Gemini API (Step 1 of AI workflow)
-    extracted_json = Column(JSON, nullable=True)
-    extraction_status = Column(String(50), default="pending", index=True)
-    extraction_model = Column(String(100), nullable=True)  # Track which model was used
-    extracted_at = Column(DateTime(timezone=True), nullable=True)
-    extraction_error = Column(Text, nullable=True)
+    extracted_json: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    extraction_status: Mapped[Optional[str]] = mapped_column(String(50), default="pending", index=True)
+    extraction_model: Mapped[Optional[str]] = mapped_column(String(100))  # Track which model was used
+    extracted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    extraction_error: Mapped[Optional[str]] = mapped_column(Text)
     
     # Project relationship
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), index=True)
     
     # GxP timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
     
     # Soft delete for compliance
-    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     
     # Relationships
     project = relationship("Project", back_populates="documents")
@@ -51,6 +65,11 @@ class Document(Base):
         """Check if document has been successfully extracted"""
         return self.extraction_status == "completed" and self.extracted_json is not None
     
+    @property
+    def hex_hash(self) -> str:
+        """Return SHA-256 file hash as hex string for display"""
+        return self.file_hash.hex() if self.file_hash else ""
+    
     @property
     def file_size_mb(self) -> float:
         """Return file size in megabytes"""
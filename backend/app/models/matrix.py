@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -13,6 +13,16 @@ class MatrixEntry(Base):
     """
     __tablename__ = "matrix_entries"
 
+    # Partial covering index over live (non-deleted) entries of a requirement;
+    # project counts/statistics are answered by index-only scans
+    __table_args__ = (
+        Index(
+            'ix_matrix_requirement_active', 'requirement_id',
+            postgresql_include=['id', 'review_status', 'compliance_status'],
+            postgresql_where=text('deleted_at IS NULL')
+        ),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
 
     # Requirement relationship
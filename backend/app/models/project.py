@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Text, ForeignKey, DateTime, Index, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -12,25 +15,35 @@ class Project(Base):
     """
     __tablename__ = "projects"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False, index=True)
-    description = Column(Text)
+    # Partial indexes over live (non-deleted) projects, matching the listing filters
+    __table_args__ = (
+        Index('ix_projects_owner_active', 'owner_id', postgresql_where=text('deleted_at IS NULL')),
+        Index('ix_projects_created_active', 'created_at', postgresql_where=text('deleted_at IS NULL')),
+    )
+
+    # Fetch server-generated id/created_at/updated_at via RETURNING on INSERT
+    # and UPDATE, so handlers need no refresh() round trip after a commit
+    __mapper_args__ = {"eager_defaults": True}
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(255), index=True)
+    description: Mapped[Optional[str]] = mapped_column(Text)
     
     # Owner relationship for RBAC data isolation
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     
     # GxP timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
     
     # Soft delete for compliance
-    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     
     # Project status for workflow management
-    status = Column(String(50), default="active", index=True)
+    status: Mapped[Optional[str]] = mapped_column(String(50), default="active", index=True)
 
     # Optional password protection for project access
-    password_hash = Column(Text, nullable=True)
+    password_hash: Mapped[Optional[str]] = mapped_column(Text)
 
     # Relationships
     owner = relationship("User", back_populates="projects")
@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import ForeignKey, DateTime, UniqueConstraint, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -12,20 +15,23 @@ class ProjectAccess(Base):
     """
     __tablename__ = "project_access"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    # Lookups are served by the composite indexes in __table_args__
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"))
 
     # Timestamp when access was verified
-    verified_at = Column(DateTime(timezone=True), server_default=func.now())
+    verified_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     user = relationship("User", back_populates="project_accesses")
     project = relationship("Project", back_populates="access_records")
 
-    # Ensure one record per user-project pair
+    # Ensure one record per user-project pair (also serves user_id lookups)
+    # Reverse composite index serves "who accessed this project" lookups
     __table_args__ = (
         UniqueConstraint('user_id', 'project_id', name='unique_user_project_access'),
+        Index('ix_project_access_project_user', 'project_id', 'user_id'),
     )
 
     def __repr__(self):
@@ -1,10 +1,30 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+import enum
 
 from app.core.database import Base
 
 
+class RequirementPriority(str, enum.Enum):
+    """Requirement priority levels"""
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+
+class RequirementStatus(str, enum.Enum):
+    """Requirement workflow status"""
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+
+def _enum_values(enum_cls):
+    """Store the lowercase enum values (not member names) in PostgreSQL"""
+    return [member.value for member in enum_cls]
+
+
 class Requirement(Base):
     """
     User Requirements model
@@ -12,14 +32,30 @@ class Requirement(Base):
     """
     __tablename__ = "requirements"
 
+    # Partial composite indexes for the dominant "active requirements of a project" queries
+    __table_args__ = (
+        Index(
+            'ix_req_project_active', 'project_id', 'status',
+            postgresql_include=['id'],  # Covers project counts (index-only scans)
+            postgresql_where=text('deleted_at IS NULL')
+        ),
+        Index('ix_req_project_category', 'project_id', 'category', postgresql_where=text('deleted_at IS NULL')),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     requirement_id = Column(String(50), nullable=False, index=True)  # User-defined ID (e.g., "REQ-001")
     description = Column(Text, nullable=False)
-    category = Column(String(100), nullable=True, index=True)  # Functional, Performance, etc.
+    category = Column(String(100), nullable=True)  # Functional, Performance, etc.
     
-    # Priority and status for workflow management
-    priority = Column(String(20), default="medium", index=True)  # high, medium, low
-    status = Column(String(50), default="pending", index=True)  # pending, in_progress, completed
+    # Priority and status for workflow management (native PostgreSQL enums)
+    priority = Column(
+        Enum(RequirementPriority, name="requirement_priority", values_callable=_enum_values),
+        default=RequirementPriority.MEDIUM
+    )
+    status = Column(
+        Enum(RequirementStatus, name="requirement_status", values_callable=_enum_values),
+        default=RequirementStatus.PENDING
+    )
     
     # Project relationship
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
@@ -12,6 +12,14 @@ class UserRole(str, enum.Enum):
     ADMIN = "admin"
 
 
+# OAuth2 scopes granted per role
+_BASE_SCOPES = ("me",)
+_ROLE_SCOPES = {
+    UserRole.ENGINEER: ("me", "engineer"),
+    UserRole.ADMIN: ("me", "engineer", "admin", "audit"),
+}
+
+
 class User(Base):
     """
     User model for authentication and authorization
@@ -71,13 +79,6 @@ class User(Base):
         return f"<User(id={self.id}, email='{self.email}', role='{self.role}')>"
     
     @property
-    def scopes(self) -> list[str]:
-        """Return OAuth2 scopes based on user role"""
-        base_scopes = ["me"]
-        
-        if self.role == UserRole.ENGINEER:
-            return base_scopes + ["engineer"]
-        elif self.role == UserRole.ADMIN:
-            return base_scopes + ["engineer", "admin", "audit"]
-        
-        return base_scopes
\ No newline at end of file
+    def scopes(self) -> tuple[str, ...]:
+        """Return OAuth2 scopes based on user role (shared, immutable)"""
+        return _ROLE_SCOPES.get(self.role, _BASE_SCOPES)
\ No newline at end of file
@@ -1,6 +1,8 @@
 from datetime import datetime
 from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.schemas.base import JSONPayload
 
 
 class AuditLogResponse(BaseModel):
@@ -10,8 +12,8 @@ class AuditLogResponse(BaseModel):
     action: str = Field(..., description="Action performed (create, update, delete, etc.)")
     resource_type: str = Field(..., description="Type of resource affected (project, matrix_entry, etc.)")
     resource_id: Optional[int] = Field(None, description="ID of the affected resource")
-    old_value: Optional[Dict[str, Any]] = Field(None, description="Previous values before change")
-    new_value: Optional[Dict[str, Any]] = Field(None, description="New values after change")
+    old_value: Optional[JSONPayload] = Field(None, description="Previous values before change")
+    new_value: Optional[JSONPayload] = Field(None, description="New values after change")
     ip_address: Optional[str] = Field(None, description="Client IP address")
     user_agent: Optional[str] = Field(None, description="Client user agent string")
     session_id: Optional[str] = Field(None, description="Session identifier")
@@ -21,8 +23,7 @@ class AuditLogResponse(BaseModel):
     user_email: Optional[str] = Field(None, description="Email of user who performed action")
     user_full_name: Optional[str] = Field(None, description="Full name of user who performed action")
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="ignore")
 
 
 class AuditLogFilter(BaseModel):
@@ -34,4 +35,6 @@ class AuditLogFilter(BaseModel):
     start_date: Optional[datetime] = Field(None, description="Filter entries after this date")
     end_date: Optional[datetime] = Field(None, description="Filter entries before this date")
     limit: int = Field(default=100, ge=1, le=1000, description="Maximum number of entries to return")
-    offset: int = Field(default=0, ge=0, description="Number of entries to skip")
\ No newline at end of file
+    offset: int = Field(default=0, ge=0, description="Number of entries to skip (not with the cursor)")
+    before_timestamp: Optional[datetime] = Field(None, description="Keyset cursor: timestamp of the last entry of the previous page")
+    before_id: Optional[int] = Field(None, description="Keyset cursor: ID of the last entry of the previous page")
\ No newline at end of file
@@ -0,0 +1,80 @@
+from typing import Annotated, Any, Callable, ClassVar, Dict, Optional, Tuple
+from pydantic import BaseModel, SkipValidation
+import sys
+
+from app.core.config import settings
+
+
+# Free-form JSON column payload (AI output, audit diffs); already valid JSON
+# from the database, so pydantic doesn't walk the tree on validation
+JSONPayload = Annotated[Dict[str, Any], SkipValidation]
+
+
+def _compile_row_builder(model: type, fields: Tuple[str, ...]) -> Callable[[Any], Any]:
+    """
+    Generate a straight-line constructor for ``model`` from an ORM row
+    Equivalent to model_construct() with every field supplied, but without
+    the per-field loop, alias handling and defaults lookup
+    """
+    lines = [
+        "def _build(row):",
+        "    loaded = row.__dict__",
+        "    obj = _new(_model)",
+        "    _setattr(obj, '__dict__', {",
+    ]
+    for field in fields:
+        # Read loaded column values straight from the instance dict (skips the
+        # attribute descriptor); fall back to attribute access for unloaded ones
+        lines.append(f"        {field!r}: loaded[{field!r}] if {field!r} in loaded else row.{field},")
+    lines += [
+        "    })",
+        "    _setattr(obj, '__pydantic_fields_set__', set(_fields))",
+        "    _setattr(obj, '__pydantic_extra__', None)",
+        "    _setattr(obj, '__pydantic_private__', None)",
+        "    return obj",
+    ]
+    namespace = {
+        "_model": model,
+        "_new": model.__new__,
+        "_setattr": object.__setattr__,
+        "_fields": frozenset(fields),
+    }
+    exec(compile("\n".join(lines), f"<{model.__name__}.from_orm_fast>", "exec"), namespace)
+    return namespace["_build"]
+
+
+class ORMResponseModel(BaseModel):
+    """
+    Base for response schemas built from trusted ORM rows
+    from_orm_fast() skips re-validation of database-typed values
+    """
+    # Field names read from the ORM row, precomputed per subclass
+    _orm_fields: ClassVar[Tuple[str, ...]] = ()
+    # Generated row -> instance constructor (None when the model needs model_construct)
+    _build_from_row: ClassVar[Optional[Callable[[Any], Any]]] = None
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        cls._orm_fields = tuple(sys.intern(field) for field in cls.model_fields)
+        # Private attributes / post-init hooks need model_construct's extra steps
+        if cls.__pydantic_post_init__ is None and all(f.isidentifier() for f in cls._orm_fields):
+            cls._build_from_row = staticmethod(_compile_row_builder(cls, cls._orm_fields))
+        else:
+            cls._build_from_row = None
+
+    @classmethod
+    def from_orm_fast(cls, row: Any):
+        """
+        Build schema from an ORM row without validation
+        Falls back to model_validate when SCHEMA_FAST_PATH is disabled
+        """
+        if not settings.SCHEMA_FAST_PATH:
+            return cls.model_validate(row)
+        if cls._build_from_row is not None:
+            return cls._build_from_row(row)
+        loaded = row.__dict__
+        return cls.model_construct(**{
+            field: loaded[field] if field in loaded else getattr(row, field)
+            for field in cls._orm_fields
+        })
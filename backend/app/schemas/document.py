@@ -1,6 +1,8 @@
 from datetime import datetime
 from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+
+from app.schemas.base import JSONPayload
 
 class DocumentBase(BaseModel):
     filename: str = Field(..., description="Original filename of the uploaded document")
@@ -11,23 +13,31 @@ class DocumentBase(BaseModel):
     file_hash: str = Field(..., description="SHA-256 hash for integrity verification")
     extraction_status: str = Field(..., description="Status of AI extraction process")
 
+    @field_validator('file_hash', mode='before')
+    @classmethod
+    def hash_to_hex(cls, v: Any) -> Any:
+        """Render the raw SHA-256 digest stored in the database as hex"""
+        if isinstance(v, (bytes, bytearray, memoryview)):
+            return bytes(v).hex()
+        return v
+
 class DocumentCreate(DocumentBase):
     """Schema for creating a new document"""
     pass
 
 class DocumentUpdate(BaseModel):
     """Schema for updating document metadata"""
-    filename: Optional[str] = Field(None, description="Updated filename")
-    extraction_status: Optional[str] = Field(None, description="Updated extraction status")
-    extracted_data: Optional[Dict[str, Any]] = Field(None, description="Extracted JSON data from Gemini API")
-    processing_notes: Optional[str] = Field(None, description="Processing notes or error messages")
+    filename: str | None = None
+    extraction_status: str | None = None
+    extracted_data: JSONPayload | None = Field(None, description="Extracted JSON data from Gemini API")
+    processing_notes: str | None = Field(None, description="Processing notes or error messages")
 
 class Document(DocumentBase):
     """Schema for document response"""
     id: int
     project_id: int
-    extracted_json: Optional[Dict[str, Any]] = None  # Changed from extracted_data to match model
+    extracted_json: Optional[JSONPayload] = None  # Changed from extracted_data to match model
     created_at: datetime
     updated_at: Optional[datetime] = None  # Make optional since it can be None
 
-    model_config = ConfigDict(from_attributes=True)  # Pydantic v2 syntax
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="ignore")  # Pydantic v2 syntax
@@ -1,6 +1,40 @@
 from datetime import datetime
-from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Annotated, Literal, Optional
+from typing_extensions import Required, TypedDict
+from pydantic import BaseModel, Field, ConfigDict, with_config
+
+from app.schemas.base import ORMResponseModel
+
+
+class GenerationMetadata(TypedDict, total=False):
+    """Shape of MatrixEntry.generation_metadata written by AIService"""
+    model: str
+    provider: str
+    requirement: str
+    requirement_category: Optional[str]
+    generation_timestamp: str
+    prompt_version: str
+    batch_job: str
+    cache_hit: bool
+    schema_error: str
+    micro_batch_size: int
+    source: str
+    cache_similarity: float
+    generative_clauses: int
+
+
+@with_config(ConfigDict(strict=True))
+class GeneratedMatrixEntry(TypedDict, total=False):
+    """Matrix entry as returned by the model (mirrors AIService.MATRIX_ENTRY_SCHEMA)"""
+    spec_reference: Required[str]
+    supplier_response: Required[str]
+    justification: Required[str]
+    compliance_status: Required[Literal["Compliant", "Non-Compliant", "Partial", "Requires Clarification"]]
+    test_reference: str
+    risk_assessment: str
+    comments: str
+    confidence_score: Required[Annotated[float, Field(ge=0, le=100)]]
+    verification_needed: str
 
 
 class MatrixEntryBase(BaseModel):
@@ -21,13 +55,13 @@ class MatrixEntryCreate(MatrixEntryBase):
 
 class MatrixEntryUpdate(BaseModel):
     """Schema for updating matrix entry"""
-    spec_reference: Optional[str] = None
-    supplier_response: Optional[str] = None
-    justification: Optional[str] = None
-    compliance_status: Optional[str] = None
-    test_reference: Optional[str] = None
-    risk_assessment: Optional[str] = None
-    comments: Optional[str] = None
+    spec_reference: str | None = None
+    supplier_response: str | None = None
+    justification: str | None = None
+    compliance_status: str | None = None
+    test_reference: str | None = None
+    risk_assessment: str | None = None
+    comments: str | None = None
 
 
 class MatrixEntryReview(BaseModel):
@@ -36,14 +70,14 @@ class MatrixEntryReview(BaseModel):
     reviewer_comments: Optional[str] = Field(None, description="Review comments")
 
 
-class MatrixEntry(MatrixEntryBase):
+class MatrixEntry(MatrixEntryBase, ORMResponseModel):
     """Schema for matrix entry response"""
     id: int
     requirement_id: int
     document_id: int
     generation_model: Optional[str] = None
     generated_at: Optional[datetime] = None
-    generation_metadata: Optional[Dict[str, Any]] = None
+    generation_metadata: Optional[GenerationMetadata] = None
     review_status: str
     reviewer_comments: Optional[str] = None
     approved_at: Optional[datetime] = None
@@ -53,11 +87,12 @@ class MatrixEntry(MatrixEntryBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="ignore")
 
 
 class AnalyzeDocumentRequest(BaseModel):
     """Request schema for analyzing document against requirements"""
     document_id: int = Field(..., description="ID of the document to analyze")
     requirement_ids: list[int] = Field(..., min_length=1, description="List of requirement IDs to analyze")
-    force_regenerate: bool = Field(default=False, description="Force regenerate existing matrix entries")
\ No newline at end of file
+    force_regenerate: bool = Field(default=False, description="Force regenerate existing matrix entries")
+    no_cache: bool = Field(default=False, description="Bypass cached AI responses and call the model")
\ No newline at end of file
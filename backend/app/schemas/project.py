@@ -1,21 +1,19 @@
-from typing import Optional, List
-from pydantic import BaseModel, validator
+from typing import Optional, List, Annotated
+from pydantic import BaseModel, ConfigDict, StringConstraints, ValidationInfo, field_validator
 from datetime import datetime
 
 from app.schemas.user import User
 
 
+# Project name: stripped and length-checked inside pydantic-core
+ProjectName = Annotated[str, StringConstraints(strip_whitespace=True, min_length=3)]
+
+
 class ProjectBase(BaseModel):
     """Base project schema"""
-    name: str
+    name: ProjectName
     description: Optional[str] = None
     status: str = "active"
-    
-    @validator('name')
-    def validate_name(cls, v):
-        if not v or len(v.strip()) < 3:
-            raise ValueError('Project name must be at least 3 characters long')
-        return v.strip()
 
 
 class ProjectCreate(ProjectBase):
@@ -23,25 +21,20 @@ class ProjectCreate(ProjectBase):
     password: Optional[str] = None
     password_confirmation: Optional[str] = None
 
-    @validator('password_confirmation')
-    def passwords_match(cls, v, values):
-        if 'password' in values and values['password'] is not None:
-            if v != values['password']:
+    @field_validator('password_confirmation')
+    @classmethod
+    def passwords_match(cls, v: Optional[str], info: ValidationInfo) -> Optional[str]:
+        if info.data.get('password') is not None:
+            if v != info.data['password']:
                 raise ValueError('Passwords do not match')
         return v
 
 
 class ProjectUpdate(BaseModel):
     """Schema for updating projects"""
-    name: Optional[str] = None
-    description: Optional[str] = None
-    status: Optional[str] = None
-    
-    @validator('name')
-    def validate_name(cls, v):
-        if v is not None and len(v.strip()) < 3:
-            raise ValueError('Project name must be at least 3 characters long')
-        return v.strip() if v else v
+    name: ProjectName | None = None
+    description: str | None = None
+    status: str | None = None
 
 
 class Project(ProjectBase):
@@ -50,17 +43,15 @@ class Project(ProjectBase):
     owner_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ProjectWithOwner(Project):
     """Project schema with owner information"""
     owner: User
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ProjectSummary(BaseModel):
@@ -78,8 +69,7 @@ class ProjectSummary(BaseModel):
     matrix_entries_count: int = 0
     completion_percentage: float = 0.0
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ProjectPasswordVerify(BaseModel):
@@ -2,13 +2,16 @@ from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field, ConfigDict
 
+from app.models.requirement import RequirementPriority, RequirementStatus
+from app.schemas.base import ORMResponseModel
+
 
 class RequirementBase(BaseModel):
     requirement_id: str = Field(..., min_length=1, max_length=50, description="User-defined requirement ID (e.g., REQ-001)")
     description: str = Field(..., min_length=1, description="Requirement description text")
     category: Optional[str] = Field(None, max_length=100, description="Category (e.g., Functional, Performance, Security)")
-    priority: str = Field(default="medium", description="Priority: low, medium, high")
-    status: str = Field(default="pending", description="Status: pending, in_progress, completed")
+    priority: RequirementPriority = Field(default=RequirementPriority.MEDIUM, description="Priority: low, medium, high")
+    status: RequirementStatus = Field(default=RequirementStatus.PENDING, description="Status: pending, in_progress, completed")
 
 
 class RequirementCreate(RequirementBase):
@@ -18,18 +21,18 @@ class RequirementCreate(RequirementBase):
 
 class RequirementUpdate(BaseModel):
     """Schema for updating requirement details"""
-    requirement_id: Optional[str] = Field(None, min_length=1, max_length=50)
-    description: Optional[str] = Field(None, min_length=1)
-    category: Optional[str] = Field(None, max_length=100)
-    priority: Optional[str] = Field(None)
-    status: Optional[str] = Field(None)
+    requirement_id: str | None = Field(None, min_length=1, max_length=50)
+    description: str | None = Field(None, min_length=1)
+    category: str | None = Field(None, max_length=100)
+    priority: RequirementPriority | None = None
+    status: RequirementStatus | None = None
 
 
-class Requirement(RequirementBase):
+class Requirement(RequirementBase, ORMResponseModel):
     """Schema for requirement response"""
     id: int
     project_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="ignore")
\ No newline at end of file
@@ -1,12 +1,18 @@
 from typing import Optional, List, Annotated
-from pydantic import BaseModel, field_validator, Field
+from pydantic import BaseModel, ConfigDict, StringConstraints, field_validator
 from datetime import datetime
+import re
 
 from app.models.user import UserRole
 
 
 # Custom email type that allows .local domains for development
-EmailString = Annotated[str, Field(pattern=r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')]
+# Pattern check and lower-casing both run inside pydantic-core
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
+EmailString = Annotated[
+    str,
+    StringConstraints(pattern=EMAIL_PATTERN, strip_whitespace=True, to_lower=True)
+]
 
 
 class UserBase(BaseModel):
@@ -15,14 +21,6 @@ class UserBase(BaseModel):
     full_name: str
     role: UserRole = UserRole.ENGINEER
     is_active: bool = True
-    
-    @field_validator('email')
-    @classmethod
-    def validate_email(cls, v: str) -> str:
-        """Validate email format (allowing .local for development)"""
-        if '@' not in v:
-            raise ValueError('Invalid email format')
-        return v.lower()
 
 
 class UserCreate(UserBase):
@@ -43,14 +41,6 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     role: Optional[UserRole] = None
     is_active: Optional[bool] = None
-    
-    @field_validator('email')
-    @classmethod
-    def validate_email(cls, v: Optional[str]) -> Optional[str]:
-        """Validate email format (allowing .local for development)"""
-        if v and '@' not in v:
-            raise ValueError('Invalid email format')
-        return v.lower() if v else v
 
 
 class UserInDB(UserBase):
@@ -60,7 +50,7 @@ class UserInDB(UserBase):
     updated_at: Optional[datetime] = None
     last_login: Optional[datetime] = None
     
-    model_config = {"from_attributes": True}
+    model_config = ConfigDict(from_attributes=True)
 
 
 class User(UserBase):
@@ -69,7 +59,7 @@ class User(UserBase):
     created_at: datetime
     last_login: Optional[datetime] = None
     
-    model_config = {"from_attributes": True}
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="ignore")
 
 
 class Token(BaseModel):
@@ -1,10 +1,12 @@
 from app.services.ai_service import AIService
 from app.services.document_processor import DocumentProcessor
 from app.services.matrix_generator import MatrixGenerator
+from app.services.audit_logger import AuditLogBuffer, audit_buffer
 
 __all__ = [
     "AIService",
-    "DocumentProcessor", 
+    "DocumentProcessor",
     "MatrixGenerator",
-    "AuditLogger"
+    "AuditLogBuffer",
+    "audit_buffer"
 ]
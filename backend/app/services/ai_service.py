@@ -1,134 +1,48 @@
-import json
 import asyncio
+import hashlib
 import logging
 import io
-from typing import Dict, Any, Optional
+import math
+import os
+import re
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+from types import MappingProxyType
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import httpx
 import ollama
+import orjson
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import from_json
 
 from app.core.config import settings
+from app.schemas.matrix import GeneratedMatrixEntry
+from app.services.extraction_cache import ExtractionCache
+from app.services.llm_cache import LLMResponseCache
+from app.services.matrix_batcher import MatrixBatcher
+from app.services.matrix_cache import MatrixEntryCache
+from app.services.rate_limiter import TokenBucket
+from app.services.section_retriever import SectionIndex
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the extraction prompt changes (part of the extraction cache key)
+EXTRACTION_PROMPT_VERSION = "v1.0"
+# Bump whenever a matrix prompt template changes (part of the LLM response cache key)
+MATRIX_PROMPT_VERSION = "v1.0"
 
-class AIService:
-    """
-    AI Service for two-step workflow:
-    1. Gemini API for document extraction
-    2. Ollama/Llama for matrix generation
-    """
-
-    # JSON schema for matrix entry structured output
-    MATRIX_ENTRY_SCHEMA = {
-        "type": "object",
-        "required": [
-            "spec_reference",
-            "supplier_response",
-            "justification",
-            "compliance_status",
-            "confidence_score"
-        ],
-        "properties": {
-            "spec_reference": {
-                "type": "string",
-                "description": "Section number and heading from supplier document"
-            },
-            "supplier_response": {
-                "type": "string",
-                "description": "Direct quote from supplier document"
-            },
-            "justification": {
-                "type": "string",
-                "description": "Technical justification for compliance assessment"
-            },
-            "compliance_status": {
-                "type": "string",
-                "enum": ["Compliant", "Non-Compliant", "Partial", "Requires Clarification"],
-                "description": "Compliance status"
-            },
-            "test_reference": {
-                "type": "string",
-                "description": "Suggested test approach"
-            },
-            "risk_assessment": {
-                "type": "string",
-                "description": "Risk level and explanation"
-            },
-            "comments": {
-                "type": "string",
-                "description": "Additional validation notes"
-            },
-            "confidence_score": {
-                "type": "number",
-                "minimum": 0,
-                "maximum": 100,
-                "description": "Confidence in assessment (0-100)"
-            },
-            "verification_needed": {
-                "type": "string",
-                "description": "Items to verify during testing"
-            }
-        }
-    }
-
-    def __init__(self):
-        # Configure Gemini API
-        if settings.GEMINI_API_KEY:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-
-            # Gemini model for document extraction
-            self.gemini_extraction_model = genai.GenerativeModel(
-                settings.GEMINI_MODEL_EXTRACTION,
-                generation_config={
-                    "response_mime_type": "application/json",
-                    "temperature": 0.1,  # Low temperature for consistent, deterministic outputs
-                }
-            )
-
-            # Gemini model for matrix generation
-            self.gemini_matrix_model = genai.GenerativeModel(
-                settings.GEMINI_MODEL_MATRIX,
-                generation_config={
-                    "response_mime_type": "application/json",
-                    "temperature": 0.0,  # Deterministic for traceability
-                }
-            )
-
-            logger.info(f"Gemini configured: Extraction={settings.GEMINI_MODEL_EXTRACTION}, Matrix={settings.GEMINI_MODEL_MATRIX}")
-        else:
-            self.gemini_extraction_model = None
-            self.gemini_matrix_model = None
-            logger.warning("Gemini API key not configured")
-
-        # Configure Ollama client
-        self.ollama_client = ollama.AsyncClient(host=settings.OLLAMA_URL)
-        logger.info(f"Matrix generation provider: {settings.MATRIX_GENERATION_PROVIDER}")
-
-    async def extract_document_specifications(
-        self,
-        document_content: bytes,
-        filename: str,
-        mime_type: str
-    ) -> Dict[str, Any]:
-        """
-        Step 1: Extract technical specifications from document using Gemini
-        
-        Args:
-            document_content: Raw document bytes
-            filename: Original filename
-            mime_type: MIME type of document
-            
-        Returns:
-            Structured JSON with extracted specifications
-        """
-        if not self.gemini_extraction_model:
-            raise ValueError("Gemini API not configured")
+# JSON object in a model response, optionally wrapped in a markdown code fence
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\{.*\})\s*```|(\{.*\})", re.DOTALL)
 
-        try:
-            # Prepare extraction prompt for RAW document extraction (GxP compliant)
-            # Note: JSON mode is enabled - Gemini will output pure JSON automatically
-            extraction_prompt = """
+# Prompt for RAW document extraction (GxP compliant)
+# Note: JSON mode is enabled - Gemini will output pure JSON automatically
+EXTRACTION_PROMPT = """
             You are a technical documentation specialist performing VERBATIM extraction of a supplier specification document.
 
             CRITICAL MISSION: Extract this document preserving EVERY SINGLE WORD EXACTLY as written.
@@ -214,160 +128,18 @@ class AIService:
             When in doubt: COPY EXACTLY, don't interpret.
             """
 
-            # Upload document to Gemini (supports PDFs, images, DOCX, etc.)
-            # Wrap bytes in BytesIO to create a file-like object for upload
-            file_obj = io.BytesIO(document_content)
-            uploaded_file = genai.upload_file(
-                path=file_obj,
-                mime_type=mime_type,
-                display_name=filename
-            )
-
-            # Generate content with uploaded file and extraction prompt
-            # Use configurable timeout (important for gemini-2.5-pro which is slower)
-            response = await asyncio.to_thread(
-                self.gemini_extraction_model.generate_content,
-                [uploaded_file, extraction_prompt],
-                request_options={"timeout": settings.GEMINI_EXTRACTION_TIMEOUT}
-            )
-
-            # Parse response
-            extracted_text = response.text
-
-            # Log response info for debugging
-            response_size = len(extracted_text)
-            logger.info(f"Gemini response size: {response_size} characters")
-
-            # Try to extract JSON from response
-            try:
-                # Handle markdown code fences (```json\n{...}\n```)
-                json_str = extracted_text
-                if "```json" in json_str:
-                    json_str = json_str.split("```json", 1)[1]
-                    json_str = json_str.split("```", 1)[0]
-                elif "```" in json_str:
-                    json_str = json_str.split("```", 1)[1]
-                    json_str = json_str.split("```", 1)[0]
-
-                json_str = json_str.strip()
-
-                # Look for JSON block in response
-                start_idx = json_str.find('{')
-                end_idx = json_str.rfind('}') + 1
-
-                if start_idx != -1 and end_idx > start_idx:
-                    json_str = json_str[start_idx:end_idx]
-                    extracted_data = json.loads(json_str)
-                    logger.info("Successfully parsed JSON from Gemini response")
-                else:
-                    # If no JSON found, structure the response
-                    logger.warning("No JSON structure found in Gemini response")
-                    extracted_data = {
-                        "extraction_method": "gemini-text-analysis",
-                        "raw_content": extracted_text[:5000],  # Truncate for storage
-                        "structured_data": self._structure_text_content(extracted_text)
-                    }
-
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON from Gemini response: {e}")
-                logger.error(f"Response size: {response_size} chars")
-                logger.error(f"Response preview (first 500 chars): {extracted_text[:500]}")
-                logger.error(f"Response preview (last 500 chars): {extracted_text[-500:]}")
-                extracted_data = {
-                    "extraction_method": "gemini-text-fallback",
-                    "raw_content": extracted_text[:5000],
-                    "error": str(e)
-                }
-
-            # Add metadata and quality warnings
-            extracted_data["extraction_metadata"] = {
-                "model": settings.GEMINI_MODEL_EXTRACTION,
-                "extraction_method": "ai_based",
-                "filename": filename,
-                "mime_type": mime_type,
-                "extraction_timestamp": "auto-generated",
-                "content_length": len(document_content),
-                "temperature": 0.1,
-                "json_mode": True
-            }
-
-            # Add extraction quality warnings for GxP compliance
-            extracted_data["extraction_quality_warnings"] = [
-                "⚠️ AI-based extraction using Large Language Model (LLM)",
-                "LLM extraction is NOT guaranteed to be verbatim - it reconstructs content based on understanding",
-                "Manual verification recommended: compare extracted text with original document",
-                "For GxP compliance: perform spot-checks on critical specifications",
-                "Extraction accuracy estimated at 95-98% with current configuration",
-                "Consider using deterministic parsers (PyPDF2, python-docx) for 100% verbatim extraction"
-            ]
-
-            extracted_data["manual_review_recommended"] = True
-
-            logger.info(f"Successfully extracted specifications from {filename}")
-            return extracted_data
-
-        except Exception as e:
-            logger.error(f"Document extraction failed for {filename}: {e}")
-            raise
-
-    async def generate_matrix_entry(
-        self,
-        requirement: str,
-        requirement_category: str,
-        extracted_specs: Dict[str, Any],
-        project_context: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """
-        Step 2: Generate traceability matrix entry using configured AI provider (Gemini or Ollama)
-        
-        Args:
-            requirement: User requirement text
-            requirement_category: Category of the requirement
-            extracted_specs: Structured specifications from Step 1
-            project_context: Additional project context
-            
-        Returns:
-            Generated matrix entry data
-        """
-        # Dispatch to appropriate provider based on configuration
-        if settings.MATRIX_GENERATION_PROVIDER == "gemini":
-            logger.info(f"Using Gemini ({settings.GEMINI_MODEL_MATRIX}) for matrix generation")
-            return await self._generate_matrix_with_gemini(
-                requirement, requirement_category, extracted_specs, project_context
-            )
-        else:  # ollama
-            logger.info(f"Using Ollama ({settings.OLLAMA_MODEL}) for matrix generation")
-            return await self._generate_matrix_with_ollama(
-                requirement, requirement_category, extracted_specs, project_context
-            )
-
-    # ==================== OLLAMA-BASED MATRIX GENERATION ====================
-    async def _generate_matrix_with_ollama(
-        self,
-        requirement: str,
-        requirement_category: str,
-        extracted_specs: Dict[str, Any],
-        project_context: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """Generate matrix entry using local Ollama/Llama model (FREE but less accurate with 3B)"""
-        try:
-            # Prepare generation prompt for traceability matrix with raw document
-            matrix_prompt = f"""You are an expert pharmaceutical CSV consultant creating a traceability matrix entry for GxP validation.
+# Matrix generation prompts (str.format templates); the rendered prompt and
+# MATRIX_PROMPT_VERSION form the LLM response cache key
+# Ollama: everything up to the project context is identical across requirements,
+# so Ollama can reuse the evaluated prefix (KV cache) between calls
+OLLAMA_MATRIX_PROMPT_TEMPLATE = """You are an expert pharmaceutical CSV consultant creating a traceability matrix entry for GxP validation.
 
 RESPOND ONLY WITH VALID JSON. Do not include any explanatory text before or after the JSON object.
 
-USER REQUIREMENT TO VALIDATE:
-Category: {requirement_category}
-Requirement: {requirement}
-
-SUPPLIER SPECIFICATION DOCUMENT (complete raw extraction):
-{json.dumps(extracted_specs, indent=2)}
-
-PROJECT CONTEXT:
-{json.dumps(project_context or {}, indent=2)}
+{specs}
 
 INSTRUCTIONS:
-1. Search through ALL sections of the supplier document to find content addressing this requirement
+1. Search through ALL sections of the supplier document to find content addressing the user requirement given at the end
 2. Cite EXACT section numbers and use EXACT quotes from the supplier document
 3. If the requirement is addressed, reference the specific section(s) and quote the relevant text
 4. If not addressed, set spec_reference to "Not Found" and compliance_status to "Requires Clarification"
@@ -384,130 +156,22 @@ CRITICAL RULES:
 This matrix will be reviewed by QA and submitted to regulatory authorities.
 Accuracy and traceability to source documentation is critical for audit defense.
 
-OUTPUT ONLY THE JSON OBJECT - NO OTHER TEXT."""
-
-            # Log prompt diagnostics to identify if prompt is too large
-            prompt_length = len(matrix_prompt)
-            logger.warning(f"Prompt length: {prompt_length} characters ({prompt_length // 1024}KB)")
-            logger.warning(f"Document count in extracted_specs: {len(extracted_specs.get('documents', []))}")
-
-            # Log document structure details
-            if extracted_specs.get('documents'):
-                first_doc = extracted_specs['documents'][0]
-                sections_count = len(first_doc.get('sections', []))
-                logger.warning(f"First document has {sections_count} sections")
-                if sections_count > 0:
-                    first_section = first_doc['sections'][0]
-                    content_length = len(str(first_section.get('content', '')))
-                    logger.warning(f"First section content length: {content_length} characters")
-
-            # Call Ollama with local Llama model using structured JSON output
-            response = await self.ollama_client.generate(
-                model=settings.OLLAMA_MODEL,
-                prompt=matrix_prompt,
-                format=self.MATRIX_ENTRY_SCHEMA,  # Force JSON schema compliance
-                options={
-                    'temperature': 0.0,  # Deterministic output for consistency
-                    'top_p': 0.9,
-                    'num_predict': 4096,  # Increased limit for longer responses
-                    'num_ctx': 32768  # Set context window to 32K tokens (~80KB text) - llama3.2 supports up to 128K
-                }
-            )
-
-            # Log response metadata
-            logger.warning(f"Ollama response metadata - model: {response.get('model', 'unknown')}, "
-                          f"total_duration: {response.get('total_duration', 0) / 1e9:.2f}s, "
-                          f"prompt_eval_count: {response.get('prompt_eval_count', 0)}, "
-                          f"eval_count: {response.get('eval_count', 0)}")
-
-            # Parse response (with format parameter, response is pure JSON)
-            response_text = response['response']
-            logger.warning(f"Raw Llama response for requirement '{requirement[:50]}...': {response_text[:1000]}")
-
-            try:
-                # Direct JSON parsing (format parameter ensures valid JSON)
-                matrix_entry = json.loads(response_text)
-
-                # Validate that Llama provided meaningful content
-                spec_ref = matrix_entry.get("spec_reference", "")
-                supplier_resp = matrix_entry.get("supplier_response", "")
-
-                if not spec_ref or not supplier_resp or spec_ref == "" or supplier_resp == "":
-                    logger.warning(f"Llama returned empty/missing fields for requirement '{requirement[:50]}...'")
-                    logger.warning(f"spec_reference: '{spec_ref}', supplier_response: '{supplier_resp}'")
-                    logger.warning(f"Full Llama response: {response_text}")
-
-                    # Add warning to comments if fields are empty
-                    if "comments" not in matrix_entry or not matrix_entry["comments"]:
-                        matrix_entry["comments"] = "Warning: AI returned empty fields - requires manual completion"
-                    else:
-                        matrix_entry["comments"] += " | Warning: Some fields were empty in AI response"
-
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON from Ollama response: {e}")
-                logger.error(f"Response text that failed to parse: {response_text}")
-                matrix_entry = {
-                    "spec_reference": "AI generation failed - JSON parsing error",
-                    "supplier_response": response_text[:1000] if response_text else "No response from AI",
-                    "justification": "AI-generated response could not be parsed",
-                    "compliance_status": "Requires Clarification",
-                    "confidence_score": 0,
-                    "comments": f"JSON parsing error: {str(e)}"
-                }
-
-            # Add generation metadata
-            matrix_entry["generation_metadata"] = {
-                "model": settings.OLLAMA_MODEL,
-                "requirement": requirement,
-                "requirement_category": requirement_category,
-                "generation_timestamp": "auto-generated",
-                "prompt_version": "v1.0"
-            }
-
-            logger.info(f"Successfully generated matrix entry for requirement: {requirement[:50]}...")
-            return matrix_entry
-
-        except Exception as e:
-            logger.error(f"Matrix generation failed for requirement '{requirement}': {e}")
-            # Return error entry that can still be used
-            return {
-                "spec_reference": "AI generation failed",
-                "supplier_response": "Error during AI processing",
-                "justification": f"AI service error: {str(e)}",
-                "compliance_status": "Requires Clarification",
-                "confidence_score": 0,
-                "comments": "Manual review required due to AI processing error",
-                "generation_error": str(e)
-            }
-
-    # ==================== GEMINI-BASED MATRIX GENERATION ====================
-    async def _generate_matrix_with_gemini(
-        self,
-        requirement: str,
-        requirement_category: str,
-        extracted_specs: Dict[str, Any],
-        project_context: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """Generate matrix entry using Google Gemini API (PAID but more accurate)"""
-        if not self.gemini_matrix_model:
-            raise ValueError("Gemini API not configured")
-
-        try:
-            # Prepare generation prompt
-            matrix_prompt = f"""You are an expert pharmaceutical CSV consultant creating a traceability matrix entry for GxP validation.
+PROJECT CONTEXT:
+{context}
 
 USER REQUIREMENT TO VALIDATE:
-Category: {requirement_category}
+Category: {category}
 Requirement: {requirement}
 
-SUPPLIER SPECIFICATION DOCUMENT (complete raw extraction):
-{json.dumps(extracted_specs, indent=2)}
+OUTPUT ONLY THE JSON OBJECT - NO OTHER TEXT."""
+
+# Gemini: shared prefix (served from a context cache) + per-requirement suffix
+GEMINI_MATRIX_PROMPT_PREFIX_TEMPLATE = """You are an expert pharmaceutical CSV consultant creating a traceability matrix entry for GxP validation.
 
-PROJECT CONTEXT:
-{json.dumps(project_context or {}, indent=2)}
+{specs}
 
 INSTRUCTIONS:
-1. Search through ALL sections of the supplier document to find content addressing this requirement
+1. Search through ALL sections of the supplier document to find content addressing the user requirement given at the end
 2. Cite EXACT section numbers and use EXACT quotes from the supplier document
 3. If the requirement is addressed, reference the specific section(s) and quote the relevant text
 4. If not addressed, set spec_reference to "Not Found" and compliance_status to "Requires Clarification"
@@ -533,71 +197,1696 @@ CRITICAL RULES:
 - confidence_score must be a number between 0 and 100
 
 This matrix will be reviewed by QA and submitted to regulatory authorities.
-Accuracy and traceability to source documentation is critical for audit defense."""
+Accuracy and traceability to source documentation is critical for audit defense.
+"""
 
-            # Log diagnostics
-            prompt_length = len(matrix_prompt)
-            logger.info(f"Gemini matrix prompt length: {prompt_length} characters ({prompt_length // 1024}KB)")
-            logger.info(f"Document count: {len(extracted_specs.get('documents', []))}")
+GEMINI_MATRIX_PROMPT_SUFFIX_TEMPLATE = """
+PROJECT CONTEXT:
+{context}
+
+USER REQUIREMENT TO VALIDATE:
+Category: {category}
+Requirement: {requirement}"""
+
+def _prompt_json(value: Any) -> str:
+    """Indented JSON for embedding in a prompt (same layout as json.dumps(indent=2))"""
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _parse_model_json(json_str: str, response_text: Optional[str] = None) -> Tuple[Any, bool]:
+    """
+    Parse the JSON object of a model response, recovering truncated output
+
+    Args:
+        json_str: The located JSON object
+        response_text: Full response to recover from when json_str does not parse
+            (defaults to json_str)
+
+    Returns:
+        (value, complete); complete is False when the response was cut off (output
+        token limit) and only its complete fields plus the trailing string were kept
+
+    Raises:
+        ValueError: No JSON object could be recovered
+    """
+    try:
+        return from_json(json_str, cache_strings="all"), True
+    except ValueError:
+        text = json_str if response_text is None else response_text
+        start = text.find("{")
+        if start == -1:
+            raise
+        # A complete object followed by more text (prose containing braces)
+        end = _JsonObjectScanner().feed(text[start:])
+        if end is not None:
+            try:
+                return from_json(text[start:start + end], cache_strings="all"), True
+            except ValueError:
+                pass
+        value = from_json(text[start:], cache_strings="all", allow_partial="trailing-strings")
+        if not isinstance(value, dict) or not value:
+            raise
+        return value, False
+
+
+class _JsonObjectScanner:
+    """
+    Finds where the top-level JSON object of a streamed response closes
+    Tracks brace depth outside strings (with escapes) across chunks; text before
+    the object's opening brace (prose, stray quotes) is skipped
+    """
+
+    __slots__ = ("depth", "in_string", "escaped", "started")
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+
+    def feed(self, chunk: str) -> Optional[int]:
+        """Index in chunk just past the closing "}" of the top-level object, or None"""
+        for i, char in enumerate(chunk):
+            if not self.started:
+                if char == "{":
+                    self.depth = 1
+                    self.started = True
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return i + 1
+        return None
+
+
+# Ollama generation limits: response tokens, and the largest context window to
+# request (32K tokens, ~80KB text; llama3.2 supports up to 128K)
+OLLAMA_NUM_PREDICT = 4096
+OLLAMA_MAX_CTX = 32768
+
+# Client-side check of model output against MATRIX_ENTRY_SCHEMA (built once)
+_MATRIX_ENTRY_ADAPTER = TypeAdapter(GeneratedMatrixEntry)
+
+# Gemini rejects context caches below a minimum token count (~4k tokens for Pro models)
+GEMINI_CONTEXT_CACHE_MIN_CHARS = 16_000
+
+# spec_reference of the placeholder entry used when a matrix response is not valid JSON
+MATRIX_PARSE_ERROR_REFERENCE = "AI generation failed - JSON parsing error"
+
+# Error reported for a matrix response cut off before its JSON object closed
+MATRIX_TRUNCATED_ERROR = "response was cut off before the JSON object was complete"
+
+# Gemini REST endpoint for Batch Mode (not exposed by google-generativeai)
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com"
+GEMINI_BATCH_TERMINAL_STATES = {
+    "BATCH_STATE_SUCCEEDED",
+    "BATCH_STATE_FAILED",
+    "BATCH_STATE_CANCELLED",
+    "BATCH_STATE_EXPIRED",
+}
+
+
+# Shared HTTP/2 clients for Gemini REST calls, one per event loop
+# (Celery tasks run their own loops; a client cannot outlive its loop)
+_gemini_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def gemini_http_client() -> httpx.AsyncClient:
+    """Return the pooled HTTP/2 client for Gemini REST endpoints on the running loop"""
+    loop = asyncio.get_running_loop()
+    client = _gemini_http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=GEMINI_API_BASE,
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=settings.GEMINI_EXTRACTION_TIMEOUT
+        )
+        _gemini_http_clients[loop] = client
+    return client
+
+
+# Gemini request rate limiters, one per event loop (GEMINI_REQUESTS_PER_MINUTE)
+_gemini_rate_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TokenBucket]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def wait_for_gemini_rate_limit() -> None:
+    """Wait for a Gemini request slot when GEMINI_REQUESTS_PER_MINUTE is set"""
+    if settings.GEMINI_REQUESTS_PER_MINUTE <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    limiter = _gemini_rate_limiters.get(loop)
+    if limiter is None:
+        limiter = _gemini_rate_limiters[loop] = TokenBucket(settings.GEMINI_REQUESTS_PER_MINUTE)
+    await limiter.acquire()
+
+
+async def close_gemini_http_client() -> None:
+    """Close the running loop's Gemini HTTP client (call on shutdown)"""
+    client = _gemini_http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class AIService:
+    """
+    AI Service for two-step workflow:
+    1. Gemini API for document extraction
+    2. Ollama/Llama for matrix generation
+    """
+
+    # JSON schema for matrix entry structured output (read-only, shared by all calls)
+    MATRIX_ENTRY_SCHEMA = MappingProxyType({
+        "type": "object",
+        "required": [
+            "spec_reference",
+            "supplier_response",
+            "justification",
+            "compliance_status",
+            "confidence_score"
+        ],
+        "properties": {
+            "spec_reference": {
+                "type": "string",
+                "description": "Section number and heading from supplier document"
+            },
+            "supplier_response": {
+                "type": "string",
+                "description": "Direct quote from supplier document"
+            },
+            "justification": {
+                "type": "string",
+                "description": "Technical justification for compliance assessment"
+            },
+            "compliance_status": {
+                "type": "string",
+                "enum": ["Compliant", "Non-Compliant", "Partial", "Requires Clarification"],
+                "description": "Compliance status"
+            },
+            "test_reference": {
+                "type": "string",
+                "description": "Suggested test approach"
+            },
+            "risk_assessment": {
+                "type": "string",
+                "description": "Risk level and explanation"
+            },
+            "comments": {
+                "type": "string",
+                "description": "Additional validation notes"
+            },
+            "confidence_score": {
+                "type": "number",
+                "minimum": 0,
+                "maximum": 100,
+                "description": "Confidence in assessment (0-100)"
+            },
+            "verification_needed": {
+                "type": "string",
+                "description": "Items to verify during testing"
+            }
+        }
+    })
+
+    # Sampling temperature for matrix generation (response caching requires 0)
+    MATRIX_TEMPERATURE = 0.0
+    # Extra attempts (with error feedback) when a matrix response fails parsing or validation
+    MATRIX_MAX_RETRIES = 2
+
+    # Per-specs-object caches (serialized prompt text, digest) hold this many
+    # recent extracted_specs dicts, so interleaved projects do not evict each other
+    SPECS_CACHE_SIZE = 8
+
+    # Digests of recent extracted_specs objects, for matrix cache keys
+    _specs_digest_cache: "OrderedDict[int, Tuple[Dict[str, Any], str]]" = OrderedDict()
+
+    # Gemini Files API uploads by document SHA-256, reused until shortly before
+    # they expire server-side (48h), e.g. when an extraction is retried
+    GEMINI_FILE_CACHE_SIZE = 32
+    GEMINI_FILE_REUSE_MARGIN = timedelta(hours=1)
+    _gemini_files: "OrderedDict[bytes, Tuple[Any, datetime]]" = OrderedDict()
+
+    # Gemini context caches for matrix prompt prefixes: at most this many models are
+    # kept, each recreated shortly before its server-side TTL runs out; a failed
+    # creation is retried after the backoff
+    GEMINI_CONTEXT_CACHE_SIZE = 16
+    GEMINI_CONTEXT_REFRESH_MARGIN = timedelta(minutes=5)
+    GEMINI_CONTEXT_RETRY_BACKOFF = timedelta(minutes=5)
+
+    def __init__(self):
+        # Configure Gemini API
+        if settings.GEMINI_API_KEY:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+
+            # Gemini model for document extraction
+            self.gemini_extraction_model = genai.GenerativeModel(
+                settings.GEMINI_MODEL_EXTRACTION,
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "temperature": 0.1,  # Low temperature for consistent, deterministic outputs
+                }
+            )
+
+            # Gemini model for matrix generation
+            self.gemini_matrix_generation_config = {
+                "response_mime_type": "application/json",
+                "temperature": self.MATRIX_TEMPERATURE,  # Deterministic for traceability
+            }
+            self.gemini_matrix_model = genai.GenerativeModel(
+                settings.GEMINI_MODEL_MATRIX,
+                generation_config=self.gemini_matrix_generation_config
+            )
+
+            # Use configurable timeout (important for gemini-2.5-pro which is slower)
+            self._extraction_request_options = {"timeout": settings.GEMINI_EXTRACTION_TIMEOUT}
+
+            logger.info(
+                "Gemini configured: Extraction=%s, Matrix=%s",
+                settings.GEMINI_MODEL_EXTRACTION, settings.GEMINI_MODEL_MATRIX
+            )
+        else:
+            self.gemini_extraction_model = None
+            self.gemini_matrix_model = None
+            logger.warning("Gemini API key not configured")
+
+        # Configure Ollama client
+        # Keep-alive pool sized for concurrent matrix calls (kwargs go to httpx).
+        # Plain HTTP/1.1: Ollama does not speak cleartext HTTP/2, so concurrent
+        # calls reuse idle keep-alive connections instead of multiplexing
+        self.ollama_client = ollama.AsyncClient(
+            host=settings.OLLAMA_URL,
+            timeout=httpx.Timeout(settings.OLLAMA_REQUEST_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30.0)
+        )
+
+        # Bound concurrent matrix generation calls per provider (held only around each
+        # model call, so cache lookups and retry backoff do not occupy a slot)
+        self._gemini_sem = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+        self._ollama_sem = asyncio.Semaphore(settings.OLLAMA_MAX_CONCURRENCY)
+
+        # Coalesce concurrent Gemini matrix requests into multi-requirement prompts
+        # (needs the full document prefix, so not combined with MATRIX_USE_RAG)
+        if settings.MATRIX_MICRO_BATCH_SIZE > 1 and not settings.MATRIX_USE_RAG:
+            self._matrix_batcher = MatrixBatcher(
+                self._generate_matrix_batch_with_gemini,
+                max_batch_size=settings.MATRIX_MICRO_BATCH_SIZE,
+                max_queue_time=settings.MATRIX_MICRO_BATCH_WAIT_MS / 1000
+            )
+        else:
+            self._matrix_batcher = None
+
+        # Gemini context cache models for shared matrix prompt prefixes, by prefix hash:
+        # (model, expires) or (None, retry_after) after a failed creation
+        self._gemini_context_models: "OrderedDict[str, Tuple[Any, datetime]]" = OrderedDict()
+        self._gemini_context_lock = asyncio.Lock()
+
+        # Serialized recent extracted_specs; the same dict is reused for every requirement
+        self._specs_json_cache: "OrderedDict[int, Tuple[Dict[str, Any], str]]" = OrderedDict()
+        # Section indexes for MATRIX_USE_RAG, built once per extracted_specs dict
+        self._section_index_cache: "OrderedDict[int, Tuple[Dict[str, Any], SectionIndex]]" = OrderedDict()
+
+        # Responses are only reusable when generation is deterministic
+        if settings.LLM_CACHE_ENABLED and self.MATRIX_TEMPERATURE == 0:
+            self.llm_cache = LLMResponseCache()
+        else:
+            self.llm_cache = None
+        if settings.MATRIX_CACHE_ENABLED and self.MATRIX_TEMPERATURE == 0:
+            self.matrix_cache = MatrixEntryCache()
+        else:
+            self.matrix_cache = None
+        # Generations in progress by (cache scope, requirement text); an identical
+        # requirement arriving meanwhile waits for the entry instead of a second call
+        self._matrix_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        logger.info("Matrix generation provider: %s", settings.MATRIX_GENERATION_PROVIDER)
+
+    async def extract_document_specifications(
+        self,
+        document_content: bytes,
+        filename: str,
+        mime_type: str,
+        file_path: Optional[str] = None,
+        content_hash: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        """
+        Step 1: Extract technical specifications from document using Gemini
+        
+        Args:
+            document_content: Raw document bytes
+            filename: Original filename
+            mime_type: MIME type of document
+            file_path: Stored copy of the document, uploaded directly when given
+            content_hash: SHA-256 digest of document_content computed at upload
+                (hashed here when not given)
+            
+        Returns:
+            Structured JSON with extracted specifications
+        """
+        if not self.gemini_extraction_model:
+            raise ValueError("Gemini API not configured")
+
+        if content_hash is None:
+            content_hash = hashlib.sha256(document_content).digest()
 
-            # Call Gemini API
-            response = await asyncio.to_thread(
-                self.gemini_matrix_model.generate_content,
-                matrix_prompt
+        # Content-addressable cache: identical bytes + model + prompt version
+        cache = ExtractionCache() if settings.EXTRACTION_CACHE_ENABLED else None
+        cache_key = None
+        if cache is not None:
+            cache_key = ExtractionCache.make_key(
+                content_hash, settings.GEMINI_MODEL_EXTRACTION, EXTRACTION_PROMPT_VERSION
+            )
+            cached = cache.get(cache_key)
+            if cached is not None and "extraction_metadata" in cached["result"]:
+                logger.info("Extraction cache hit for %s (key %s)", filename, cache_key[:12])
+                extracted_data = cached["result"]
+                extracted_data["extraction_metadata"] = {
+                    **extracted_data["extraction_metadata"],
+                    "filename": filename,
+                    "cache_hit": True,
+                    "cache_key": cache_key,
+                    "cached_at": cached.get("created_at")
+                }
+                return extracted_data
+
+        try:
+            # Upload document to Gemini (supports PDFs, images, DOCX, etc.)
+            uploaded_file = await self._gemini_file(
+                content_hash, document_content, filename, mime_type, file_path
             )
 
-            # Parse JSON response
-            response_text = response.text
-            logger.info(f"Gemini matrix response preview: {response_text[:200]}")
+            # Generate content with uploaded file and extraction prompt
+            # Runs in Celery workers, each on one persistent loop. Still the sync client
+            # on a worker thread: the SDK's async client is process-wide and bound to the
+            # first loop that uses it, while AIService is per event loop and may be driven
+            # from another loop (API process, scripts); the thread works from any of them
+            # and keeps this minutes-long call off the loop
+            # Use configurable timeout (important for gemini-2.5-pro which is slower)
+            try:
+                response = await asyncio.to_thread(
+                    self.gemini_extraction_model.generate_content,
+                    [uploaded_file, EXTRACTION_PROMPT],
+                    request_options=self._extraction_request_options
+                )
+            except Exception:
+                # The file may be gone server-side; upload afresh on the next attempt
+                AIService._gemini_files.pop(content_hash, None)
+                raise
+
+            # Parse response
+            extracted_text = response.text
+
+            # Log response info for debugging
+            response_size = len(extracted_text)
+            logger.info("Gemini response size: %s characters", response_size)
 
+            # Only cleanly parsed extractions are cached
+            parsed_ok = False
+            truncated = False
+
+            # Try to extract JSON from response
             try:
-                # Gemini JSON mode ensures valid JSON
-                matrix_entry = json.loads(response_text)
-
-                # Validate fields
-                spec_ref = matrix_entry.get("spec_reference", "")
-                supplier_resp = matrix_entry.get("supplier_response", "")
-
-                if not spec_ref or not supplier_resp:
-                    logger.warning(f"Gemini returned empty fields for requirement '{requirement[:50]}...'")
-                    if "comments" not in matrix_entry or not matrix_entry["comments"]:
-                        matrix_entry["comments"] = "Warning: AI returned empty fields - requires manual completion"
-
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON from Gemini response: {e}")
-                matrix_entry = {
-                    "spec_reference": "AI generation failed - JSON parsing error",
-                    "supplier_response": response_text[:1000] if response_text else "No response from AI",
-                    "justification": "AI-generated response could not be parsed",
-                    "compliance_status": "Requires Clarification",
-                    "confidence_score": 0,
-                    "comments": f"JSON parsing error: {str(e)}"
+                # Locate the JSON object in one scan: inside a markdown code fence
+                # (```json\n{...}\n```) or from the first "{" to the last "}"
+                match = _JSON_BLOCK_RE.search(extracted_text)
+
+                if match:
+                    json_str = match.group(1) or match.group(2)
+                    extracted_data, parsed_ok = _parse_model_json(json_str, extracted_text)
+                    if parsed_ok:
+                        logger.info("Successfully parsed JSON from Gemini response")
+                    else:
+                        # Cut off at the output token limit: keep what was extracted
+                        truncated = True
+                        logger.warning("Gemini response for %s was truncated; kept the partial extraction", filename)
+                else:
+                    # If no JSON found, structure the response
+                    logger.warning("No JSON structure found in Gemini response")
+                    extracted_data = {
+                        "extraction_method": "gemini-text-analysis",
+                        "raw_content": extracted_text[:5000],  # Truncate for storage
+                        "structured_data": self._structure_text_content(extracted_text)
+                    }
+
+            except ValueError as e:
+                logger.error("Failed to parse JSON from Gemini response: %s", e)
+                logger.error("Response size: %s chars", response_size)
+                logger.error("Response preview (first 500 chars): %s", extracted_text[:500])
+                logger.error("Response preview (last 500 chars): %s", extracted_text[-500:])
+                extracted_data = {
+                    "extraction_method": "gemini-text-fallback",
+                    "raw_content": extracted_text[:5000],
+                    "error": str(e)
                 }
 
-            # Add generation metadata
-            matrix_entry["generation_metadata"] = {
-                "model": settings.GEMINI_MODEL_MATRIX,
-                "provider": "gemini",
+            # Add metadata and quality warnings
+            extracted_data["extraction_metadata"] = {
+                "model": settings.GEMINI_MODEL_EXTRACTION,
+                "prompt_version": EXTRACTION_PROMPT_VERSION,
+                "extraction_method": "ai_based",
+                "filename": filename,
+                "mime_type": mime_type,
+                "extraction_timestamp": "auto-generated",
+                "content_length": len(document_content),
+                "temperature": 0.1,
+                "json_mode": True
+            }
+
+            # Add extraction quality warnings for GxP compliance
+            extracted_data["extraction_quality_warnings"] = [
+                "⚠️ AI-based extraction using Large Language Model (LLM)",
+                "LLM extraction is NOT guaranteed to be verbatim - it reconstructs content based on understanding",
+                "Manual verification recommended: compare extracted text with original document",
+                "For GxP compliance: perform spot-checks on critical specifications",
+                "Extraction accuracy estimated at 95-98% with current configuration",
+                "Consider using deterministic parsers (PyPDF2, python-docx) for 100% verbatim extraction"
+            ]
+            if truncated:
+                extracted_data["extraction_metadata"]["truncated"] = True
+                extracted_data["extraction_quality_warnings"].insert(
+                    0, "⚠️ INCOMPLETE: AI response was truncated - content after the cut-off is missing"
+                )
+
+            extracted_data["manual_review_recommended"] = True
+
+            if cache is not None and parsed_ok:
+                cache.set(cache_key, extracted_data, {
+                    "provider": "gemini",
+                    "model": settings.GEMINI_MODEL_EXTRACTION,
+                    "prompt_version": EXTRACTION_PROMPT_VERSION,
+                    "filename": filename,
+                    "mime_type": mime_type,
+                    "content_length": len(document_content)
+                })
+
+            logger.info("Successfully extracted specifications from %s", filename)
+            return extracted_data
+
+        except Exception as e:
+            logger.error("Document extraction failed for %s: %s", filename, e)
+            raise
+
+    async def _gemini_file(
+        self,
+        content_hash: bytes,
+        document_content: bytes,
+        filename: str,
+        mime_type: str,
+        file_path: Optional[str]
+    ) -> Any:
+        """Gemini file for a document, reusing an unexpired upload of the same bytes"""
+        files = AIService._gemini_files
+        cached = files.get(content_hash)
+        if cached is not None and cached[1] - self.GEMINI_FILE_REUSE_MARGIN > datetime.now(timezone.utc):
+            files.move_to_end(content_hash)
+            logger.info("Reusing Gemini upload %s for %s", cached[0].name, filename)
+            return cached[0]
+
+        uploaded_file = await asyncio.to_thread(
+            self._upload_document, document_content, filename, mime_type, file_path
+        )
+        expires = uploaded_file.expiration_time
+        if expires is not None:
+            if expires.tzinfo is None:
+                expires = expires.replace(tzinfo=timezone.utc)
+            files[content_hash] = (uploaded_file, expires)
+            files.move_to_end(content_hash)
+            while len(files) > self.GEMINI_FILE_CACHE_SIZE:
+                files.popitem(last=False)
+        return uploaded_file
+
+    @staticmethod
+    def _upload_document(
+        document_content: bytes,
+        filename: str,
+        mime_type: str,
+        file_path: Optional[str] = None
+    ) -> Any:
+        """
+        Upload a document to the Gemini Files API from disk (blocking; run in a thread)
+        The SDK streams the file itself, so the bytes are spooled to a temporary
+        file only when no stored copy is available
+        """
+        if file_path:
+            return genai.upload_file(path=file_path, mime_type=mime_type, display_name=filename)
+
+        with tempfile.NamedTemporaryFile(suffix=Path(filename).suffix, delete=False) as tf:
+            tf.write(document_content)
+            tmp_path = tf.name
+        try:
+            return genai.upload_file(path=tmp_path, mime_type=mime_type, display_name=filename)
+        finally:
+            os.unlink(tmp_path)
+
+    async def generate_matrix_entry(
+        self,
+        requirement: str,
+        requirement_category: str,
+        extracted_specs: Dict[str, Any],
+        project_context: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Step 2: Generate traceability matrix entry using configured AI provider (Gemini or Ollama)
+        
+        Args:
+            requirement: User requirement text
+            requirement_category: Category of the requirement
+            extracted_specs: Structured specifications from Step 1
+            project_context: Additional project context
+            use_cache: Reuse a cached response for an identical prompt (if caching is enabled)
+            
+        Returns:
+            Generated matrix entry data
+        """
+        if not use_cache or self.matrix_cache is None:
+            return await self._generate_matrix_entry_uncached(
+                requirement, requirement_category, extracted_specs, project_context, use_cache
+            )
+
+        cached_entry, cache_ref = await self._lookup_cached_matrix_entry(
+            requirement, requirement_category, extracted_specs, project_context
+        )
+        if cached_entry is not None:
+            return cached_entry
+
+        # The same requirement is already being generated against these specs (e.g.
+        # a boilerplate clause repeated in one batch): share that entry
+        inflight_key = (cache_ref[1], requirement)
+        pending = self._matrix_inflight.get(inflight_key)
+        if pending is not None:
+            shared = await asyncio.shield(pending)
+            if shared is not None:
+                return self._shared_matrix_entry(shared, requirement)
+
+        future = asyncio.get_running_loop().create_future()
+        self._matrix_inflight.setdefault(inflight_key, future)
+        matrix_entry = None
+        try:
+            matrix_entry = await self._generate_matrix_entry_uncached(
+                requirement, requirement_category, extracted_specs, project_context, use_cache
+            )
+            await self._store_cached_matrix_entry(cache_ref, requirement, matrix_entry)
+            return matrix_entry
+        finally:
+            # Only valid entries are shared; waiters generate their own otherwise
+            if self._matrix_inflight.get(inflight_key) is future:
+                del self._matrix_inflight[inflight_key]
+            future.set_result(
+                matrix_entry if matrix_entry is not None and self._is_reusable_entry(matrix_entry) else None
+            )
+
+    @staticmethod
+    def _shared_matrix_entry(matrix_entry: Dict[str, Any], requirement: str) -> Dict[str, Any]:
+        """Copy of an entry generated for an identical concurrent requirement"""
+        return {
+            **matrix_entry,
+            "generation_metadata": {
+                **matrix_entry.get("generation_metadata", {}),
                 "requirement": requirement,
-                "requirement_category": requirement_category,
-                "generation_timestamp": "auto-generated",
-                "prompt_version": "v1.0"
+                "cache_hit": True,
+                "source": "inflight"
+            }
+        }
+
+    async def _generate_matrix_entry_uncached(
+        self,
+        requirement: str,
+        requirement_category: str,
+        extracted_specs: Dict[str, Any],
+        project_context: Optional[Dict[str, Any]],
+        use_cache: bool
+    ) -> Dict[str, Any]:
+        # Dispatch to appropriate provider based on configuration
+        if settings.MATRIX_GENERATION_PROVIDER == "gemini":
+            if self._matrix_batcher is not None:
+                return await self._matrix_batcher.process({
+                    "requirement": requirement,
+                    "requirement_category": requirement_category,
+                    "extracted_specs": extracted_specs,
+                    "project_context": project_context,
+                    "use_cache": use_cache
+                })
+            logger.info("Using Gemini (%s) for matrix generation", settings.GEMINI_MODEL_MATRIX)
+            return await self._generate_matrix_with_gemini(
+                requirement, requirement_category, extracted_specs, project_context, use_cache
+            )
+        else:  # ollama
+            logger.info("Using Ollama (%s) for matrix generation", settings.OLLAMA_MODEL)
+            return await self._generate_matrix_with_ollama(
+                requirement, requirement_category, extracted_specs, project_context, use_cache
+            )
+
+    async def generate_matrix_entries(
+        self,
+        requirements: List[Dict[str, Any]]
+    ) -> List[Any]:
+        """
+        Generate matrix entries for several requirements concurrently
+        Concurrency is bounded by GEMINI_MAX_CONCURRENCY / OLLAMA_MAX_CONCURRENCY
+        
+        Args:
+            requirements: Keyword arguments for generate_matrix_entry(), one dict per requirement
+            
+        Returns:
+            Matrix entries (or the raised exception) in input order
+        """
+        return await asyncio.gather(
+            *[self.generate_matrix_entry(**req) for req in requirements],
+            return_exceptions=True
+        )
+
+    async def generate_matrix_entries_packed(
+        self,
+        requirements: List[Dict[str, Any]]
+    ) -> List[Any]:
+        """
+        Generate matrix entries for many requirements of one project
+        On Gemini, up to MATRIX_PACK_SIZE requirements share one prompt and response;
+        requirements missing from a packed response are regenerated individually.
+        Requirements found in the matrix entry cache or the LLM response cache are
+        left out of the packs, and packed responses are stored in both per requirement.
+        Ollama (small context) and MATRIX_USE_RAG (per-requirement prompts) fall back
+        to generate_matrix_entries()
+
+        Args:
+            requirements: Keyword arguments for generate_matrix_entry(), all with the
+                same extracted_specs
+
+        Returns:
+            Matrix entries (or the raised exception) in input order
+        """
+        pack_size = settings.MATRIX_PACK_SIZE
+        if (
+            settings.MATRIX_GENERATION_PROVIDER != "gemini"
+            or settings.MATRIX_USE_RAG
+            or pack_size <= 1
+        ):
+            return await self.generate_matrix_entries(requirements)
+
+        results: List[Any] = [None] * len(requirements)
+        cache_refs: List[Optional[Tuple[str, str]]] = [None] * len(requirements)
+        misses = []
+        # Repeats of a missed requirement (same scope and text) -> index generating it
+        duplicates: Dict[int, int] = {}
+        first_miss: Dict[Tuple[str, str], int] = {}
+        for i, req in enumerate(requirements):
+            if req.get("use_cache", True) and self.matrix_cache is not None:
+                results[i], cache_refs[i] = await self._lookup_cached_matrix_entry(
+                    req["requirement"], req["requirement_category"],
+                    req["extracted_specs"], req.get("project_context")
+                )
+            if results[i] is None:
+                if cache_refs[i] is not None:
+                    original = first_miss.setdefault((cache_refs[i][1], req["requirement"]), i)
+                    if original != i:
+                        duplicates[i] = original
+                        continue
+                misses.append(i)
+
+        # Requirements answered by the LLM response cache need no packed prompt
+        llm_cache_keys: Dict[int, Optional[str]] = {}
+        if misses and self.llm_cache is not None:
+            miss_requirements = [requirements[i] for i in misses]
+            cached, keys = await self._lookup_batched_gemini_responses(
+                self._gemini_batch_prompt_prefix(miss_requirements), miss_requirements
+            )
+            remaining = []
+            for i, matrix_entry, key in zip(misses, cached, keys):
+                if matrix_entry is None:
+                    llm_cache_keys[i] = key
+                    remaining.append(i)
+                    continue
+                results[i] = matrix_entry
+                if cache_refs[i] is not None:
+                    await self._store_cached_matrix_entry(cache_refs[i], requirements[i]["requirement"], matrix_entry)
+            misses = remaining
+        if not misses:
+            return await self._fill_packed_duplicates(requirements, results, duplicates)
+
+        packs = [misses[i:i + pack_size] for i in range(0, len(misses), pack_size)]
+        logger.info("Generating %s matrix entries in %s packed Gemini prompts", len(misses), len(packs))
+        pack_results = await asyncio.gather(
+            *[
+                self._generate_matrix_batch_with_gemini(
+                    [requirements[i] for i in pack],
+                    cache_keys=[llm_cache_keys.get(i) for i in pack] if llm_cache_keys else None
+                )
+                for pack in packs
+            ],
+            return_exceptions=True
+        )
+
+        for pack, pack_result in zip(packs, pack_results):
+            if isinstance(pack_result, Exception):
+                for i in pack:
+                    results[i] = pack_result
+                continue
+            for i, matrix_entry in zip(pack, pack_result):
+                results[i] = matrix_entry
+                if cache_refs[i] is not None:
+                    await self._store_cached_matrix_entry(
+                        cache_refs[i], requirements[i]["requirement"], matrix_entry
+                    )
+
+        return await self._fill_packed_duplicates(requirements, results, duplicates)
+
+    async def _fill_packed_duplicates(
+        self,
+        requirements: List[Dict[str, Any]],
+        results: List[Any],
+        duplicates: Dict[int, int]
+    ) -> List[Any]:
+        """Give repeated requirements a copy of their original's entry, regenerating unusable ones"""
+        regenerate = []
+        for i, original in duplicates.items():
+            if isinstance(results[original], Exception) or not self._is_reusable_entry(results[original]):
+                regenerate.append(i)
+            else:
+                results[i] = self._shared_matrix_entry(results[original], requirements[i]["requirement"])
+        if regenerate:
+            regenerated = await self.generate_matrix_entries([requirements[i] for i in regenerate])
+            for i, matrix_entry in zip(regenerate, regenerated):
+                results[i] = matrix_entry
+        return results
+
+    def _specs_digest(self, extracted_specs: Dict[str, Any]) -> str:
+        """
+        Stable hash of extracted_specs, once per specs object
+        Kept on the class: MatrixGenerator hands every request the same cached dict per project
+        """
+        return self._specs_cached(
+            AIService._specs_digest_cache,
+            extracted_specs,
+            lambda: hashlib.sha256(
+                orjson.dumps(extracted_specs, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+            ).hexdigest()
+        )
+
+    def _specs_cached(
+        self,
+        cache: "OrderedDict[int, Tuple[Dict[str, Any], Any]]",
+        extracted_specs: Dict[str, Any],
+        compute: Callable[[], Any]
+    ) -> Any:
+        """
+        Value derived from an extracted_specs object, computed once per object
+        The reference is kept alongside the value so a recycled id() can never match
+        """
+        key = id(extracted_specs)
+        cached = cache.get(key)
+        if cached is not None and cached[0] is extracted_specs:
+            cache.move_to_end(key)
+            return cached[1]
+        value = compute()
+        cache[key] = (extracted_specs, value)
+        cache.move_to_end(key)
+        while len(cache) > self.SPECS_CACHE_SIZE:
+            cache.popitem(last=False)
+        return value
+
+    async def _lookup_cached_matrix_entry(
+        self,
+        requirement: str,
+        requirement_category: str,
+        extracted_specs: Dict[str, Any],
+        project_context: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[Dict[str, Any]], Tuple[str, str]]:
+        """
+        Look a requirement up in the matrix entry cache
+
+        Returns:
+            (entry, cache_ref): the cached entry or None on miss, and the (key, scope)
+            to store a freshly generated entry under
+        """
+        model = (
+            settings.GEMINI_MODEL_MATRIX if settings.MATRIX_GENERATION_PROVIDER == "gemini"
+            else settings.OLLAMA_MODEL
+        )
+        scope = MatrixEntryCache.make_scope(
+            model, MATRIX_PROMPT_VERSION, self._specs_digest(extracted_specs), requirement_category
+        )
+        key = MatrixEntryCache.make_key(scope, requirement, project_context)
+
+        hit = await self.matrix_cache.lookup(key, scope, requirement)
+        if hit is None:
+            return None, (key, scope)
+
+        matrix_entry, tier, similarity = hit
+        logger.info("Matrix cache %s hit (%.2f) for requirement: %s...", tier, similarity, requirement[:50])
+        metadata = matrix_entry.setdefault("generation_metadata", {})
+        metadata.update({
+            "requirement": requirement,
+            "cache_hit": True,
+            "source": f"{tier}_cache",
+            "cache_similarity": round(similarity, 4)
+        })
+        return matrix_entry, (key, scope)
+
+    async def _store_cached_matrix_entry(
+        self,
+        cache_ref: Tuple[str, str],
+        requirement: str,
+        matrix_entry: Dict[str, Any]
+    ) -> None:
+        """Cache a generated entry unless it is an error placeholder, invalid, or itself a cache hit"""
+        if not self._is_reusable_entry(matrix_entry) or matrix_entry.get("generation_metadata", {}).get("source"):
+            return
+        key, scope = cache_ref
+        await self.matrix_cache.set(key, scope, requirement, matrix_entry)
+
+    def _is_reusable_entry(self, matrix_entry: Dict[str, Any]) -> bool:
+        """Whether an entry may answer other requirements (not an error placeholder or invalid)"""
+        return "generation_error" not in matrix_entry and self._matrix_entry_error(matrix_entry) is None
+
+    def _specs_json(self, extracted_specs: Dict[str, Any]) -> str:
+        """Serialize extracted_specs for a matrix prompt, once per specs object"""
+        return self._specs_cached(self._specs_json_cache, extracted_specs, lambda: _prompt_json(extracted_specs))
+
+    def _matrix_specs_block(
+        self,
+        extracted_specs: Dict[str, Any],
+        requirement: str,
+        requirement_category: str
+    ) -> str:
+        """
+        Supplier document section of a matrix prompt
+        With MATRIX_USE_RAG only the top-k sections for the requirement are included
+        """
+        if not settings.MATRIX_USE_RAG:
+            return f"SUPPLIER SPECIFICATION DOCUMENT (complete raw extraction):\n{self._specs_json(extracted_specs)}"
+
+        index = self._specs_cached(
+            self._section_index_cache, extracted_specs, lambda: SectionIndex(extracted_specs)
+        )
+
+        sections = index.top_k(f"{requirement_category} {requirement}", settings.MATRIX_RAG_TOP_K)
+        logger.info("Selected %s of %s sections for requirement: %s...", len(sections), len(index), requirement[:50])
+        return (
+            "SUPPLIER SPECIFICATION DOCUMENT (most relevant sections only):\n"
+            + orjson.dumps(sections, option=orjson.OPT_NON_STR_KEYS).decode()
+        )
+
+    def _matrix_cache_key(self, model: str, matrix_prompt: str, use_cache: bool) -> Optional[str]:
+        """Cache key for a matrix prompt, or None when the response cache is not used"""
+        if not use_cache or self.llm_cache is None:
+            return None
+        return LLMResponseCache.make_key(model, MATRIX_PROMPT_VERSION, matrix_prompt)
+
+    # ==================== OLLAMA-BASED MATRIX GENERATION ====================
+    async def _generate_matrix_with_ollama(
+        self,
+        requirement: str,
+        requirement_category: str,
+        extracted_specs: Dict[str, Any],
+        project_context: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Generate matrix entry using local Ollama/Llama model (FREE but less accurate with 3B)"""
+        try:
+            # Prepare generation prompt for traceability matrix with raw document
+            matrix_prompt = OLLAMA_MATRIX_PROMPT_TEMPLATE.format(
+                specs=self._matrix_specs_block(extracted_specs, requirement, requirement_category),
+                context=_prompt_json(project_context or {}),
+                category=requirement_category,
+                requirement=requirement
+            )
+
+            # Log prompt diagnostics to identify if prompt is too large (debug only:
+            # the specs JSON is shared, but these run for every requirement)
+            if logger.isEnabledFor(logging.DEBUG):
+                prompt_length = len(matrix_prompt)
+                logger.debug("Prompt length: %s characters (%sKB)", prompt_length, prompt_length // 1024)
+                logger.debug("Document count in extracted_specs: %s", len(extracted_specs.get('documents', [])))
+
+                # Log document structure details
+                if extracted_specs.get('documents'):
+                    first_doc = extracted_specs['documents'][0]
+                    sections_count = len(first_doc.get('sections', []))
+                    logger.debug("First document has %s sections", sections_count)
+                    if sections_count > 0:
+                        first_section = first_doc['sections'][0]
+                        content_length = len(str(first_section.get('content', '')))
+                        logger.debug("First section content length: %s characters", content_length)
+
+            cache_key = self._matrix_cache_key(settings.OLLAMA_MODEL, matrix_prompt, use_cache)
+            cached_text = await self.llm_cache.get(cache_key) if cache_key else None
+
+            if cached_text is not None:
+                logger.info("LLM cache hit for requirement: %s...", requirement[:50])
+                matrix_entry = self._parse_ollama_matrix_response(
+                    cached_text, requirement, requirement_category
+                )
+                matrix_entry["generation_metadata"]["cache_hit"] = True
+            else:
+                prompt = matrix_prompt
+                for attempt in range(self.MATRIX_MAX_RETRIES + 1):
+                    # Only the model call holds a concurrency slot, not the retry backoff
+                    async with self._ollama_sem:
+                        response_text = await self._stream_ollama_matrix_json(prompt)
+                    # Parse response (with format parameter, response is pure JSON)
+                    matrix_entry = self._parse_ollama_matrix_response(
+                        response_text, requirement, requirement_category
+                    )
+
+                    if not await self._retry_invalid_matrix_entry(matrix_entry, requirement, attempt):
+                        break
+                    prompt = self._matrix_retry_prompt(matrix_prompt, self._matrix_entry_error(matrix_entry))
+
+                if cache_key and self._matrix_entry_error(matrix_entry) is None:
+                    await self.llm_cache.set(cache_key, response_text)
+
+            logger.info("Successfully generated matrix entry for requirement: %s...", requirement[:50])
+            return matrix_entry
+
+        except Exception as e:
+            logger.error("Matrix generation failed for requirement '%s': %s", requirement, e)
+            # Return error entry that can still be used
+            return self._matrix_error_entry(e)
+
+    async def _stream_ollama_matrix_json(self, prompt: str) -> str:
+        """
+        Stream a matrix response from Ollama and return its JSON object text
+        Generation is cut off as soon as the top-level object closes, so trailing
+        whitespace the model may emit up to num_predict is never generated.
+        It is also cut off once OLLAMA_STREAM_BUDGET_SECONDS have passed since the
+        first token; the partial object then parses as truncated, which
+        _matrix_entry_error reports so the call is retried and never cached
+        """
+        start = time.perf_counter()
+        # Call Ollama with local Llama model using structured JSON output
+        stream = await self.ollama_client.generate(
+            model=settings.OLLAMA_MODEL,
+            prompt=prompt,
+            format=self.MATRIX_ENTRY_SCHEMA,  # Force JSON schema compliance
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,  # Keep the model loaded between calls
+            stream=True,
+            options={
+                'temperature': self.MATRIX_TEMPERATURE,  # Deterministic output for consistency
+                'top_p': 0.9,
+                'num_predict': OLLAMA_NUM_PREDICT,  # Increased limit for longer responses
+                'num_ctx': self._ollama_num_ctx(prompt)
+            }
+        )
+
+        scanner = _JsonObjectScanner()
+        parts: List[str] = []
+        chunks = 0
+        final = None
+        timed_out = False
+        budget = settings.OLLAMA_STREAM_BUDGET_SECONDS
+        try:
+            # No deadline until the first token: it includes loading the model
+            async with asyncio.timeout(None) as deadline:
+                async for chunk in stream:
+                    if chunks == 0 and budget > 0:
+                        deadline.reschedule(asyncio.get_running_loop().time() + budget)
+                    chunks += 1
+                    text = chunk['response']
+                    end = scanner.feed(text)
+                    if end is not None:
+                        parts.append(text[:end])
+                        break
+                    parts.append(text)
+                    if chunk.get('done'):
+                        final = chunk
+        except TimeoutError:
+            timed_out = True
+        finally:
+            # Closing the stream drops the connection, which stops generation on the server
+            await stream.aclose()
+
+        # Log response metadata (server totals only arrive when the stream ran to the end)
+        if timed_out:
+            logger.warning("Ollama response cut off after %s chunks: generation exceeded %ss budget",
+                          chunks, budget)
+        elif final is not None:
+            logger.warning("Ollama response metadata - model: %s, total_duration: %.2fs, "
+                          "prompt_eval_count: %s, eval_count: %s",
+                          final.get('model', 'unknown'), final.get('total_duration', 0) / 1e9,
+                          final.get('prompt_eval_count', 0), final.get('eval_count', 0))
+        else:
+            logger.warning("Ollama response streamed - %s chunks in %.2fs, stopped at end of JSON object",
+                          chunks, time.perf_counter() - start)
+        return "".join(parts)
+
+    @staticmethod
+    def _ollama_num_ctx(prompt: str) -> int:
+        """
+        Smallest power-of-two context window that fits the prompt and the response
+        Power-of-two steps keep the value stable across similar prompts (Ollama
+        reloads the model whenever num_ctx changes)
+        """
+        # ~4 characters per token for English text
+        estimated_tokens = len(prompt) // 4
+        num_ctx = min(
+            OLLAMA_MAX_CTX,
+            max(2048, 2 ** math.ceil(math.log2(estimated_tokens + OLLAMA_NUM_PREDICT)))
+        )
+        logger.info("Ollama prompt ~%s tokens, num_ctx=%s", estimated_tokens, num_ctx)
+        return num_ctx
+
+    def _parse_ollama_matrix_response(
+        self,
+        response_text: str,
+        requirement: str,
+        requirement_category: str
+    ) -> Dict[str, Any]:
+        """Parse an Ollama matrix response into a matrix entry with generation metadata"""
+        logger.warning("Raw Llama response for requirement '%s...': %s", requirement[:50], response_text[:1000])
+
+        schema_error = None
+        complete = True
+        try:
+            # Direct JSON parsing (format parameter ensures valid JSON unless cut off)
+            matrix_entry, complete = _parse_model_json(response_text)
+            if not complete:
+                logger.warning("Llama response for requirement '%s...' was truncated", requirement[:50])
+            # format= constrains decoding; validate anyway before the entry is stored
+            schema_error = self._validate_matrix_entry(matrix_entry)
+
+            # Validate that Llama provided meaningful content
+            spec_ref = matrix_entry.get("spec_reference", "")
+            supplier_resp = matrix_entry.get("supplier_response", "")
+
+            if not spec_ref or not supplier_resp or spec_ref == "" or supplier_resp == "":
+                logger.warning("Llama returned empty/missing fields for requirement '%s...'", requirement[:50])
+                logger.warning("spec_reference: '%s', supplier_response: '%s'", spec_ref, supplier_resp)
+                logger.warning("Full Llama response: %s", response_text)
+
+                # Add warning to comments if fields are empty
+                if "comments" not in matrix_entry or not matrix_entry["comments"]:
+                    matrix_entry["comments"] = "Warning: AI returned empty fields - requires manual completion"
+                else:
+                    matrix_entry["comments"] += " | Warning: Some fields were empty in AI response"
+
+        except ValueError as e:
+            logger.error("Failed to parse JSON from Ollama response: %s", e)
+            logger.error("Response text that failed to parse: %s", response_text)
+            matrix_entry = {
+                "spec_reference": MATRIX_PARSE_ERROR_REFERENCE,
+                "supplier_response": response_text[:1000] if response_text else "No response from AI",
+                "justification": "AI-generated response could not be parsed",
+                "compliance_status": "Requires Clarification",
+                "confidence_score": 0,
+                "comments": f"JSON parsing error: {str(e)}"
             }
 
-            logger.info(f"Successfully generated matrix entry for requirement: {requirement[:50]}...")
+        # Add generation metadata
+        matrix_entry["generation_metadata"] = {
+            "model": settings.OLLAMA_MODEL,
+            "requirement": requirement,
+            "requirement_category": requirement_category,
+            "generation_timestamp": "auto-generated",
+            "prompt_version": MATRIX_PROMPT_VERSION
+        }
+        if not complete:
+            self._mark_truncated_matrix_entry(matrix_entry)
+        if schema_error:
+            logger.warning("Matrix entry failed schema validation for requirement '%s...': %s",
+                           requirement[:50], schema_error)
+            matrix_entry["generation_metadata"]["schema_error"] = schema_error
+        return matrix_entry
+
+    # ==================== GEMINI-BASED MATRIX GENERATION ====================
+    async def _generate_matrix_with_gemini(
+        self,
+        requirement: str,
+        requirement_category: str,
+        extracted_specs: Dict[str, Any],
+        project_context: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Generate matrix entry using Google Gemini API (PAID but more accurate)"""
+        if not self.gemini_matrix_model:
+            raise ValueError("Gemini API not configured")
+
+        try:
+            # Prepare generation prompt (shared prefix + per-requirement suffix)
+            prompt_prefix, prompt_suffix = self._build_gemini_matrix_prompt(
+                requirement, requirement_category, extracted_specs, project_context
+            )
+            matrix_prompt = prompt_prefix + prompt_suffix
+
+            # Log diagnostics
+            prompt_length = len(matrix_prompt)
+            logger.info("Gemini matrix prompt length: %s characters (%sKB)", prompt_length, prompt_length // 1024)
+            logger.info("Document count: %s", len(extracted_specs.get('documents', [])))
+
+            cache_key = self._matrix_cache_key(settings.GEMINI_MODEL_MATRIX, matrix_prompt, use_cache)
+            cached_text = await self.llm_cache.get(cache_key) if cache_key else None
+
+            if cached_text is not None:
+                logger.info("LLM cache hit for requirement: %s...", requirement[:50])
+                matrix_entry = self._parse_gemini_matrix_response(
+                    cached_text, requirement, requirement_category
+                )
+                matrix_entry["generation_metadata"]["cache_hit"] = True
+            else:
+                suffix = prompt_suffix
+                for attempt in range(self.MATRIX_MAX_RETRIES + 1):
+                    # Call Gemini API (native async gRPC, no worker thread per call); only
+                    # the call holds a concurrency slot, not the retry backoff
+                    async with self._gemini_sem:
+                        response = await self._generate_gemini_matrix_content(prompt_prefix, suffix)
+                    response_text = response.text
+                    logger.info("Gemini matrix response preview: %s", response_text[:200])
+
+                    # Parse JSON response
+                    matrix_entry = self._parse_gemini_matrix_response(
+                        response_text, requirement, requirement_category
+                    )
+
+                    if not await self._retry_invalid_matrix_entry(matrix_entry, requirement, attempt):
+                        break
+                    suffix = self._matrix_retry_prompt(prompt_suffix, self._matrix_entry_error(matrix_entry))
+
+                if cache_key and self._matrix_entry_error(matrix_entry) is None:
+                    await self.llm_cache.set(cache_key, response_text)
+
+            logger.info("Successfully generated matrix entry for requirement: %s...", requirement[:50])
             return matrix_entry
 
         except Exception as e:
-            logger.error(f"Gemini matrix generation failed for requirement '{requirement}': {e}")
-            return {
-                "spec_reference": "AI generation failed",
-                "supplier_response": "Error during AI processing",
-                "justification": f"AI service error: {str(e)}",
+            logger.error("Gemini matrix generation failed for requirement '%s': %s", requirement, e)
+            return self._matrix_error_entry(e)
+
+    def _gemini_batch_prompt_prefix(self, items: List[Dict[str, Any]]) -> str:
+        """Prompt prefix shared by requirements batched against one extracted_specs"""
+        first = items[0]
+        prompt_prefix, _ = self._build_gemini_matrix_prompt(
+            first["requirement"], first["requirement_category"], first["extracted_specs"]
+        )
+        return prompt_prefix
+
+    async def _lookup_batched_gemini_responses(
+        self,
+        prompt_prefix: str,
+        items: List[Dict[str, Any]]
+    ) -> Tuple[List[Optional[Dict[str, Any]]], List[Optional[str]]]:
+        """
+        Look batched requirements up in the LLM response cache, each under the key of
+        its single-requirement prompt (so both paths share entries), honouring use_cache
+
+        Returns:
+            (entries, cache_keys): the cached entry or None per item, and the key to
+            store a generated response under (None when not cached)
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        cache_keys: List[Optional[str]] = []
+        for i, item in enumerate(items):
+            prompt_suffix = GEMINI_MATRIX_PROMPT_SUFFIX_TEMPLATE.format(
+                context=_prompt_json(item.get("project_context") or {}),
+                category=item["requirement_category"],
+                requirement=item["requirement"]
+            )
+            cache_key = self._matrix_cache_key(
+                settings.GEMINI_MODEL_MATRIX, prompt_prefix + prompt_suffix, item.get("use_cache", True)
+            )
+            cache_keys.append(cache_key)
+            cached_text = await self.llm_cache.get(cache_key) if cache_key else None
+            if cached_text is not None:
+                logger.info("LLM cache hit for requirement: %s...", item["requirement"][:50])
+                results[i] = self._parse_gemini_matrix_response(
+                    cached_text, item["requirement"], item["requirement_category"]
+                )
+                results[i]["generation_metadata"]["cache_hit"] = True
+        return results, cache_keys
+
+    async def _generate_matrix_batch_with_gemini(
+        self,
+        items: List[Dict[str, Any]],
+        cache_keys: Optional[List[Optional[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate matrix entries for several requirements with one Gemini call
+        Requirements are first looked up in the LLM response cache, and valid entries
+        from the combined response are stored there. Requirements missing or invalid
+        in the combined response are regenerated individually, so every item still
+        gets a usable entry
+        
+        Args:
+            items: generate_matrix_entry() keyword arguments sharing one extracted_specs
+            cache_keys: LLM cache keys of items already looked up by the caller (all
+                misses); skips the lookup
+            
+        Returns:
+            Matrix entries in input order
+        """
+        if len(items) == 1:
+            return [await self._generate_matrix_with_gemini(**items[0])]
+
+        prompt_prefix = self._gemini_batch_prompt_prefix(items)
+        if cache_keys is None:
+            results, cache_keys = await self._lookup_batched_gemini_responses(prompt_prefix, items)
+        else:
+            results = [None] * len(items)
+
+        misses = [i for i, entry in enumerate(results) if entry is None]
+        if len(misses) <= 1:
+            for i in misses:
+                results[i] = await self._generate_matrix_with_gemini(**items[i])
+            return results
+
+        requirements = [
+            {
+                "id": str(i),
+                "category": items[i]["requirement_category"],
+                "requirement": items[i]["requirement"],
+                "project_context": items[i].get("project_context") or {}
+            }
+            for i in misses
+        ]
+        prompt_suffix = f"""
+REQUIREMENTS TO VALIDATE (assess each one independently):
+{_prompt_json(requirements)}
+
+Output a JSON object {{"entries": [...]}} with exactly one entry per requirement above.
+Each entry is the JSON object described above plus an "id" field copied from its requirement."""
+
+        entries_by_id: Dict[str, Dict[str, Any]] = {}
+        try:
+            async with self._gemini_sem:
+                response = await self._generate_gemini_matrix_content(prompt_prefix, prompt_suffix)
+            payload = from_json(response.text, cache_strings="all")
+            for entry in payload.get("entries", []):
+                if isinstance(entry, dict):
+                    entries_by_id[str(entry.pop("id", ""))] = entry
+        except Exception as e:
+            logger.error("Gemini micro-batch of %s requirements failed: %s", len(misses), e)
+
+        retry_indexes = []
+        for i in misses:
+            item = items[i]
+            entry = entries_by_id.get(str(i))
+            if entry is None or self._validate_matrix_entry(entry) is not None:
+                retry_indexes.append(i)
+                continue
+            if cache_keys[i]:
+                await self.llm_cache.set(cache_keys[i], orjson.dumps(entry).decode())
+            entry["generation_metadata"] = {
+                "model": settings.GEMINI_MODEL_MATRIX,
+                "provider": "gemini",
+                "requirement": item["requirement"],
+                "requirement_category": item["requirement_category"],
+                "generation_timestamp": "auto-generated",
+                "prompt_version": MATRIX_PROMPT_VERSION,
+                "micro_batch_size": len(misses)
+            }
+            results[i] = entry
+
+        if retry_indexes:
+            logger.warning(
+                "Regenerating %s of %s micro-batched requirements individually", len(retry_indexes), len(misses)
+            )
+            regenerated = await asyncio.gather(*[self._generate_matrix_with_gemini(**items[i]) for i in retry_indexes])
+            for i, entry in zip(retry_indexes, regenerated):
+                results[i] = entry
+
+        logger.info("Generated %s matrix entries in one Gemini micro-batch", len(misses))
+        return results
+
+    async def _gemini_matrix_model_for_prefix(self, prompt_prefix: str) -> Tuple[Any, bool]:
+        """
+        Matrix model bound to a Gemini context cache holding the shared prompt prefix
+        One cache is created per distinct prefix (i.e. per project/specs) and reused
+        
+        Returns:
+            (model, prefix_cached): the plain matrix model and False when the prefix is
+            too small to cache or caching is unavailable
+        """
+        # With MATRIX_USE_RAG the prefix differs per requirement, so caching it never pays off
+        if (
+            not settings.GEMINI_CONTEXT_CACHE_ENABLED
+            or settings.MATRIX_USE_RAG
+            or len(prompt_prefix) < GEMINI_CONTEXT_CACHE_MIN_CHARS
+        ):
+            return self.gemini_matrix_model, False
+
+        key = hashlib.sha256(prompt_prefix.encode()).hexdigest()
+        models = self._gemini_context_models
+        # Serialize creation so concurrent requirements share one cache
+        async with self._gemini_context_lock:
+            now = datetime.now(timezone.utc)
+            cached = models.get(key)
+            if cached is not None:
+                # Recreate a cache about to expire; retry a failed creation after the backoff
+                margin = self.GEMINI_CONTEXT_REFRESH_MARGIN if cached[0] is not None else timedelta(0)
+                if cached[1] - margin <= now:
+                    cached = None
+            if cached is None:
+                ttl = timedelta(seconds=settings.GEMINI_CONTEXT_CACHE_TTL)
+                try:
+                    cached_content = await asyncio.to_thread(
+                        genai.caching.CachedContent.create,
+                        model=settings.GEMINI_MODEL_MATRIX,
+                        display_name=f"matrix-prefix-{key[:12]}",
+                        contents=[prompt_prefix],
+                        ttl=ttl
+                    )
+                    model = genai.GenerativeModel.from_cached_content(
+                        cached_content,
+                        generation_config=self.gemini_matrix_generation_config
+                    )
+                    cached = (model, now + ttl)
+                    logger.info("Created Gemini context cache %s (%s chars)", cached_content.name, len(prompt_prefix))
+                except Exception as e:
+                    logger.warning("Gemini context caching unavailable, sending full prompts: %s", e)
+                    cached = (None, now + self.GEMINI_CONTEXT_RETRY_BACKOFF)
+                models[key] = cached
+            models.move_to_end(key)
+            while len(models) > self.GEMINI_CONTEXT_CACHE_SIZE:
+                models.popitem(last=False)
+
+        model = cached[0]
+        if model is None:
+            return self.gemini_matrix_model, False
+        return model, True
+
+    async def _generate_gemini_matrix_content(self, prompt_prefix: str, prompt_suffix: str) -> Any:
+        """
+        Gemini matrix call for a prompt split into shared prefix and per-call suffix,
+        sending only the suffix when the prefix is context-cached
+        A context cache deleted or expired server-side is dropped and the call is
+        repeated with the full prompt
+        """
+        model, prefix_cached = await self._gemini_matrix_model_for_prefix(prompt_prefix)
+        await wait_for_gemini_rate_limit()
+        if prefix_cached:
+            try:
+                return await model.generate_content_async(prompt_suffix)
+            except (google_exceptions.NotFound, google_exceptions.PermissionDenied) as e:
+                logger.warning("Gemini context cache unusable, sending the full prompt: %s", e)
+                key = hashlib.sha256(prompt_prefix.encode()).hexdigest()
+                async with self._gemini_context_lock:
+                    if self._gemini_context_models.get(key, (None,))[0] is model:
+                        del self._gemini_context_models[key]
+                await wait_for_gemini_rate_limit()
+        return await self.gemini_matrix_model.generate_content_async(prompt_prefix + prompt_suffix)
+
+    def _build_gemini_matrix_prompt(
+        self,
+        requirement: str,
+        requirement_category: str,
+        extracted_specs: Dict[str, Any],
+        project_context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, str]:
+        """
+        Build the Gemini matrix generation prompt for one requirement
+        
+        Returns:
+            (prefix, suffix): the prefix (instructions + supplier document) is identical
+            for every requirement of a project so it can be served from a context cache
+        """
+        prefix = GEMINI_MATRIX_PROMPT_PREFIX_TEMPLATE.format(
+            specs=self._matrix_specs_block(extracted_specs, requirement, requirement_category)
+        )
+        suffix = GEMINI_MATRIX_PROMPT_SUFFIX_TEMPLATE.format(
+            context=_prompt_json(project_context or {}),
+            category=requirement_category,
+            requirement=requirement
+        )
+        return prefix, suffix
+
+    def _parse_gemini_matrix_response(
+        self,
+        response_text: str,
+        requirement: str,
+        requirement_category: str
+    ) -> Dict[str, Any]:
+        """Parse a Gemini matrix response into a matrix entry with generation metadata"""
+        schema_error = None
+        complete = True
+        try:
+            # Gemini JSON mode ensures valid JSON unless cut off
+            matrix_entry, complete = _parse_model_json(response_text)
+            if not complete:
+                logger.warning("Gemini response for requirement '%s...' was truncated", requirement[:50])
+            schema_error = self._validate_matrix_entry(matrix_entry)
+
+            # Validate fields
+            spec_ref = matrix_entry.get("spec_reference", "")
+            supplier_resp = matrix_entry.get("supplier_response", "")
+
+            if not spec_ref or not supplier_resp:
+                logger.warning("Gemini returned empty fields for requirement '%s...'", requirement[:50])
+                if "comments" not in matrix_entry or not matrix_entry["comments"]:
+                    matrix_entry["comments"] = "Warning: AI returned empty fields - requires manual completion"
+
+        except ValueError as e:
+            logger.error("Failed to parse JSON from Gemini response: %s", e)
+            matrix_entry = {
+                "spec_reference": MATRIX_PARSE_ERROR_REFERENCE,
+                "supplier_response": response_text[:1000] if response_text else "No response from AI",
+                "justification": "AI-generated response could not be parsed",
                 "compliance_status": "Requires Clarification",
                 "confidence_score": 0,
-                "comments": "Manual review required due to AI processing error",
-                "generation_error": str(e)
+                "comments": f"JSON parsing error: {str(e)}"
+            }
+
+        # Add generation metadata
+        matrix_entry["generation_metadata"] = {
+            "model": settings.GEMINI_MODEL_MATRIX,
+            "provider": "gemini",
+            "requirement": requirement,
+            "requirement_category": requirement_category,
+            "generation_timestamp": "auto-generated",
+            "prompt_version": MATRIX_PROMPT_VERSION
+        }
+        if not complete:
+            self._mark_truncated_matrix_entry(matrix_entry)
+        if schema_error:
+            logger.warning("Matrix entry failed schema validation for requirement '%s...': %s",
+                           requirement[:50], schema_error)
+            matrix_entry["generation_metadata"]["schema_error"] = schema_error
+        return matrix_entry
+
+    @staticmethod
+    def _validate_matrix_entry(matrix_entry: Any) -> Optional[str]:
+        """
+        Validate a parsed model response against MATRIX_ENTRY_SCHEMA
+        
+        Returns:
+            Description of the schema violations, or None if the entry is valid
+        """
+        try:
+            _MATRIX_ENTRY_ADAPTER.validate_python(matrix_entry)
+        except ValidationError as e:
+            return "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc']) or 'entry'}: {err['msg']}"
+                for err in e.errors()
+            )
+        return None
+
+    @staticmethod
+    def _mark_truncated_matrix_entry(matrix_entry: Dict[str, Any]) -> None:
+        """Flag an entry parsed from a cut-off response: it is retried and never cached"""
+        matrix_entry["generation_metadata"]["truncated"] = True
+        warning = "⚠️ INCOMPLETE: AI response was truncated - content after the cut-off is missing"
+        matrix_entry["comments"] = f"{matrix_entry['comments']} | {warning}" if matrix_entry.get("comments") else warning
+
+    @staticmethod
+    def _matrix_entry_error(matrix_entry: Dict[str, Any]) -> Optional[str]:
+        """Why a parsed matrix entry is unusable (JSON, schema or truncation error), or None if it is valid"""
+        if matrix_entry.get("spec_reference") == MATRIX_PARSE_ERROR_REFERENCE:
+            return matrix_entry.get("comments")
+        metadata = matrix_entry.get("generation_metadata", {})
+        if metadata.get("schema_error"):
+            return metadata["schema_error"]
+        if metadata.get("truncated"):
+            return MATRIX_TRUNCATED_ERROR
+        return None
+
+    async def _retry_invalid_matrix_entry(
+        self,
+        matrix_entry: Dict[str, Any],
+        requirement: str,
+        attempt: int
+    ) -> bool:
+        """
+        Decide whether to re-ask the model after an invalid matrix response
+        Sleeps with linear backoff before a retry
+        
+        Returns:
+            True if the caller should retry with feedback
+        """
+        error = self._matrix_entry_error(matrix_entry)
+        if error is None:
+            return False
+        if attempt >= self.MATRIX_MAX_RETRIES:
+            logger.error(
+                "Matrix output for requirement '%s...' still invalid after %s attempts: %s",
+                requirement[:50], attempt + 1, error
+            )
+            return False
+
+        logger.warning(
+            "Invalid matrix output for requirement '%s...' (attempt %s), retrying with feedback: %s",
+            requirement[:50], attempt + 1, error
+        )
+        await asyncio.sleep(1.0 * (attempt + 1))
+        return True
+
+    @staticmethod
+    def _matrix_retry_prompt(matrix_prompt: str, error: str) -> str:
+        """Original prompt plus feedback on the previous invalid output"""
+        return (
+            f"{matrix_prompt}\n\nPrevious output had error: {error}. "
+            "Return only valid JSON matching the schema."
+        )
+
+    @staticmethod
+    def _matrix_error_entry(error: Any) -> Dict[str, Any]:
+        """Placeholder matrix entry returned when AI generation fails"""
+        return {
+            "spec_reference": "AI generation failed",
+            "supplier_response": "Error during AI processing",
+            "justification": f"AI service error: {str(error)}",
+            "compliance_status": "Requires Clarification",
+            "confidence_score": 0,
+            "comments": "Manual review required due to AI processing error",
+            "generation_error": str(error)
+        }
+
+    # ==================== GEMINI BATCH MODE (NON-INTERACTIVE) ====================
+    async def generate_matrix_entries_batch(
+        self,
+        requirements: List[Dict[str, Any]],
+        extracted_specs: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate matrix entries for many requirements as one Gemini Batch Mode job
+        Batch jobs are billed at half price but may take up to 24h, so this is
+        meant for bulk, non-interactive builds; generate_matrix_entry() remains
+        the interactive path.
+
+        Args:
+            requirements: Dicts with "key", "requirement", "requirement_category"
+                and optional "project_context"
+            extracted_specs: Structured specifications from Step 1
+
+        Returns:
+            Matrix entries keyed by each requirement's "key"
+        """
+        if not self.gemini_matrix_model:
+            raise ValueError("Gemini API not configured")
+        if not requirements:
+            return {}
+
+        by_key = {str(req["key"]): req for req in requirements}
+
+        # One JSONL line per requirement prompt
+        lines = []
+        for key, req in by_key.items():
+            prompt = "".join(self._build_gemini_matrix_prompt(
+                req["requirement"],
+                req["requirement_category"],
+                extracted_specs,
+                req.get("project_context")
+            ))
+            lines.append(orjson.dumps({
+                "key": key,
+                "request": {
+                    "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                    "generation_config": {
+                        "response_mime_type": "application/json",
+                        "temperature": 0.0
+                    }
+                }
+            }))
+        jsonl = b"\n".join(lines) + b"\n"
+
+        uploaded_file = await asyncio.to_thread(
+            genai.upload_file,
+            path=io.BytesIO(jsonl),
+            mime_type="application/jsonl",
+            display_name=f"matrix-batch-{len(lines)}"
+        )
+
+        headers = {"x-goog-api-key": settings.GEMINI_API_KEY}
+        client = gemini_http_client()
+        response = await client.post(
+            f"/v1beta/models/{settings.GEMINI_MODEL_MATRIX}:batchGenerateContent",
+            headers=headers,
+            json={
+                "batch": {
+                    "display_name": f"matrix-batch-{len(lines)}",
+                    "input_config": {"file_name": uploaded_file.name}
+                }
             }
+        )
+        response.raise_for_status()
+        batch_name = response.json()["name"]
+        logger.info("Submitted Gemini batch %s with %s requirements", batch_name, len(lines))
+
+        # Poll until the job reaches a terminal state
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.GEMINI_BATCH_TIMEOUT
+        while True:
+            response = await client.get(f"/v1beta/{batch_name}", headers=headers)
+            response.raise_for_status()
+            batch = response.json()
+            state = batch.get("metadata", {}).get("state")
+            if state in GEMINI_BATCH_TERMINAL_STATES:
+                break
+            if loop.time() >= deadline:
+                raise TimeoutError(f"Gemini batch {batch_name} still {state} after {settings.GEMINI_BATCH_TIMEOUT}s")
+            await asyncio.sleep(settings.GEMINI_BATCH_POLL_INTERVAL)
+
+        if state != "BATCH_STATE_SUCCEEDED":
+            raise RuntimeError(f"Gemini batch {batch_name} ended in state {state}")
+
+        responses_file = batch.get("response", {}).get("responsesFile")
+        response = await client.get(
+            f"/download/v1beta/{responses_file}:download",
+            headers=headers,
+            params={"alt": "media"}
+        )
+        response.raise_for_status()
+
+        # Parse JSONL output back into per-requirement matrix entries
+        entries: Dict[str, Dict[str, Any]] = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            result = from_json(line, cache_strings="all")
+            key = str(result.get("key"))
+            req = by_key.get(key)
+            if req is None:
+                logger.warning("Gemini batch %s returned unknown key %s", batch_name, key)
+                continue
+
+            if "error" in result:
+                entries[key] = self._matrix_error_entry(result["error"])
+                continue
+
+            candidates = result.get("response", {}).get("candidates") or [{}]
+            parts = candidates[0].get("content", {}).get("parts", [])
+            response_text = "".join(part.get("text", "") for part in parts)
+            entry = self._parse_gemini_matrix_response(
+                response_text, req["requirement"], req["requirement_category"]
+            )
+            entry["generation_metadata"]["batch_job"] = batch_name
+            entries[key] = entry
+
+        # Requirements missing from the output still get a reviewable placeholder
+        for key in by_key.keys() - entries.keys():
+            entries[key] = self._matrix_error_entry(f"No result in Gemini batch {batch_name}")
+
+        logger.info("Gemini batch %s completed: %s matrix entries", batch_name, len(entries))
+        return entries
 
     def _structure_text_content(self, text: str) -> Dict[str, Any]:
         """
@@ -628,6 +1917,28 @@ Accuracy and traceability to source documentation is critical for audit defense.
             "requires_manual_review": True
         }
 
+    async def warmup(self) -> None:
+        """
+        Load the Ollama matrix model into memory ahead of the first request
+        The model is loaded with the context window matrix prompts request (Ollama
+        reloads it whenever num_ctx changes); with the full specs in the prompt that
+        is usually OLLAMA_MAX_CTX. Failures are logged only; generation will load the
+        model on demand
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await self.ollama_client.generate(
+                model=settings.OLLAMA_MODEL,
+                prompt="ping",
+                options={"num_predict": 1, "num_ctx": settings.OLLAMA_WARMUP_NUM_CTX or OLLAMA_MAX_CTX},
+                keep_alive=settings.OLLAMA_KEEP_ALIVE
+            )
+        except Exception as e:
+            logger.warning("Ollama warmup failed for %s: %s", settings.OLLAMA_MODEL, e)
+            return
+        logger.info("Ollama model %s warmed up in %.2fs", settings.OLLAMA_MODEL, loop.time() - started)
+
     async def health_check(self) -> Dict[str, bool]:
         """Check health of AI services"""
         status = {
@@ -640,6 +1951,29 @@ Accuracy and traceability to source documentation is critical for audit defense.
             models = await self.ollama_client.list()
             status["ollama_available"] = len(models.get('models', [])) > 0
         except Exception as e:
-            logger.warning(f"Ollama health check failed: {e}")
+            logger.warning("Ollama health check failed: %s", e)
 
         return status
+
+
+# Shared AIService, one per event loop; its Ollama client, semaphores and matrix
+# batcher are bound to the loop, and reusing them keeps connections warm
+_ai_services: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AIService]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_ai_service() -> AIService:
+    """Return the shared AIService for the running loop"""
+    loop = asyncio.get_running_loop()
+    service = _ai_services.get(loop)
+    if service is None:
+        service = _ai_services[loop] = AIService()
+    return service
+
+
+async def close_ai_service() -> None:
+    """Close the running loop's shared AIService connections (call on shutdown)"""
+    service = _ai_services.pop(asyncio.get_running_loop(), None)
+    if service is not None:
+        await service.ollama_client._client.aclose()
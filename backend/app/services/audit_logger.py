@@ -0,0 +1,333 @@
+import asyncio
+import fcntl
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.core.database import AuditSessionLocal
+from app.models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# WAL record: CRC32 of the rest of the header and the payload, then record type,
+# sequence number and payload size
+WalRecordHeader = struct.Struct("<IHQI")
+WAL_RECORD_ENTRY = 1       # Sequence: the entry's number; payload: one audit log entry (orjson)
+WAL_RECORD_CHECKPOINT = 2  # Sequence: every entry up to this number is in the database; no payload
+
+# Queued WAL operation that truncates the file instead of appending to it
+_WAL_TRUNCATE = None
+
+
+def pack_wal_record(record_type: int, sequence: int, payload: bytes = b"") -> bytes:
+    """Encode one WAL record; the CRC covers the header fields as well as the payload"""
+    fields = WalRecordHeader.pack(0, record_type, sequence, len(payload))[4:]
+    return struct.pack("<I", zlib.crc32(payload, zlib.crc32(fields))) + fields + payload
+
+
+class AuditWal:
+    """
+    Append-only write-ahead log for buffered audit entries
+    Records are written by a dedicated thread with group commit: everything
+    queued while the previous write was syncing goes out in one write and one
+    fdatasync, so the event loop never blocks on the disk. Each process writes
+    its own file and holds an exclusive flock on it.
+
+    Entries are numbered; a checkpoint record names the last entry applied to the
+    database. Replay is at-least-once: a crash between the database commit and
+    the checkpoint record can insert the last batch twice, but never loses it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f"audit-{os.getpid()}.wal"
+        # Lock under a temporary name first so replay in another worker never
+        # sees this file unlocked
+        tmp_path = self.directory / f".audit-{os.getpid()}.tmp"
+        self._fd = os.open(tmp_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_TRUNC, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.replace(tmp_path, self.path)
+        # Sequence number of the last entry appended and of the last one applied
+        self._sequence = 0
+        self._applied = 0
+
+        self._queue: List[Tuple[Optional[bytes], Future]] = []
+        self._queue_ready = threading.Condition()
+        self._closing = False
+        self._writer = threading.Thread(target=self._write_loop, name="audit-wal-writer", daemon=True)
+        self._writer.start()
+
+    def _submit(self, record: Optional[bytes]) -> Future:
+        future: Future = Future()
+        with self._queue_ready:
+            self._queue.append((record, future))
+            self._queue_ready.notify()
+        return future
+
+    def _write_loop(self) -> None:
+        """Writer thread: one write and fdatasync per batch of queued records"""
+        while True:
+            with self._queue_ready:
+                while not self._queue and not self._closing:
+                    self._queue_ready.wait()
+                if not self._queue:
+                    return
+                batch, self._queue = self._queue, []
+
+            try:
+                data = bytearray()
+                for record, _ in batch:
+                    if record is _WAL_TRUNCATE:
+                        # Everything before this point, queued records included, is applied
+                        data.clear()
+                        os.ftruncate(self._fd, 0)
+                    else:
+                        data += record
+                if data:
+                    os.write(self._fd, data)
+                os.fdatasync(self._fd)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for _, future in batch:
+                    future.set_result(None)
+
+    def append(self, values: Dict[str, Any]) -> Future:
+        """
+        Queue one audit entry for the log
+
+        Returns:
+            Future resolved once the entry is durably on disk
+        """
+        self._sequence += 1
+        payload = orjson.dumps(values, option=orjson.OPT_NON_STR_KEYS)
+        return self._submit(pack_wal_record(WAL_RECORD_ENTRY, self._sequence, payload))
+
+    def mark_applied(self, count: int, pending: int) -> Future:
+        """
+        Record that the oldest ``count`` unapplied entries reached the database
+        Truncates the file once nothing is pending any more
+        """
+        self._applied += count
+        if pending == 0:
+            return self._submit(_WAL_TRUNCATE)
+        return self._submit(pack_wal_record(WAL_RECORD_CHECKPOINT, self._applied))
+
+    def close(self) -> None:
+        """Write what is queued, then close and remove the file (all entries have been applied)"""
+        with self._queue_ready:
+            self._closing = True
+            self._queue_ready.notify()
+        self._writer.join()
+        os.close(self._fd)
+        self.path.unlink(missing_ok=True)
+
+    @staticmethod
+    def read_pending(path: Path) -> List[Dict[str, Any]]:
+        """
+        Read entries not yet covered by a checkpoint
+        Reading stops at the first torn or corrupt record: what follows it
+        cannot be framed reliably
+        """
+        data = path.read_bytes()
+        entries: List[Tuple[int, Dict[str, Any]]] = []
+        applied = 0
+        offset = 0
+        while offset + WalRecordHeader.size <= len(data):
+            crc, record_type, sequence, size = WalRecordHeader.unpack_from(data, offset)
+            end = offset + WalRecordHeader.size + size
+            if end > len(data):
+                logger.warning(f"Audit WAL {path} ends in a torn record at byte {offset}")
+                break
+            if zlib.crc32(data[offset + 4:end]) != crc:
+                logger.error(
+                    f"Audit WAL {path} has a corrupt record at byte {offset}; "
+                    f"{len(data) - offset} bytes after it are not replayed"
+                )
+                break
+            payload = data[offset + WalRecordHeader.size:end]
+            offset = end
+            if record_type == WAL_RECORD_ENTRY:
+                values = orjson.loads(payload)
+                if values.get("timestamp"):
+                    values["timestamp"] = datetime.fromisoformat(values["timestamp"])
+                entries.append((sequence, values))
+            elif record_type == WAL_RECORD_CHECKPOINT:
+                applied = sequence
+        return [values for sequence, values in entries if sequence > applied]
+
+
+class AuditLogBuffer:
+    """
+    Write-behind buffer for audit log entries
+    Collects entries in memory and writes them with one multi-row INSERT,
+    either every flush interval or as soon as the buffer reaches its size
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = settings.AUDIT_BUFFER_SIZE,
+        flush_interval_ms: int = settings.AUDIT_FLUSH_INTERVAL_MS,
+        wal_dir: Optional[str] = settings.AUDIT_WAL_DIR
+    ):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.wal_dir = wal_dir
+        # Unbounded on purpose: audit entries must never be dropped (GxP)
+        self._entries: Deque[Dict[str, Any]] = deque()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wal: Optional[AuditWal] = None
+
+    @property
+    def running(self) -> bool:
+        """True while the background flusher is accepting entries"""
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def add(self, values: Dict[str, Any]) -> None:
+        """
+        Queue an audit log entry for the next flush
+        With the WAL enabled, returns once the entry is durably logged
+
+        Args:
+            values: Column values as returned by AuditLog.build_values()
+        """
+        # Stamp the event time now; server_default would record the flush time
+        if values.get("timestamp") is None:
+            values = {**values, "timestamp": datetime.now(timezone.utc)}
+        # Logged and queued in the same step, so WAL order matches flush order
+        logged = self._wal.append(values) if self._wal is not None else None
+        self._entries.append(values)
+        if len(self._entries) >= self.buffer_size:
+            self._wakeup.set()
+        if logged is not None:
+            await asyncio.wrap_future(logged)
+
+    async def flush(self) -> int:
+        """
+        Write all buffered entries, one transaction per buffer_size entries
+        Bounding each INSERT keeps a backlog (e.g. after a database outage)
+        from turning into one huge transaction that fails as a whole
+
+        Returns:
+            Number of entries written
+        """
+        batch_size = max(self.buffer_size, 1)
+        written = 0
+        async with self._flush_lock:
+            while self._entries:
+                rows: List[Dict[str, Any]] = []
+                while self._entries and len(rows) < batch_size:
+                    rows.append(self._entries.popleft())
+
+                try:
+                    async with AuditSessionLocal() as session:
+                        await AuditLog.log_bulk(session, rows)
+                        await session.commit()
+                except Exception as e:
+                    # Put entries back in original order so the next flush retries them
+                    self._entries.extendleft(reversed(rows))
+                    logger.error(f"Audit log flush failed ({len(self._entries)} entries kept): {e}")
+                    raise
+
+                if self._wal is not None:
+                    self._wal.mark_applied(len(rows), pending=len(self._entries))
+                written += len(rows)
+
+            return written
+
+    async def _replay_wal(self) -> None:
+        """Apply entries left in WAL files by processes that exited uncleanly"""
+        for path in sorted(Path(self.wal_dir).glob("audit-*.wal")):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                # A live worker holds its own file locked; skip those
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+
+            try:
+                entries = AuditWal.read_pending(path)
+                if entries:
+                    async with AuditSessionLocal() as session:
+                        await AuditLog.log_bulk(session, entries)
+                        await session.commit()
+                    logger.warning(f"Replayed {len(entries)} audit entries from {path.name}")
+                path.unlink()
+            finally:
+                os.close(fd)
+
+    async def _run(self) -> None:
+        """Background loop: flush on interval or when the buffer fills up"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                # Already logged; entries stay buffered for the next attempt
+                pass
+
+    async def start(self) -> None:
+        """Start the background flusher (call from the application lifespan)"""
+        if self.buffer_size <= 0:
+            logger.info("Audit log buffering disabled, entries are written directly")
+            return
+        if self.running:
+            return
+
+        if self.wal_dir:
+            Path(self.wal_dir).mkdir(parents=True, exist_ok=True)
+            await self._replay_wal()
+            self._wal = AuditWal(self.wal_dir)
+
+        self._task = asyncio.create_task(self._run(), name="audit-log-flusher")
+        logger.info(
+            f"Audit log buffer started (size={self.buffer_size}, "
+            f"interval={self.flush_interval * 1000:.0f}ms, "
+            f"wal={'on' if self._wal else 'off'})"
+        )
+
+    async def stop(self) -> None:
+        """Stop the background flusher and write any remaining entries"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        written = await self.flush()
+        if self._wal is not None and not self._entries:
+            await asyncio.to_thread(self._wal.close)
+            self._wal = None
+        logger.info(f"Audit log buffer stopped, flushed {written} remaining entries")
+
+
+# Process-wide buffer used by the API (started/stopped in app lifespan)
+audit_buffer = AuditLogBuffer()
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import orjson
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    Content-addressable cache for document extraction results
+    Entries are JSON files keyed by the document bytes plus the model and
+    prompt version, so byte-identical re-uploads and retries skip the AI call
+    """
+
+    def __init__(self, cache_dir: str = settings.EXTRACTION_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: bytes, model: str, prompt_version: str) -> str:
+        """
+        Build the cache key for a document
+
+        Args:
+            content_hash: Raw SHA-256 digest of the document bytes (Document.file_hash)
+            model: Extraction model name
+            prompt_version: Version of the extraction prompt
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        # Fixed-size digest prefix keeps the content/suffix boundary unambiguous
+        digest.update(content_hash)
+        digest.update(prompt_version.encode())
+        digest.update(model.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        # Two-level fan-out keeps directories small
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached record for ``key`` or None on miss/corruption"""
+        path = self._path(key)
+        try:
+            record = orjson.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable extraction cache entry {key}: {e}")
+            return None
+
+        if record.get("key") != key or not isinstance(record.get("result"), dict):
+            logger.warning(f"Ignoring invalid extraction cache entry {key}")
+            return None
+        return record
+
+    def set(self, key: str, result: Dict[str, Any], metadata: Dict[str, Any]) -> None:
+        """
+        Store an extraction result (written atomically)
+
+        Args:
+            key: Cache key from make_key()
+            result: Extraction result to cache
+            metadata: Provenance (provider, model, prompt version, filename, ...)
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "key": key,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **metadata,
+            "result": result
+        }
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Cache is an optimization; never fail the extraction over it
+            logger.warning(f"Failed to write extraction cache entry {key}: {e}")
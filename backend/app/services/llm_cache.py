@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed cache of raw LLM responses for deterministic prompts
+    Only safe for temperature=0 calls, where the same model and prompt
+    yield the same output; callers are responsible for that check.
+    Queries run in a worker thread: a locked database file can block them for
+    up to the connect timeout, which must not stall the event loop
+    """
+
+    def __init__(
+        self,
+        db_path: str = settings.LLM_CACHE_PATH,
+        ttl_seconds: int = settings.LLM_CACHE_TTL_SECONDS
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    hash TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_expires_at ON llm_cache (expires_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection in a transaction (several workers may share the file)"""
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, prompt: str) -> str:
+        """Cache key for a model/prompt pair"""
+        return hashlib.sha256(f"{model}|{prompt_version}|{prompt}".encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None on miss/expiry"""
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, response: str) -> None:
+        """Store a response text with the configured TTL"""
+        await asyncio.to_thread(self._set, key, response)
+
+    def _get(self, key: str) -> Optional[str]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT response FROM llm_cache WHERE hash = ? AND expires_at > ?",
+                    (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def _set(self, key: str, response: str) -> None:
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (hash, response, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now, now + self.ttl_seconds)
+                )
+                # Opportunistically drop expired rows
+                conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            # Cache is an optimization; never fail generation over it
+            logger.warning(f"LLM cache write failed: {e}")
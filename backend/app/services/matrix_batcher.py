@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+BatchProcessor = Callable[[List[Dict[str, Any]]], Awaitable[List[Any]]]
+
+
+class MatrixBatcher:
+    """
+    Coalesces matrix generation requests that arrive close together
+    Requests for the same extracted_specs object are queued until the batch is
+    full or the oldest request has waited max_queue_time, then handed to the
+    processor in one call; each caller gets its own result back
+    """
+
+    def __init__(
+        self,
+        process_batch: BatchProcessor,
+        max_batch_size: int = 10,
+        max_queue_time: float = 0.5
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_queue_time = max_queue_time
+        # Pending requests per specs object; the queued items keep the object
+        # alive, so its id() cannot be reused while the batch is open
+        self._pending: Dict[int, List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def process(self, item: Dict[str, Any]) -> Any:
+        """
+        Queue one request and wait for its result
+
+        Args:
+            item: generate_matrix_entry() keyword arguments
+
+        Returns:
+            The processor's result for this item
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = id(item["extracted_specs"])
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((item, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_queue_time, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: int) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run(batch))
+        # Hold a reference until done (the loop only keeps weak ones)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await self.process_batch(items)
+        except Exception as e:
+            logger.error(f"Matrix batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import logging
+import math
+import re
+import weakref
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.services.section_retriever import tokenize
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "matrix_cache"
+
+# Clause boundaries in a compound requirement ("shall log X and enforce Y")
+_CLAUSE_SPLIT_RE = re.compile(r"\s*(?:;|,?\s+(?:and|as well as)\s+)\s*", re.IGNORECASE)
+
+# Words that flip or qualify a requirement's meaning; near-identical texts must agree on them
+# ("t" is what tokenize leaves of a "-n't" contraction: "shouldn't" -> "shouldn", "t")
+_NEGATIONS = frozenset({"not", "no", "never", "without", "cannot", "nor", "except", "unless", "t"})
+
+# Least to most severe; a combined entry takes the most severe clause status
+_COMPLIANCE_SEVERITY = ["Compliant", "Partial", "Requires Clarification", "Non-Compliant"]
+
+# One Redis client per event loop (Celery tasks run their own loops)
+_redis_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, redis.Redis]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _redis_client() -> redis.Redis:
+    loop = asyncio.get_running_loop()
+    client = _redis_clients.get(loop)
+    if client is None:
+        # Short timeouts: a slow cache must not hold up generation
+        client = redis.from_url(settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+        _redis_clients[loop] = client
+    return client
+
+
+async def close_matrix_cache_client() -> None:
+    """Close the running loop's Redis client (call on shutdown)"""
+    client = _redis_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm
+
+
+def _guard_terms(terms: Counter) -> Counter:
+    """Negations and numbers of a text: a fuzzy match must have exactly the same ones"""
+    return Counter({
+        term: count for term, count in terms.items()
+        if term in _NEGATIONS or any(c.isdigit() for c in term)
+    })
+
+
+def split_clauses(requirement: str) -> List[str]:
+    """Split a compound requirement on conjunctions (clauses without content words are dropped)"""
+    return [clause for clause in _CLAUSE_SPLIT_RE.split(requirement) if tokenize(clause)]
+
+
+def combine_matrix_entries(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the cached entries of a compound requirement's clauses into one entry
+    Text fields (verification items included) are unioned in clause order, the most
+    severe compliance status and the lowest confidence win
+    """
+    def union(field: str) -> Optional[str]:
+        values = []
+        for entry in entries:
+            value = entry.get(field)
+            if value and value not in values:
+                values.append(value)
+        return "\n\n".join(values) if values else None
+
+    combined = {
+        field: union(field)
+        for field in ("spec_reference", "supplier_response", "justification",
+                      "test_reference", "risk_assessment", "verification_needed", "comments")
+    }
+    combined["compliance_status"] = max(
+        (entry.get("compliance_status") for entry in entries),
+        key=lambda status: _COMPLIANCE_SEVERITY.index(status) if status in _COMPLIANCE_SEVERITY
+        else _COMPLIANCE_SEVERITY.index("Requires Clarification")
+    )
+    combined["confidence_score"] = min(entry.get("confidence_score", 0) for entry in entries)
+    combined["generation_metadata"] = dict(entries[0].get("generation_metadata") or {})
+    return {key: value for key, value in combined.items() if value is not None}
+
+
+class MatrixEntryCache:
+    """
+    Two-tier Redis cache of generated matrix entries
+    Exact tier: requirement, category, project context and specs digest hash to one key.
+    Semantic tier (MATRIX_SEMANTIC_CACHE_ENABLED, off by default): on an exact miss,
+    an entry generated against the same specs and category for a near-identical
+    requirement text (token cosine, same negations and numbers) is reused
+    Generative tier (MATRIX_GENERATIVE_CACHE_ENABLED, off by default): a compound
+    requirement whose clauses all match cached entries gets those entries combined
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = settings.MATRIX_CACHE_TTL_SECONDS,
+        similarity_threshold: float = settings.MATRIX_SEMANTIC_CACHE_THRESHOLD
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+    @staticmethod
+    def make_scope(model: str, prompt_version: str, specs_digest: str, requirement_category: str) -> str:
+        """Entries in one scope answer requirements against the same specs, category and prompt"""
+        return hashlib.sha256(
+            f"{model}|{prompt_version}|{specs_digest}|{requirement_category}".encode()
+        ).hexdigest()
+
+    @staticmethod
+    def make_key(scope: str, requirement: str, project_context: Optional[Dict[str, Any]]) -> str:
+        """Exact-tier key for a requirement within a scope"""
+        context = orjson.dumps(project_context or {}, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        return hashlib.sha256(scope.encode() + b"|" + requirement.encode() + b"|" + context).hexdigest()
+
+    async def lookup(
+        self,
+        key: str,
+        scope: str,
+        requirement: str
+    ) -> Optional[Tuple[Dict[str, Any], str, float]]:
+        """
+        Find a cached entry for a requirement
+
+        Returns:
+            (entry, tier, similarity) with tier "exact", "semantic" or "generative"
+            (combined from the entries of its clauses), or None on miss
+        """
+        try:
+            client = _redis_client()
+            cached = await client.get(f"{KEY_PREFIX}:exact:{key}")
+            if cached is not None:
+                return orjson.loads(cached), "exact", 1.0
+            if not (settings.MATRIX_SEMANTIC_CACHE_ENABLED or settings.MATRIX_GENERATIVE_CACHE_ENABLED):
+                return None
+
+            # Requirement texts of the scope, by exact key
+            candidates = {
+                candidate_key.decode(): Counter(tokenize(candidate_text.decode()))
+                for candidate_key, candidate_text in
+                (await client.hgetall(f"{KEY_PREFIX}:semantic:{scope}")).items()
+            }
+            if not candidates:
+                return None
+
+            best_key, best_score = self._best_match(candidates, requirement)
+            if settings.MATRIX_SEMANTIC_CACHE_ENABLED and best_score >= self.similarity_threshold:
+                cached = await client.get(f"{KEY_PREFIX}:exact:{best_key}")
+                if cached is not None:
+                    return orjson.loads(cached), "semantic", best_score
+
+            if settings.MATRIX_GENERATIVE_CACHE_ENABLED:
+                return await self._lookup_generative(client, candidates, requirement)
+            return None
+        except (redis.RedisError, OSError, ValueError) as e:
+            logger.warning(f"Matrix cache lookup failed: {e}")
+            return None
+
+    @staticmethod
+    def _best_match(candidates: Dict[str, Counter], text: str) -> Tuple[Optional[str], float]:
+        query = Counter(tokenize(text))
+        guard = _guard_terms(query)
+        best_key, best_score = None, 0.0
+        for candidate_key, candidate_terms in candidates.items():
+            # "shall not encrypt" must never reuse the entry of "shall encrypt"
+            if _guard_terms(candidate_terms) != guard:
+                continue
+            score = _cosine(query, candidate_terms)
+            if score > best_score:
+                best_key, best_score = candidate_key, score
+        return best_key, best_score
+
+    async def _lookup_generative(
+        self,
+        client: redis.Redis,
+        candidates: Dict[str, Counter],
+        requirement: str
+    ) -> Optional[Tuple[Dict[str, Any], str, float]]:
+        """Combine cached entries when every clause of a compound requirement has one"""
+        clauses = split_clauses(requirement)
+        if len(clauses) < 2:
+            return None
+
+        keys, scores = [], []
+        for clause in clauses:
+            clause_key, score = self._best_match(candidates, clause)
+            if score < settings.MATRIX_GENERATIVE_CACHE_CLAUSE_THRESHOLD:
+                return None
+            keys.append(clause_key)
+            scores.append(score)
+        if sum(scores) < settings.MATRIX_GENERATIVE_CACHE_COMBINED_THRESHOLD or len(set(keys)) < 2:
+            return None
+
+        cached = await client.mget([f"{KEY_PREFIX}:exact:{clause_key}" for clause_key in dict.fromkeys(keys)])
+        if any(entry is None for entry in cached):
+            return None
+        combined = combine_matrix_entries([orjson.loads(entry) for entry in cached])
+        combined["generation_metadata"]["generative_clauses"] = len(clauses)
+        return combined, "generative", min(scores)
+
+    async def set(self, key: str, scope: str, requirement: str, entry: Dict[str, Any]) -> None:
+        """Store a generated entry in both tiers with the configured TTL"""
+        semantic_key = f"{KEY_PREFIX}:semantic:{scope}"
+        try:
+            async with _redis_client().pipeline(transaction=False) as pipe:
+                pipe.set(f"{KEY_PREFIX}:exact:{key}", orjson.dumps(entry), ex=self.ttl_seconds)
+                pipe.hset(semantic_key, key, requirement)
+                pipe.expire(semantic_key, self.ttl_seconds)
+                await pipe.execute()
+        except (redis.RedisError, OSError) as e:
+            # Cache is an optimization; never fail generation over it
+            logger.warning(f"Matrix cache write failed: {e}")
@@ -1,10 +1,15 @@
 import logging
 import asyncio
-from typing import List, Dict, Any, Optional
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import Row, bindparam, insert, select
 
-from app.services.ai_service import AIService
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.ai_service import get_ai_service
 from app.models.requirement import Requirement
 from app.models.matrix import MatrixEntry
 from app.models.document import Document
@@ -12,6 +17,70 @@ from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
+# Statements reused on every call (built once; executed with bound parameters)
+_PROJECT_REQUIREMENTS_STMT = select(Requirement).where(
+    Requirement.project_id == bindparam("project_id"),
+    Requirement.deleted_at.is_(None)
+).order_by(Requirement.id)
+
+_REQUIREMENT_STMT = select(Requirement).where(Requirement.id == bindparam("requirement_id"))
+
+_ACTIVE_ENTRY_STMT = select(MatrixEntry).where(
+    MatrixEntry.requirement_id == bindparam("requirement_id"),
+    MatrixEntry.deleted_at.is_(None)
+)
+
+_EXISTING_ENTRIES_STMT = select(MatrixEntry.requirement_id, MatrixEntry.id).join(
+    Requirement, Requirement.id == MatrixEntry.requirement_id
+).where(
+    Requirement.project_id == bindparam("project_id"),
+    Requirement.deleted_at.is_(None),
+    MatrixEntry.deleted_at.is_(None)
+)
+
+_EXTRACTED_DOCUMENT_FILTERS = (
+    Document.project_id == bindparam("project_id"),
+    Document.extraction_status == "completed",
+    Document.deleted_at.is_(None)
+)
+
+# Cheap version query for the specs cache; the extracted_json blobs are only loaded on a miss
+_DOCUMENT_VERSIONS_STMT = select(Document.id, Document.extracted_at).where(
+    *_EXTRACTED_DOCUMENT_FILTERS
+).order_by(Document.id)
+
+# Only the columns the combination reads, as plain rows (no ORM instances)
+_DOCUMENT_SPECS_STMT = select(
+    Document.id,
+    Document.original_filename,
+    Document.extraction_model,
+    Document.extracted_at,
+    Document.extracted_json
+).where(*_EXTRACTED_DOCUMENT_FILTERS).order_by(Document.id)
+
+_INSERT_ENTRIES_STMT = insert(MatrixEntry).returning(MatrixEntry.id, sort_by_parameter_order=True)
+
+# Rows fetched per round trip when streaming a project's requirements; batches
+# handed to the AI workers are cut from these independently
+REQUIREMENT_STREAM_FETCH_SIZE = 100
+
+
+def _compact(value: Any) -> Any:
+    """
+    Canonical form of extracted JSON for prompts: strings stripped of surrounding
+    whitespace, dict fields that are empty strings/lists/dicts or null dropped (text
+    is otherwise verbatim). List items are all kept in place, since positions carry
+    meaning (empty cells in table rows)
+    """
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        compacted = {key: _compact(item) for key, item in value.items()}
+        return {key: item for key, item in compacted.items() if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_compact(item) for item in value]
+    return value
+
 
 class MatrixGenerator:
     """
@@ -19,15 +88,28 @@ class MatrixGenerator:
     Orchestrates the two-step AI workflow for matrix generation
     """
 
-    def __init__(self):
-        self.ai_service = AIService()
+    # Combined specifications by project: (version, expires_at, combined); shared by
+    # all instances and never mutated, so requests reuse one dict per project.
+    # Least recently used projects are evicted beyond SPECS_CACHE_SIZE
+    SPECS_CACHE_TTL = 300.0
+    SPECS_CACHE_SIZE = 32
+    _specs_cache: "OrderedDict[int, Tuple[tuple, float, Dict[str, Any]]]" = OrderedDict()
+
+    def __init__(self, sessionmaker: async_sessionmaker = AsyncSessionLocal):
+        self.ai_service = get_ai_service()
+        # Sessions for concurrent pipeline tasks (an AsyncSession must not be shared between them)
+        self._sessionmaker = sessionmaker
+        # In-flight generations by (project, description, category, priority), for coalescing
+        # duplicates; each waiter gets a copy with its own generation metadata
+        self._inflight: Dict[tuple, asyncio.Future] = {}
 
     async def generate_matrix_for_project(
         self,
         project_id: int,
         user_id: int,
         db: AsyncSession,
-        batch_size: int = 5
+        batch_size: Optional[int] = None,
+        use_batch_api: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Generate traceability matrix for all requirements in a project
@@ -36,7 +118,10 @@ class MatrixGenerator:
             project_id: Project ID
             user_id: User ID for audit trail
             db: Database session
-            batch_size: Number of requirements to process in parallel
+            batch_size: Number of requirements per packed AI call and commit
+                (defaults to settings.MATRIX_PACK_SIZE)
+            use_batch_api: Submit all requirements as one Gemini Batch Mode job
+                (defaults to settings.GEMINI_BATCH_MODE; Gemini provider only)
             
         Returns:
             Generation summary and results
@@ -44,62 +129,48 @@ class MatrixGenerator:
         logger.info(f"Starting matrix generation for project {project_id}")
         
         try:
-            # Get all requirements for the project
-            stmt = select(Requirement).where(
-                Requirement.project_id == project_id,
-                Requirement.deleted_at.is_(None)
-            ).order_by(Requirement.id)
-            result = await db.execute(stmt)
-            requirements = result.scalars().all()
+            # Combined extracted document specifications for the project
+            combined_specs = await self._project_specifications(project_id, db)
             
-            if not requirements:
+            if combined_specs is None:
                 return {
                     "success": False,
-                    "error": "No requirements found for project",
+                    "error": "No extracted documents found for project",
                     "generated_count": 0
                 }
             
-            # Get extracted document specifications for the project
-            stmt = select(Document).where(
-                Document.project_id == project_id,
-                Document.extraction_status == "completed",
-                Document.deleted_at.is_(None)
-            )
-            result = await db.execute(stmt)
-            documents = result.scalars().all()
+            # Requirements that already have an entry (one query for the whole project)
+            existing = await self._existing_entry_ids(project_id, db)
+            
+            if use_batch_api is None:
+                use_batch_api = settings.GEMINI_BATCH_MODE
+            if batch_size is None:
+                batch_size = max(settings.MATRIX_PACK_SIZE, 1)
+            
+            if use_batch_api and settings.MATRIX_GENERATION_PROVIDER == "gemini":
+                # Non-interactive build: one Gemini Batch Mode job for all requirements
+                result = await db.execute(_PROJECT_REQUIREMENTS_STMT, {"project_id": project_id})
+                requirements = result.scalars().all()
+                total_requirements = len(requirements)
+                results = []
+                if requirements:
+                    results = await self._process_requirements_batch_api(
+                        requirements, combined_specs, existing, user_id, db
+                    )
+            else:
+                total_requirements, results = await self._run_generation_pipeline(
+                    project_id, combined_specs, existing, user_id, batch_size
+                )
             
-            if not documents:
+            if not total_requirements:
                 return {
                     "success": False,
-                    "error": "No extracted documents found for project",
+                    "error": "No requirements found for project",
                     "generated_count": 0
                 }
             
-            # Combine all extracted specifications
-            combined_specs = await self._combine_document_specifications(documents)
-            
-            # Process requirements in batches to avoid overwhelming the AI service
-            total_requirements = len(requirements)
-            generated_count = 0
-            failed_count = 0
-            results = []
-            
-            for i in range(0, total_requirements, batch_size):
-                batch = requirements[i:i + batch_size]
-                batch_results = await self._process_requirements_batch(
-                    batch, combined_specs, user_id, db
-                )
-                
-                for result in batch_results:
-                    if result["success"]:
-                        generated_count += 1
-                    else:
-                        failed_count += 1
-                    results.append(result)
-                
-                # Small delay between batches to be respectful to AI services
-                if i + batch_size < total_requirements:
-                    await asyncio.sleep(1)
+            generated_count = sum(1 for result in results if result["success"])
+            failed_count = len(results) - generated_count
             
             logger.info(
                 f"Matrix generation completed for project {project_id}: "
@@ -143,8 +214,7 @@ class MatrixGenerator:
         """
         try:
             # Get requirement
-            stmt = select(Requirement).where(Requirement.id == requirement_id)
-            result = await db.execute(stmt)
+            result = await db.execute(_REQUIREMENT_STMT, {"requirement_id": requirement_id})
             requirement = result.scalar_one_or_none()
             
             if not requirement:
@@ -152,11 +222,7 @@ class MatrixGenerator:
             
             # Check if matrix entry already exists
             if not regenerate:
-                stmt = select(MatrixEntry).where(
-                    MatrixEntry.requirement_id == requirement_id,
-                    MatrixEntry.deleted_at.is_(None)
-                )
-                result = await db.execute(stmt)
+                result = await db.execute(_ACTIVE_ENTRY_STMT, {"requirement_id": requirement_id})
                 existing_entry = result.scalar_one_or_none()
                 
                 if existing_entry:
@@ -166,24 +232,15 @@ class MatrixGenerator:
                         "existing_entry_id": existing_entry.id
                     }
             
-            # Get extracted specifications for the project
-            stmt = select(Document).where(
-                Document.project_id == requirement.project_id,
-                Document.extraction_status == "completed",
-                Document.deleted_at.is_(None)
-            )
-            result = await db.execute(stmt)
-            documents = result.scalars().all()
+            # Get combined extracted specifications for the project
+            combined_specs = await self._project_specifications(requirement.project_id, db)
             
-            if not documents:
+            if combined_specs is None:
                 return {
                     "success": False,
                     "error": "No extracted documents found for project"
                 }
             
-            # Combine specifications
-            combined_specs = await self._combine_document_specifications(documents)
-            
             # Generate matrix entry
             generated_entry = await self.ai_service.generate_matrix_entry(
                 requirement=requirement.description,
@@ -199,11 +256,7 @@ class MatrixGenerator:
             # Create or update matrix entry in database
             if regenerate:
                 # Update existing entry
-                stmt = select(MatrixEntry).where(
-                    MatrixEntry.requirement_id == requirement_id,
-                    MatrixEntry.deleted_at.is_(None)
-                )
-                result = await db.execute(stmt)
+                result = await db.execute(_ACTIVE_ENTRY_STMT, {"requirement_id": requirement_id})
                 matrix_entry = result.scalar_one_or_none()
                 
                 if matrix_entry:
@@ -268,144 +321,423 @@ class MatrixGenerator:
             await db.rollback()
             return {"success": False, "error": str(e)}
 
+    async def _run_generation_pipeline(
+        self,
+        project_id: int,
+        combined_specs: Dict[str, Any],
+        existing: Dict[int, int],
+        user_id: int,
+        batch_size: int
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Generate entries for a project's requirements as a streaming pipeline
+        A producer streams requirement batches from the database into a bounded queue
+        and workers generate and save each batch concurrently; memory stays bounded and
+        one slow AI call does not stall the others. Every task uses its own session
+        
+        Returns:
+            (total_requirements, results)
+        """
+        workers = (
+            settings.GEMINI_MAX_CONCURRENCY if settings.MATRIX_GENERATION_PROVIDER == "gemini"
+            else settings.OLLAMA_MAX_CONCURRENCY
+        )
+        batches: asyncio.Queue = asyncio.Queue(maxsize=2 * workers)
+        results: List[Dict[str, Any]] = []
+        total_requirements = 0
+        
+        async def produce() -> None:
+            nonlocal total_requirements
+            async with self._sessionmaker() as stream_db:
+                stream = await stream_db.stream_scalars(
+                    _PROJECT_REQUIREMENTS_STMT,
+                    {"project_id": project_id},
+                    execution_options={"yield_per": max(batch_size, REQUIREMENT_STREAM_FETCH_SIZE)}
+                )
+                async for batch in stream.partitions(batch_size):
+                    total_requirements += len(batch)
+                    await batches.put(batch)
+            for _ in range(workers):
+                await batches.put(None)
+        
+        async def work() -> None:
+            while (batch := await batches.get()) is not None:
+                batch_results, to_save = await self._process_requirements_batch(
+                    batch, combined_specs, existing
+                )
+                results.extend(batch_results)
+                async with self._sessionmaker() as task_db:
+                    results.extend(await self._save_generated_entries(to_save, user_id, task_db))
+        
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(produce())
+            for _ in range(workers):
+                tg.create_task(work())
+        
+        return total_requirements, results
+
     async def _process_requirements_batch(
         self,
         requirements: List[Requirement],
         combined_specs: Dict[str, Any],
-        user_id: int,
-        db: AsyncSession
-    ) -> List[Dict[str, Any]]:
-        """Process a batch of requirements in parallel"""
+        existing: Dict[int, int]
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[Requirement, Dict[str, Any]]]]:
+        """
+        Generate entries for a batch of requirements with packed AI calls (not saved)
+        Requirements in ``existing`` (requirement id -> entry id) are skipped
         
-        tasks = []
+        Returns:
+            (results, generated): results for skipped/failed requirements and the
+            (requirement, entry) pairs to save
+        """
+        
+        results = []
+        pending = []
         for requirement in requirements:
-            task = self._generate_single_matrix_entry(
-                requirement, combined_specs, user_id, db
+            if requirement.id in existing:
+                results.append({
+                    "success": False,
+                    "requirement_id": requirement.id,
+                    "error": "Matrix entry already exists",
+                    "existing_entry_id": existing[requirement.id]
+                })
+            else:
+                pending.append(requirement)
+        
+        if not pending:
+            return results, []
+        
+        # Identical requirements (copy-pasted controls) share one AI call, also
+        # across concurrent pipeline workers: later ones wait for the first
+        loop = asyncio.get_running_loop()
+        owned: List[Tuple[int, tuple]] = []
+        waiting: List[Tuple[int, asyncio.Future]] = []
+        for i, requirement in enumerate(pending):
+            key = self._inflight_key(requirement)
+            future = self._inflight.get(key)
+            if future is None:
+                self._inflight[key] = loop.create_future()
+                owned.append((i, key))
+            else:
+                waiting.append((i, future))
+        
+        generated: List[Any] = [None] * len(pending)
+        owned_entries: List[Any] = []
+        try:
+            owned_entries = await self._generate_entries(
+                [pending[i] for i, _ in owned], combined_specs
             )
-            tasks.append(task)
+        except Exception as e:
+            owned_entries = [e] * len(owned)
+        finally:
+            # Waiters get the entry or the exception as the future's result (never
+            # set_exception), so a failure nobody awaits is not logged as unretrieved
+            if len(owned_entries) != len(owned):
+                owned_entries = [RuntimeError("Generation was cancelled")] * len(owned)
+            for (i, key), entry in zip(owned, owned_entries):
+                generated[i] = entry
+                self._inflight.pop(key).set_result(entry)
         
-        # Execute all tasks in parallel
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if waiting:
+            logger.info(f"Reusing in-flight results for {len(waiting)} duplicate requirements")
+        for i, future in waiting:
+            entry = await future
+            if not isinstance(entry, Exception):
+                entry = self._shared_entry(entry, pending[i])
+            generated[i] = entry
         
-        # Process results
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                processed_results.append({
+        to_save = []
+        for requirement, generated_entry in zip(pending, generated):
+            if isinstance(generated_entry, Exception):
+                results.append({
                     "success": False,
-                    "requirement_id": requirements[i].id,
-                    "error": str(result)
+                    "requirement_id": requirement.id,
+                    "error": str(generated_entry)
                 })
             else:
-                processed_results.append(result)
+                to_save.append((requirement, generated_entry))
         
-        return processed_results
+        return results, to_save
 
-    async def _generate_single_matrix_entry(
+    @staticmethod
+    def _inflight_key(requirement: Requirement) -> tuple:
+        # Specifications are per project, so only requirements of one project share an entry
+        return (
+            requirement.project_id, requirement.description,
+            requirement.category or "General", requirement.priority
+        )
+
+    @staticmethod
+    def _shared_entry(entry: Dict[str, Any], requirement: Requirement) -> Dict[str, Any]:
+        """Copy of an entry generated for an identical requirement, with metadata for this one"""
+        return {
+            **entry,
+            "generation_metadata": {
+                **(entry.get("generation_metadata") or {}),
+                "requirement": requirement.description,
+                "requirement_category": requirement.category or "General",
+                "cache_hit": True,
+                "source": "inflight"
+            }
+        }
+
+    async def _generate_entries(
         self,
-        requirement: Requirement,
+        requirements: List[Requirement],
+        combined_specs: Dict[str, Any]
+    ) -> List[Any]:
+        """
+        Generate entries with packed AI calls, regenerating individually any the packed
+        call could not answer
+
+        Returns:
+            Entries (or the raised exception) in input order
+        """
+        if not requirements:
+            return []
+        
+        generated = await self.ai_service.generate_matrix_entries_packed([
+            {
+                "requirement": requirement.description,
+                "requirement_category": requirement.category or "General",
+                "extracted_specs": combined_specs,
+                "project_context": {
+                    "project_id": requirement.project_id,
+                    "requirement_id": requirement.requirement_id,
+                    "priority": requirement.priority
+                }
+            }
+            for requirement in requirements
+        ])
+        
+        fallback_indexes = [i for i, entry in enumerate(generated) if isinstance(entry, Exception)]
+        if fallback_indexes:
+            logger.warning(
+                f"Packed generation failed for {len(fallback_indexes)} requirements, regenerating individually"
+            )
+            fallback_entries = await asyncio.gather(
+                *[self._generate_single_matrix_entry(requirements[i], combined_specs) for i in fallback_indexes],
+                return_exceptions=True
+            )
+            for i, entry in zip(fallback_indexes, fallback_entries):
+                generated[i] = entry
+        
+        return generated
+
+    async def _process_requirements_batch_api(
+        self,
+        requirements: List[Requirement],
         combined_specs: Dict[str, Any],
+        existing: Dict[int, int],
         user_id: int,
         db: AsyncSession
-    ) -> Dict[str, Any]:
-        """Generate matrix entry for a single requirement"""
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate entries for all requirements with a single Gemini Batch Mode job
+        Requirements in ``existing`` (requirement id -> entry id) are skipped
+        """
         
-        try:
-            # Check if entry already exists
-            stmt = select(MatrixEntry).where(
-                MatrixEntry.requirement_id == requirement.id,
-                MatrixEntry.deleted_at.is_(None)
-            )
-            result = await db.execute(stmt)
-            existing_entry = result.scalar_one_or_none()
-            
-            if existing_entry:
-                return {
+        results = []
+        pending = []
+        for requirement in requirements:
+            if requirement.id in existing:
+                results.append({
                     "success": False,
                     "requirement_id": requirement.id,
                     "error": "Matrix entry already exists",
-                    "existing_entry_id": existing_entry.id
-                }
-            
-            # Generate matrix entry using AI service
-            generated_entry = await self.ai_service.generate_matrix_entry(
-                requirement=requirement.description,
-                requirement_category=requirement.category or "General",
-                extracted_specs=combined_specs,
-                project_context={
-                    "project_id": requirement.project_id,
-                    "requirement_id": requirement.requirement_id,
-                    "priority": requirement.priority
+                    "existing_entry_id": existing[requirement.id]
+                })
+            else:
+                pending.append(requirement)
+        
+        if not pending:
+            return results
+        
+        generated = await self.ai_service.generate_matrix_entries_batch(
+            [
+                {
+                    "key": str(requirement.id),
+                    "requirement": requirement.description,
+                    "requirement_category": requirement.category or "General",
+                    "project_context": {
+                        "project_id": requirement.project_id,
+                        "requirement_id": requirement.requirement_id,
+                        "priority": requirement.priority
+                    }
                 }
-            )
-            
-            # Create matrix entry in database
-            matrix_entry = MatrixEntry(
-                requirement_id=requirement.id,
-                spec_reference=generated_entry.get("spec_reference"),
-                supplier_response=generated_entry.get("supplier_response"),
-                justification=generated_entry.get("justification"),
-                compliance_status=generated_entry.get("compliance_status"),
-                test_reference=generated_entry.get("test_reference"),
-                risk_assessment=generated_entry.get("risk_assessment"),
-                comments=generated_entry.get("comments"),
-                generation_model=generated_entry["generation_metadata"]["model"],
-                generation_metadata=generated_entry.get("generation_metadata"),
-                created_by=user_id,
-                review_status="pending"
-            )
-            
-            db.add(matrix_entry)
+                for requirement in pending
+            ],
+            combined_specs
+        )
+        
+        results.extend(await self._save_generated_entries(
+            [(requirement, generated[str(requirement.id)]) for requirement in pending], user_id, db
+        ))
+        return results
+
+    @staticmethod
+    async def _existing_entry_ids(
+        project_id: int,
+        db: AsyncSession
+    ) -> Dict[int, int]:
+        """Map requirement id -> id of its active matrix entry, for the project's requirements that have one"""
+        result = await db.execute(_EXISTING_ENTRIES_STMT, {"project_id": project_id})
+        return dict(result.all())
+
+    async def _save_generated_entries(
+        self,
+        generated: List[Tuple[Requirement, Dict[str, Any]]],
+        user_id: int,
+        db: AsyncSession
+    ) -> List[Dict[str, Any]]:
+        """Insert generated entries with a single INSERT ... RETURNING and one commit"""
+        if not generated:
+            return []
+        
+        rows = [
+            self._matrix_entry_row(requirement, generated_entry, user_id)
+            for requirement, generated_entry in generated
+        ]
+        try:
+            result = await db.execute(_INSERT_ENTRIES_STMT, rows)
+            entry_ids = result.scalars().all()
             await db.commit()
-            
-            return {
-                "success": True,
-                "requirement_id": requirement.id,
-                "matrix_entry_id": matrix_entry.id,
-                "confidence_score": generated_entry.get("confidence_score", 0)
-            }
-            
         except Exception as e:
+            logger.error(f"Failed to save {len(rows)} matrix entries: {e}")
             await db.rollback()
-            return {
-                "success": False,
+            return [
+                {"success": False, "requirement_id": requirement.id, "error": str(e)}
+                for requirement, _ in generated
+            ]
+        
+        return [
+            {
+                "success": "generation_error" not in generated_entry,
                 "requirement_id": requirement.id,
-                "error": str(e)
+                "matrix_entry_id": entry_id,
+                "confidence_score": generated_entry.get("confidence_score", 0)
             }
+            for (requirement, generated_entry), entry_id in zip(generated, entry_ids)
+        ]
+
+    @staticmethod
+    def _matrix_entry_row(
+        requirement: Requirement,
+        generated_entry: Dict[str, Any],
+        user_id: int
+    ) -> Dict[str, Any]:
+        """Column values of the matrix_entries row for a generated entry"""
+        metadata = generated_entry.get("generation_metadata") or {}
+        return {
+            "requirement_id": requirement.id,
+            "spec_reference": generated_entry.get("spec_reference"),
+            "supplier_response": generated_entry.get("supplier_response"),
+            "justification": generated_entry.get("justification"),
+            "compliance_status": generated_entry.get("compliance_status"),
+            "test_reference": generated_entry.get("test_reference"),
+            "risk_assessment": generated_entry.get("risk_assessment"),
+            "comments": generated_entry.get("comments"),
+            "generation_model": metadata.get("model"),
+            "generation_metadata": metadata or None,
+            "created_by": user_id,
+            "review_status": "pending"
+        }
+
+    async def _generate_single_matrix_entry(
+        self,
+        requirement: Requirement,
+        combined_specs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Generate the matrix entry for a single requirement (not saved)
+        Fallback for requirements a packed call could not answer
+        """
+        return await self.ai_service.generate_matrix_entry(
+            requirement=requirement.description,
+            requirement_category=requirement.category or "General",
+            extracted_specs=combined_specs,
+            project_context={
+                "project_id": requirement.project_id,
+                "requirement_id": requirement.requirement_id,
+                "priority": requirement.priority
+            }
+        )
+
+    async def _project_specifications(
+        self,
+        project_id: int,
+        db: AsyncSession
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Combined specifications of a project's extracted documents (None if there are none)
+        The cache version is the (id, extracted_at) of every completed document, so a new
+        extraction or a deleted document invalidates the entry before its TTL runs out
+        """
+        result = await db.execute(_DOCUMENT_VERSIONS_STMT, {"project_id": project_id})
+        version = tuple(tuple(row) for row in result.all())
+        if not version:
+            return None
+
+        cache = MatrixGenerator._specs_cache
+        cached = cache.get(project_id)
+        if cached is not None and cached[0] == version and cached[1] > time.monotonic():
+            cache.move_to_end(project_id)
+            return cached[2]
+
+        result = await db.execute(_DOCUMENT_SPECS_STMT, {"project_id": project_id})
+        combined = await self._combine_document_specifications(result.all())
+        cache[project_id] = (version, time.monotonic() + self.SPECS_CACHE_TTL, combined)
+        cache.move_to_end(project_id)
+        while len(cache) > self.SPECS_CACHE_SIZE:
+            cache.popitem(last=False)
+        return combined
 
     async def _combine_document_specifications(
-        self, documents: List[Document]
+        self, documents: Sequence[Row]
     ) -> Dict[str, Any]:
-        """Combine extracted specifications from multiple documents"""
+        """
+        Combine extracted specifications from multiple documents
+        ``documents`` are rows with id, original_filename, extraction_model,
+        extracted_at and extracted_json
+        """
 
-        logger.info(f"_combine_document_specifications called with {len(documents)} documents")
+        logger.debug(f"_combine_document_specifications called with {len(documents)} documents")
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
         combined = {
             "documents": [],
             "document_sources": []
         }
+        seen_sections = set()
 
         for doc in documents:
-            logger.info(f"Processing document {doc.id}: {doc.original_filename}")
-            logger.info(f"  has extracted_json: {doc.extracted_json is not None}")
-
             if not doc.extracted_json:
-                logger.warning(f"  Document {doc.id} has no extracted_json, skipping")
+                logger.warning(f"Document {doc.id} has no extracted_json, skipping")
                 continue
 
-            logger.info(f"  document_info: {doc.extracted_json.get('document_info', {})}")
-            sections_count = len(doc.extracted_json.get('sections', []))
-            logger.info(f"  sections count: {sections_count}")
+            if debug_enabled:
+                sections_count = len(doc.extracted_json.get('sections', []))
+                logger.debug(
+                    f"Processing document {doc.id}: {doc.original_filename} "
+                    f"({sections_count} sections, document_info: {doc.extracted_json.get('document_info', {})})"
+                )
+                if sections_count > 0:
+                    logger.debug(f"  First section preview: {str(doc.extracted_json['sections'][0])[:200]}")
 
-            if sections_count > 0:
-                first_section_preview = str(doc.extracted_json['sections'][0])[:200]
-                logger.info(f"  First section preview: {first_section_preview}")
+            # Drop sections already included verbatim from an earlier document
+            # (shared boilerplate would otherwise be sent twice in every prompt)
+            sections = []
+            for section in _compact(doc.extracted_json.get("sections", [])):
+                fingerprint = orjson.dumps(section)
+                if fingerprint not in seen_sections:
+                    seen_sections.add(fingerprint)
+                    sections.append(section)
 
             # Add full extracted document with actual content
             combined["documents"].append({
                 "filename": doc.original_filename,
-                "document_info": doc.extracted_json.get("document_info", {}),
-                "sections": doc.extracted_json.get("sections", []),
+                "document_info": _compact(doc.extracted_json.get("document_info", {})),
+                "sections": sections,
                 "extraction_metadata": doc.extracted_json.get("extraction_metadata", {})
             })
 
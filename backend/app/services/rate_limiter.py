@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket rate limiter
+    Allows ``rate`` acquisitions per ``per`` seconds on average, in bursts of up
+    to ``rate``; waiters are served in arrival order
+    """
+
+    def __init__(self, rate: float, per: float = 60.0):
+        self.capacity = rate
+        self.refill_per_second = rate / per
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.refill_per_second
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.refill_per_second)
@@ -0,0 +1,105 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterator, List
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Words too common in requirements/specs to help ranking
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "shall", "should", "that", "the", "this", "to", "with", "must"
+})
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _section_text(section: Dict[str, Any]) -> str:
+    """Searchable text of one section: heading, content, lists and table cells"""
+    parts = [str(section.get("section_number", "")), str(section.get("heading", "")),
+             str(section.get("content", ""))]
+    parts.extend(str(item) for item in section.get("lists") or [])
+    for table in section.get("tables") or []:
+        parts.append(str(table.get("caption", "")))
+        parts.extend(str(cell) for cell in table.get("headers") or [])
+        for row in table.get("rows") or []:
+            parts.extend(str(cell) for cell in row)
+    return " ".join(parts)
+
+
+def _iter_sections(extracted_specs: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Flatten sections and nested subsections of all documents, in document order"""
+    for document in extracted_specs.get("documents", []):
+        filename = document.get("filename")
+        stack = list(reversed(document.get("sections") or []))
+        while stack:
+            section = stack.pop()
+            if not isinstance(section, dict):
+                continue
+            yield {
+                "filename": filename,
+                **{key: value for key, value in section.items() if key != "subsections"}
+            }
+            stack.extend(reversed(section.get("subsections") or []))
+
+
+class SectionIndex:
+    """
+    BM25 index over the sections of extracted specifications
+    Used to put only the sections relevant to a requirement into its prompt
+    """
+
+    def __init__(self, extracted_specs: Dict[str, Any], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.sections = list(_iter_sections(extracted_specs))
+        self._term_counts = [Counter(tokenize(_section_text(s))) for s in self.sections]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+        doc_freq: Counter = Counter()
+        for counts in self._term_counts:
+            doc_freq.update(counts.keys())
+        n = len(self.sections)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def _score(self, index: int, query_terms: List[str]) -> float:
+        counts = self._term_counts[index]
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / (self._avg_length or 1))
+        score = 0.0
+        for term in query_terms:
+            tf = counts.get(term)
+            if tf:
+                score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+    def top_k(self, query: str, k: int) -> List[Dict[str, Any]]:
+        """
+        Return the k sections most relevant to ``query``
+
+        Args:
+            query: Requirement text (plus category)
+            k: Maximum number of sections
+
+        Returns:
+            Matching sections in document order
+        """
+        if len(self.sections) <= k:
+            return list(self.sections)
+
+        query_terms = list(set(tokenize(query)))
+        best = heapq.nlargest(
+            k,
+            range(len(self.sections)),
+            key=lambda i: (self._score(i, query_terms), -i)
+        )
+        return [self.sections[i] for i in sorted(best)]
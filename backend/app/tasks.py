@@ -1,13 +1,22 @@
+import asyncio
+import csv
+import io
 import logging
+import orjson
 from datetime import datetime, timedelta
 from celery import Celery
-from sqlalchemy import create_engine, select, update
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy import create_engine, delete, or_, select, update
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
 
 from app.core.config import settings
+from app.core.database import json_serializer
 from app.models.document import Document
 from app.models.project import Project
+from app.models.project_access import ProjectAccess
+from app.models.requirement import Requirement
+from app.models.matrix import MatrixEntry
 from app.models.audit_log import AuditLog
 
 logger = logging.getLogger(__name__)
@@ -48,9 +57,90 @@ sync_db_url = str(settings.DATABASE_URL).replace(
     'postgresql+psycopg2://'
 )
 
-sync_engine = create_engine(sync_db_url, pool_pre_ping=True)
+# Small per-process pool (worker_prefetch_multiplier=1: one task at a time per process)
+# No pre-ping: it costs a round-trip per checkout; pool_recycle bounds connection age
+sync_engine = create_engine(
+    sync_db_url,
+    pool_pre_ping=False,
+    pool_recycle=300,
+    pool_size=2,
+    max_overflow=6,
+    json_serializer=json_serializer,
+    json_deserializer=orjson.loads,
+)
 SyncSessionLocal = sessionmaker(bind=sync_engine)
 
+# Projects purged per transaction (bounds IN-list size and transaction length)
+PURGE_CHUNK_SIZE = 500
+
+# Per worker process: one event loop and long-lived services, so Gemini/HTTP
+# connection pools and caches survive across tasks
+_EVENT_LOOP = None
+_AI_SERVICE = None
+_DOC_PROCESSOR = None
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Create the worker process's event loop and services"""
+    global _EVENT_LOOP, _AI_SERVICE, _DOC_PROCESSOR
+    # Connections inherited from the parent across fork must not be reused here
+    sync_engine.dispose(close=False)
+
+    # Import here to avoid circular imports
+    from app.services.ai_service import AIService
+    from app.services.document_processor import DocumentProcessor
+    import uvloop  # Installed with uvicorn[standard]
+
+    _EVENT_LOOP = uvloop.new_event_loop()
+    asyncio.set_event_loop(_EVENT_LOOP)
+    _AI_SERVICE = AIService()
+    _DOC_PROCESSOR = DocumentProcessor()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """Close pooled clients and the worker process's event loop"""
+    global _EVENT_LOOP
+    if _EVENT_LOOP is None:
+        return
+    from app.services.ai_service import close_gemini_http_client
+    from app.services.matrix_cache import close_matrix_cache_client
+
+    try:
+        _EVENT_LOOP.run_until_complete(close_gemini_http_client())
+        _EVENT_LOOP.run_until_complete(close_matrix_cache_client())
+        _EVENT_LOOP.run_until_complete(_EVENT_LOOP.shutdown_asyncgens())
+    finally:
+        _EVENT_LOOP.close()
+        _EVENT_LOOP = None
+
+
+async def _extract_document(
+    document_id: int,
+    file_path: str,
+    filename: str,
+    mime_type: str,
+    file_hash: bytes
+) -> dict:
+    """Read a stored document and extract its specifications with Gemini"""
+    file_content = await _DOC_PROCESSOR.get_file_content(file_path)
+    
+    if not file_content:
+        raise Exception(f"Failed to read file: {file_path}")
+    
+    logger.info(f"File read successfully, size: {len(file_content)} bytes")
+    
+    # Extract specifications with Gemini
+    logger.info(f"Calling Gemini API for document {document_id}")
+    return await _AI_SERVICE.extract_document_specifications(
+        document_content=file_content,
+        filename=filename,
+        mime_type=mime_type,
+        file_path=file_path,
+        content_hash=file_hash
+    )
+
 
 @celery_app.task(name="tasks.process_document", bind=True, max_retries=3)
 def process_document_task(self, document_id: int):
@@ -76,52 +166,32 @@ def process_document_task(self, document_id: int):
         document.extraction_status = "processing"
         db.commit()
         
-        # Initialize services (import here to avoid circular imports)
-        from app.services.ai_service import AIService
-        from app.services.document_processor import DocumentProcessor
-        import asyncio
+        # worker_process_init only fires for the prefork pool; set up lazily otherwise
+        if _EVENT_LOOP is None:
+            init_worker_process()
         
-        ai_service = AIService()
-        doc_processor = DocumentProcessor()
+        # One pass through the worker's persistent loop for the whole async part
+        extracted_data = _EVENT_LOOP.run_until_complete(
+            _extract_document(
+                document_id,
+                document.file_path,
+                document.original_filename,
+                document.mime_type,
+                document.file_hash
+            )
+        )
         
-        # Read file content (this is async, so we need to run it in event loop)
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        logger.info(f"Gemini extraction completed for document {document_id}")
         
-        try:
-            file_content = loop.run_until_complete(
-                doc_processor.get_file_content(document.file_path)
-            )
-            
-            if not file_content:
-                raise Exception(f"Failed to read file: {document.file_path}")
-            
-            logger.info(f"File read successfully, size: {len(file_content)} bytes")
-            
-            # Extract specifications with Gemini
-            logger.info(f"Calling Gemini API for document {document_id}")
-            extracted_data = loop.run_until_complete(
-                ai_service.extract_document_specifications(
-                    document_content=file_content,
-                    filename=document.original_filename,
-                    mime_type=document.mime_type
-                )
-            )
-            
-            logger.info(f"Gemini extraction completed for document {document_id}")
-            
-            # Update document with extracted data
-            document.extracted_json = extracted_data
-            document.extraction_status = "completed"
-            document.extraction_model = "gemini-1.5-flash"
-            document.extracted_at = func.now()
-            
-            db.commit()
-            
-            logger.info(f"Document {document_id} extraction completed successfully")
-            
-        finally:
-            loop.close()
+        # Update document with extracted data
+        document.extracted_json = extracted_data
+        document.extraction_status = "completed"
+        document.extraction_model = "gemini-1.5-flash"
+        document.extracted_at = func.now()
+        
+        db.commit()
+        
+        logger.info(f"Document {document_id} extraction completed successfully")
         
     except Exception as e:
         logger.error(f"Error processing document {document_id}: {str(e)}", exc_info=True)
@@ -151,6 +221,40 @@ def health_check_task():
     return {"status": "healthy", "task": "health_check"}
 
 
+# Audit columns written by copy_audit_rows() (timestamp comes from the server default)
+AUDIT_COPY_COLUMNS = ("user_id", "action", "entity_type", "entity_id", "ip_address", "user_agent", "details")
+
+
+def copy_audit_rows(db, rows: list) -> None:
+    """
+    Append audit log rows with a single COPY in the session's current transaction
+
+    Args:
+        db: Sync session (psycopg2 connection)
+        rows: Column value dicts as returned by AuditLog.build_values()
+    """
+    if not rows:
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # None is written as an empty unquoted field, which COPY reads as NULL
+        writer.writerow([
+            json_serializer(row["details"]) if column == "details" and row["details"] is not None
+            else row[column]
+            for column in AUDIT_COPY_COLUMNS
+        ])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY audit_logs ({', '.join(AUDIT_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
 @celery_app.task(name="tasks.purge_old_deleted_projects")
 def purge_old_deleted_projects_task():
     """
@@ -169,13 +273,13 @@ def purge_old_deleted_projects_task():
 
         logger.info(f"Starting purge of projects deleted before {cutoff_date.isoformat()}")
 
-        # Query for projects soft-deleted before cutoff date
-        stmt = select(Project).where(
+        # Query for projects soft-deleted before cutoff date (only the columns the audit needs)
+        stmt = select(Project.id, Project.name, Project.deleted_at).where(
             Project.deleted_at.isnot(None),
             Project.deleted_at < cutoff_date
         )
 
-        projects_to_purge = db.execute(stmt).scalars().all()
+        projects_to_purge = db.execute(stmt).all()
 
         if not projects_to_purge:
             logger.info("No projects to purge")
@@ -183,38 +287,51 @@ def purge_old_deleted_projects_task():
 
         logger.info(f"Found {len(projects_to_purge)} projects to purge")
 
-        for project in projects_to_purge:
+        for i in range(0, len(projects_to_purge), PURGE_CHUNK_SIZE):
+            chunk = projects_to_purge[i:i + PURGE_CHUNK_SIZE]
+            project_ids = [project.id for project in chunk]
             try:
-                # Log audit event before permanent deletion
-                audit_entry = AuditLog(
-                    user_id=None,  # System action
-                    action="PROJECT_PURGED",
-                    entity_type="project",
-                    entity_id=project.id,
-                    ip_address="system",
-                    user_agent="celery-worker",
-                    details={
-                        "project_name": project.name,
-                        "project_id": project.id,
-                        "deleted_at": project.deleted_at.isoformat() if project.deleted_at else None,
-                        "retention_days": settings.DATA_RETENTION_DAYS,
-                        "reason": "Automatic purge - retention period exceeded"
-                    },
-                    timestamp=func.now()
-                )
-                db.add(audit_entry)
-                db.flush()
-
-                # Hard delete (CASCADE will handle related documents, requirements, matrix entries)
-                logger.info(f"Permanently deleting project {project.id}: {project.name}")
-                db.delete(project)
+                # Log audit events before permanent deletion
+                copy_audit_rows(db, [
+                    AuditLog.build_values(
+                        user_id=None,  # System action
+                        action="PROJECT_PURGED",
+                        entity_type="project",
+                        entity_id=project.id,
+                        ip_address="system",
+                        user_agent="celery-worker",
+                        details={
+                            "project_name": project.name,
+                            "project_id": project.id,
+                            "deleted_at": project.deleted_at.isoformat() if project.deleted_at else None,
+                            "retention_days": settings.DATA_RETENTION_DAYS,
+                            "reason": "Automatic purge - retention period exceeded"
+                        }
+                    )
+                    for project in chunk
+                ])
+
+                # Hard delete children first: requirements, documents and matrix_entries.requirement_id
+                # reference their parents without ON DELETE CASCADE. Migrations 001/002 declare it for
+                # project_access and matrix_entries.document_id, but tables created by create_all from
+                # the models do not carry it, so those rows are deleted explicitly as well
+                requirement_ids = select(Requirement.id).where(Requirement.project_id.in_(project_ids))
+                document_ids = select(Document.id).where(Document.project_id.in_(project_ids))
+                db.execute(delete(MatrixEntry).where(or_(
+                    MatrixEntry.requirement_id.in_(requirement_ids),
+                    MatrixEntry.document_id.in_(document_ids)
+                )))
+                db.execute(delete(Requirement).where(Requirement.project_id.in_(project_ids)))
+                db.execute(delete(Document).where(Document.project_id.in_(project_ids)))
+                db.execute(delete(ProjectAccess).where(ProjectAccess.project_id.in_(project_ids)))
+                db.execute(delete(Project).where(Project.id.in_(project_ids)))
                 db.commit()
 
-                purged_count += 1
-                logger.info(f"Successfully purged project {project.id}")
+                purged_count += len(chunk)
+                logger.info(f"Successfully purged projects {project_ids}")
 
             except Exception as e:
-                logger.error(f"Failed to purge project {project.id}: {str(e)}", exc_info=True)
+                logger.error(f"Failed to purge projects {project_ids}: {str(e)}", exc_info=True)
                 db.rollback()
                 continue
 
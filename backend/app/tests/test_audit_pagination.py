@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.audit import _paginate
+from app.models.audit_log import AuditLog
+
+CURSOR_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_first_page_and_cursor_page_use_the_same_order():
+    first = _sql(_paginate(select(AuditLog.id), 0, 50, None, None))
+    cursor = _sql(_paginate(select(AuditLog.id), 0, 50, CURSOR_TIME, 42))
+
+    order = "ORDER BY audit_logs.timestamp DESC, audit_logs.id DESC"
+    assert order in first
+    assert order in cursor
+    assert "(audit_logs.timestamp, audit_logs.id) <" in cursor
+
+
+@pytest.mark.parametrize("before_timestamp, before_id", [(CURSOR_TIME, None), (None, 42)])
+def test_incomplete_cursor_is_rejected(before_timestamp, before_id):
+    with pytest.raises(HTTPException) as error:
+        _paginate(select(AuditLog.id), 0, 50, before_timestamp, before_id)
+    assert error.value.status_code == 400
+
+
+def test_offset_with_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        _paginate(select(AuditLog.id), 100, 50, CURSOR_TIME, 42)
+    assert error.value.status_code == 400
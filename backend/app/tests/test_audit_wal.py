@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+
+from app.services.audit_logger import (
+    WAL_RECORD_ENTRY,
+    AuditLogBuffer,
+    AuditWal,
+    WalRecordHeader,
+    pack_wal_record,
+)
+
+
+def _entry(number: int) -> dict:
+    return {
+        "user_id": 1,
+        "action": f"ACTION_{number}",
+        "entity_type": "project",
+        "entity_id": number,
+        "timestamp": datetime(2026, 1, 1, 12, 0, number, tzinfo=timezone.utc),
+    }
+
+
+def _record(number: int, sequence: int) -> bytes:
+    return pack_wal_record(WAL_RECORD_ENTRY, sequence, orjson.dumps(_entry(number)))
+
+
+def _actions(wal) -> list:
+    return [entry["action"] for entry in AuditWal.read_pending(wal.path)]
+
+
+def _append(wal, *numbers) -> None:
+    for future in [wal.append(_entry(number)) for number in numbers]:
+        future.result()
+
+
+@pytest.fixture
+def wal(tmp_path):
+    wal = AuditWal(str(tmp_path))
+    yield wal
+    wal.close()
+
+
+def test_replays_all_entries_without_checkpoint(wal):
+    _append(wal, 0, 1, 2)
+
+    pending = AuditWal.read_pending(wal.path)
+
+    assert [entry["action"] for entry in pending] == ["ACTION_0", "ACTION_1", "ACTION_2"]
+    assert pending[2]["timestamp"] == _entry(2)["timestamp"]
+
+
+@pytest.mark.parametrize("cut", [1, WalRecordHeader.size - 1, WalRecordHeader.size + 3])
+def test_replay_after_partial_write_keeps_complete_records(wal, cut):
+    _append(wal, 0, 1)
+    # A crash in the middle of writing the third record
+    with open(wal.path, "ab") as f:
+        f.write(_record(2, 3)[:cut])
+
+    assert _actions(wal) == ["ACTION_0", "ACTION_1"]
+
+
+@pytest.mark.parametrize("offset", [
+    pytest.param(0, id="crc"),
+    pytest.param(6, id="sequence"),
+    pytest.param(WalRecordHeader.size - 1, id="size"),
+    pytest.param(WalRecordHeader.size + 5, id="payload"),
+])
+def test_replay_stops_at_corrupt_record(wal, offset):
+    _append(wal, 0, 1, 2)
+    data = bytearray(wal.path.read_bytes())
+    # Flip a byte of the second record
+    data[len(_record(0, 1)) + offset] ^= 0xFF
+    wal.path.write_bytes(bytes(data))
+
+    assert _actions(wal) == ["ACTION_0"]
+
+
+def test_checkpoint_followed_by_more_appends(wal):
+    _append(wal, 0, 1, 2)
+    wal.mark_applied(2, pending=1).result()
+    _append(wal, 3, 4)
+
+    assert _actions(wal) == ["ACTION_2", "ACTION_3", "ACTION_4"]
+
+    # Checkpoints name the last applied entry, independent of earlier records
+    wal.mark_applied(2, pending=1).result()
+    assert _actions(wal) == ["ACTION_4"]
+
+
+def test_drained_log_is_truncated(wal):
+    _append(wal, 0, 1)
+    wal.mark_applied(2, pending=0).result()
+
+    assert wal.path.stat().st_size == 0
+    assert AuditWal.read_pending(wal.path) == []
+
+    # Numbering continues after truncation
+    _append(wal, 5, 6)
+    wal.mark_applied(1, pending=1).result()
+    assert _actions(wal) == ["ACTION_6"]
+
+
+def test_queued_records_are_written_in_order(wal):
+    futures = [wal.append(_entry(number)) for number in range(20)]
+    futures.append(wal.mark_applied(15, pending=5))
+    for future in futures:
+        future.result()
+
+    assert _actions(wal) == [f"ACTION_{number}" for number in range(15, 20)]
+
+
+@pytest.mark.asyncio
+async def test_buffer_add_returns_once_logged(tmp_path):
+    buffer = AuditLogBuffer(buffer_size=10, wal_dir=str(tmp_path))
+    buffer._wal = AuditWal(str(tmp_path))
+    try:
+        await buffer.add(_entry(0))
+        assert _actions(buffer._wal) == ["ACTION_0"]
+        assert len(buffer) == 1
+    finally:
+        buffer._wal.close()
@@ -0,0 +1,18 @@
+from app.services.matrix_generator import _compact
+
+
+def test_empty_dict_fields_are_dropped():
+    assert _compact({"title": " URS ", "notes": "", "tags": [], "meta": {"a": None}, "page": 0}) == {
+        "title": "URS", "page": 0
+    }
+
+
+def test_table_cells_keep_their_columns():
+    table = {
+        "headers": ["ID", "", "Result"],
+        "rows": [["4.1", " ", "Pass"], ["", None, "Fail"], []],
+    }
+    assert _compact(table) == {
+        "headers": ["ID", "", "Result"],
+        "rows": [["4.1", "", "Pass"], ["", None, "Fail"], []],
+    }
@@ -0,0 +1,102 @@
+import asyncio
+from collections import OrderedDict
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.services import ai_service
+from app.services.ai_service import GEMINI_CONTEXT_CACHE_MIN_CHARS, AIService
+
+PREFIX = "x" * GEMINI_CONTEXT_CACHE_MIN_CHARS
+
+
+class FakeModel:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        if self.error is not None:
+            raise self.error
+        return self.name
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = AIService.__new__(AIService)
+    service.gemini_matrix_model = FakeModel("plain")
+    service.gemini_matrix_generation_config = {}
+    service._gemini_context_models = OrderedDict()
+    service._gemini_context_lock = asyncio.Lock()
+
+    created = []
+
+    def create(**kwargs):
+        if service.create_error is not None:
+            raise service.create_error
+        created.append(kwargs["contents"][0])
+        return SimpleNamespace(name=f"cache-{len(created)}")
+
+    service.create_error = None
+    service.created = created
+    monkeypatch.setattr(ai_service.settings, "GEMINI_CONTEXT_CACHE_ENABLED", True)
+    monkeypatch.setattr(ai_service.settings, "MATRIX_USE_RAG", False)
+    monkeypatch.setattr(ai_service.genai.caching.CachedContent, "create", staticmethod(create))
+    monkeypatch.setattr(
+        ai_service.genai.GenerativeModel, "from_cached_content",
+        staticmethod(lambda cached_content, generation_config: FakeModel(cached_content.name))
+    )
+    return service
+
+
+def _age(service, by: timedelta):
+    for key, (model, expires) in service._gemini_context_models.items():
+        service._gemini_context_models[key] = (model, expires - by)
+
+
+@pytest.mark.asyncio
+async def test_cache_is_reused_then_recreated_before_expiry(service):
+    model, cached = await service._gemini_matrix_model_for_prefix(PREFIX)
+    assert (model.name, cached) == ("cache-1", True)
+    assert (await service._gemini_matrix_model_for_prefix(PREFIX))[0] is model
+
+    _age(service, timedelta(seconds=ai_service.settings.GEMINI_CONTEXT_CACHE_TTL) - AIService.GEMINI_CONTEXT_REFRESH_MARGIN)
+
+    model, cached = await service._gemini_matrix_model_for_prefix(PREFIX)
+    assert (model.name, cached) == ("cache-2", True)
+
+
+@pytest.mark.asyncio
+async def test_failed_creation_is_retried_after_backoff(service):
+    service.create_error = RuntimeError("quota")
+    assert await service._gemini_matrix_model_for_prefix(PREFIX) == (service.gemini_matrix_model, False)
+
+    service.create_error = None
+    assert await service._gemini_matrix_model_for_prefix(PREFIX) == (service.gemini_matrix_model, False)
+
+    _age(service, AIService.GEMINI_CONTEXT_RETRY_BACKOFF)
+    model, cached = await service._gemini_matrix_model_for_prefix(PREFIX)
+    assert (model.name, cached) == ("cache-1", True)
+
+
+@pytest.mark.asyncio
+async def test_models_are_bounded(service):
+    for number in range(AIService.GEMINI_CONTEXT_CACHE_SIZE + 3):
+        await service._gemini_matrix_model_for_prefix(PREFIX + str(number))
+    assert len(service._gemini_context_models) == AIService.GEMINI_CONTEXT_CACHE_SIZE
+
+
+@pytest.mark.parametrize("error", [google_exceptions.NotFound("gone"), google_exceptions.PermissionDenied("denied")])
+@pytest.mark.asyncio
+async def test_unusable_cache_falls_back_to_full_prompt(service, error):
+    model, _ = await service._gemini_matrix_model_for_prefix(PREFIX)
+    model.error = error
+
+    assert await service._generate_gemini_matrix_content(PREFIX, "suffix") == "plain"
+    assert model.prompts == ["suffix"]
+    assert service.gemini_matrix_model.prompts == [PREFIX + "suffix"]
+    assert service._gemini_context_models == {}
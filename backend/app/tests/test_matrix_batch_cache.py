@@ -0,0 +1,145 @@
+import asyncio
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from app.services import ai_service
+from app.services.ai_service import AIService
+
+SPECS = {"documents": [{"sections": [{"heading": "Audit", "content": "Audit trail is always on"}]}]}
+
+
+def _entry(reference: str) -> dict:
+    return {
+        "spec_reference": reference,
+        "supplier_response": "Audit trail is always on",
+        "justification": "Covered by the audit section",
+        "compliance_status": "Compliant",
+        "confidence_score": 0.9,
+        "comments": "",
+    }
+
+
+class FakeCache:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, response):
+        self.values[key] = response
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(ai_service.settings, "MATRIX_USE_RAG", False)
+    monkeypatch.setattr(ai_service.settings, "MATRIX_GENERATION_PROVIDER", "gemini")
+    service = AIService.__new__(AIService)
+    service.llm_cache = FakeCache()
+    service.matrix_cache = None
+    service._gemini_sem = asyncio.Semaphore(4)
+    service._specs_json_cache = OrderedDict()
+    service.prompts = []
+
+    async def generate_content(prompt_prefix, prompt_suffix):
+        service.prompts.append(prompt_suffix)
+        ids = [line.split('"')[3] for line in prompt_suffix.splitlines() if line.strip().startswith('"id"')]
+        return SimpleNamespace(text=orjson.dumps({"entries": [{"id": i, **_entry(f"4.{i}")} for i in ids]}).decode())
+
+    async def generate_single(requirement, requirement_category, extracted_specs, project_context=None, use_cache=True):
+        service.prompts.append(f"single:{requirement}")
+        entry = _entry("single")
+        entry["generation_metadata"] = {"requirement": requirement}
+        return entry
+
+    service._generate_gemini_matrix_content = generate_content
+    service._generate_matrix_with_gemini = generate_single
+    return service
+
+
+def _items(*requirements, use_cache=True):
+    return [
+        {"requirement": r, "requirement_category": "Functional", "extracted_specs": SPECS, "use_cache": use_cache}
+        for r in requirements
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batched_entries_are_cached_per_requirement(service):
+    first = await service._generate_matrix_batch_with_gemini(_items("A", "B", "C"))
+    assert len(service.prompts) == 1
+    assert len(service.llm_cache.values) == 3
+
+    second = await service._generate_matrix_batch_with_gemini(_items("A", "B", "C"))
+
+    assert len(service.prompts) == 1
+    assert [e["spec_reference"] for e in second] == [e["spec_reference"] for e in first]
+    assert all(e["generation_metadata"]["cache_hit"] for e in second)
+
+
+@pytest.mark.asyncio
+async def test_only_misses_are_sent(service):
+    await service._generate_matrix_batch_with_gemini(_items("A", "B"))
+    service.prompts.clear()
+
+    entries = await service._generate_matrix_batch_with_gemini(_items("A", "B", "C", "D"))
+
+    assert len(service.prompts) == 1
+    assert '"C"' in service.prompts[0] and '"D"' in service.prompts[0]
+    assert '"A"' not in service.prompts[0]
+    assert [e["generation_metadata"].get("cache_hit", False) for e in entries] == [True, True, False, False]
+
+
+@pytest.mark.asyncio
+async def test_single_miss_uses_the_single_entry_path(service):
+    await service._generate_matrix_batch_with_gemini(_items("A", "B"))
+    service.prompts.clear()
+
+    entries = await service._generate_matrix_batch_with_gemini(_items("A", "B", "C"))
+
+    assert service.prompts == ["single:C"]
+    assert entries[2]["spec_reference"] == "single"
+
+
+@pytest.mark.asyncio
+async def test_use_cache_false_skips_lookup_and_store(service):
+    await service._generate_matrix_batch_with_gemini(_items("A", "B"))
+    service.prompts.clear()
+    cached = dict(service.llm_cache.values)
+
+    await service._generate_matrix_batch_with_gemini(_items("A", "B", use_cache=False))
+
+    assert len(service.prompts) == 1
+    assert service.llm_cache.values == cached
+
+
+@pytest.mark.asyncio
+async def test_keys_match_the_single_entry_prompt(service):
+    prefix, suffix = service._build_gemini_matrix_prompt("A", "Functional", SPECS)
+    key = service._matrix_cache_key(ai_service.settings.GEMINI_MODEL_MATRIX, prefix + suffix, True)
+    service.llm_cache.values[key] = orjson.dumps(_entry("from-single")).decode()
+
+    entries = await service._generate_matrix_batch_with_gemini(_items("A", "B"))
+
+    assert entries[0]["spec_reference"] == "from-single"
+    assert service.prompts == ["single:B"]
+
+
+@pytest.mark.asyncio
+async def test_packed_generation_packs_only_uncached_requirements(service, monkeypatch):
+    monkeypatch.setattr(ai_service.settings, "MATRIX_PACK_SIZE", 2)
+    await service.generate_matrix_entries_packed(_items("A", "B", "C"))
+    assert service.prompts[0].count('"id": ') == 2
+    assert service.prompts[1] == "single:C"
+    service.prompts.clear()
+
+    entries = await service.generate_matrix_entries_packed(_items("A", "X", "B", "Y"))
+
+    # The two misses fill one pack instead of two half-cached ones
+    assert len(service.prompts) == 1
+    assert '"X"' in service.prompts[0] and '"Y"' in service.prompts[0]
+    assert [e["generation_metadata"].get("cache_hit", False) for e in entries] == [True, False, True, False]
+    assert len(service.llm_cache.values) == 4
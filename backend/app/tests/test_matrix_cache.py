@@ -0,0 +1,71 @@
+from collections import Counter
+
+import pytest
+
+from app.core.config import settings
+from app.services import matrix_cache
+from app.services.matrix_cache import MatrixEntryCache, combine_matrix_entries, tokenize
+
+
+def _candidates(*texts):
+    return {f"k{i}": Counter(tokenize(text)) for i, text in enumerate(texts, start=1)}
+
+
+@pytest.mark.parametrize("query", [
+    "The system shall not encrypt audit records at rest",
+    "The system shouldn't encrypt audit records at rest",
+    "The system shall never encrypt audit records at rest",
+])
+def test_negated_requirement_never_matches(query):
+    candidates = _candidates("The system shall encrypt audit records at rest")
+    assert MatrixEntryCache._best_match(candidates, query) == (None, 0.0)
+
+
+def test_different_numbers_never_match():
+    candidates = _candidates("Audit records shall be retained for 10 years")
+    assert MatrixEntryCache._best_match(candidates, "Audit records shall be retained for 15 years") == (None, 0.0)
+
+
+def test_near_identical_wording_matches():
+    candidates = _candidates("The system shall encrypt audit records at rest")
+    key, score = MatrixEntryCache._best_match(candidates, "The system shall encrypt the audit records at rest")
+    assert key == "k1"
+    assert score > 0.99
+
+
+class _ExactOnlyRedis:
+    def __init__(self):
+        self.hgetall_calls = 0
+
+    async def get(self, key):
+        return None
+
+    async def hgetall(self, key):
+        self.hgetall_calls += 1
+        return {}
+
+
+@pytest.mark.asyncio
+async def test_lookup_is_exact_only_by_default(monkeypatch):
+    client = _ExactOnlyRedis()
+    monkeypatch.setattr(matrix_cache, "_redis_client", lambda: client)
+    monkeypatch.setattr(settings, "MATRIX_SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "MATRIX_GENERATIVE_CACHE_ENABLED", False)
+
+    assert await MatrixEntryCache().lookup("key", "scope", "The system shall log access") is None
+    assert client.hgetall_calls == 0
+
+
+def test_combined_entry_keeps_verification_items():
+    combined = combine_matrix_entries([
+        {"compliance_status": "Compliant", "confidence_score": 0.9,
+         "verification_needed": "Verify audit log export", "spec_reference": "4.1"},
+        {"compliance_status": "Partial", "confidence_score": 0.7,
+         "verification_needed": "Verify audit log export", "spec_reference": "4.2"},
+        {"compliance_status": "Compliant", "confidence_score": 0.8,
+         "verification_needed": "Verify retention settings", "spec_reference": "4.1"},
+    ])
+    assert combined["verification_needed"] == "Verify audit log export\n\nVerify retention settings"
+    assert combined["spec_reference"] == "4.1\n\n4.2"
+    assert combined["compliance_status"] == "Partial"
+    assert combined["confidence_score"] == 0.7
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.matrix_generator import MatrixGenerator
+
+
+def _requirement(id, project_id, description="Audit trail shall be enabled"):
+    return SimpleNamespace(
+        id=id, project_id=project_id, requirement_id=f"URS-{id}",
+        description=description, category="Functional", priority="high"
+    )
+
+
+@pytest.fixture
+def generator():
+    generator = MatrixGenerator.__new__(MatrixGenerator)
+    generator._inflight = {}
+    generator.calls = []
+    release = asyncio.Event()
+
+    async def generate_entries(requirements, combined_specs):
+        if not requirements:
+            return []
+        generator.calls.append([r.id for r in requirements])
+        await release.wait()
+        return [
+            {"spec_reference": f"4.{r.id}", "generation_metadata": {"model": "m", "requirement": r.description}}
+            for r in requirements
+        ]
+
+    generator._generate_entries = generate_entries
+    generator.release = release
+    return generator
+
+
+async def _run(generator, *batches):
+    tasks = [asyncio.create_task(generator._process_requirements_batch(batch, {}, {})) for batch in batches]
+    await asyncio.sleep(0)
+    generator.release.set()
+    return [to_save for _, to_save in await asyncio.gather(*tasks)]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_waiter_gets_its_own_metadata(generator):
+    first, second = await _run(generator, [_requirement(1, 7)], [_requirement(2, 7)])
+
+    assert generator.calls == [[1]]
+    (_, owner_entry), = first
+    (requirement, shared_entry), = second
+    assert requirement.id == 2
+    assert shared_entry["spec_reference"] == owner_entry["spec_reference"]
+    assert shared_entry["generation_metadata"]["source"] == "inflight"
+    assert "source" not in owner_entry["generation_metadata"]
+
+
+@pytest.mark.asyncio
+async def test_other_projects_are_not_coalesced(generator):
+    await _run(generator, [_requirement(1, 7)], [_requirement(2, 8)])
+
+    assert generator.calls == [[1], [2]]
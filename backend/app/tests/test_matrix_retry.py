@@ -0,0 +1,39 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from app.services import ai_service
+from app.services.ai_service import AIService
+
+VALID = (
+    '{"spec_reference": "4.2", "supplier_response": "Audit trail is enabled", '
+    '"justification": "Section 4.2", "compliance_status": "Compliant", "confidence_score": 0.9}'
+)
+
+
+@pytest.mark.asyncio
+async def test_retry_backoff_does_not_hold_a_concurrency_slot(monkeypatch):
+    monkeypatch.setattr(ai_service.settings, "MATRIX_USE_RAG", False)
+    service = AIService.__new__(AIService)
+    service.llm_cache = None
+    service._ollama_sem = asyncio.Semaphore(1)
+    service._specs_json_cache = OrderedDict()
+    responses = iter(['{"spec_reference": 42}', VALID])
+
+    async def stream(prompt):
+        assert service._ollama_sem.locked()
+        return next(responses)
+
+    slot_free_during_backoff = []
+
+    async def sleep(delay):
+        slot_free_during_backoff.append(not service._ollama_sem.locked())
+
+    service._stream_ollama_matrix_json = stream
+    monkeypatch.setattr(ai_service.asyncio, "sleep", sleep)
+
+    entry = await service._generate_matrix_with_ollama("Audit trail", "Functional", {"documents": []})
+
+    assert entry["spec_reference"] == "4.2"
+    assert slot_free_during_backoff == [True]
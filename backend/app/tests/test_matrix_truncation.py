@@ -0,0 +1,39 @@
+import pytest
+
+from app.services.ai_service import MATRIX_TRUNCATED_ERROR, AIService
+
+COMPLETE = (
+    '{"spec_reference": "4.2", "supplier_response": "Audit trail is enabled", '
+    '"justification": "Section 4.2 covers it", "compliance_status": "Compliant", '
+    '"confidence_score": 0.9, "comments": "See the configuration guide"}'
+)
+# Cut inside the last string field: the partial object still passes schema validation
+TRUNCATED = COMPLETE[:COMPLETE.index("configuration")]
+
+
+@pytest.fixture
+def service():
+    return AIService.__new__(AIService)
+
+
+@pytest.fixture(params=["ollama", "gemini"])
+def parse(service, request):
+    return getattr(service, f"_parse_{request.param}_matrix_response")
+
+
+def test_complete_response_is_usable(service, parse):
+    entry = parse(COMPLETE, "Audit trail", "Functional")
+
+    assert "truncated" not in entry["generation_metadata"]
+    assert service._matrix_entry_error(entry) is None
+    assert service._is_reusable_entry(entry)
+
+
+def test_truncated_response_is_flagged_and_not_reusable(service, parse):
+    entry = parse(TRUNCATED, "Audit trail", "Functional")
+
+    assert entry["generation_metadata"]["truncated"] is True
+    assert entry["comments"].startswith("See the ")
+    assert "INCOMPLETE" in entry["comments"]
+    assert service._matrix_entry_error(entry) == MATRIX_TRUNCATED_ERROR
+    assert not service._is_reusable_entry(entry)
@@ -0,0 +1,74 @@
+import pytest
+
+from app.services.ai_service import _JSON_BLOCK_RE, _JsonObjectScanner, _parse_model_json
+
+
+def _extract(response_text: str):
+    """Locate and parse the JSON object the way document extraction does"""
+    match = _JSON_BLOCK_RE.search(response_text)
+    return _parse_model_json(match.group(1) or match.group(2), response_text)
+
+
+@pytest.mark.parametrize("response_text, expected", [
+    pytest.param(
+        '{"spec_reference": "4.2", "compliance_status": "Compliant"}',
+        {"spec_reference": "4.2", "compliance_status": "Compliant"},
+        id="bare",
+    ),
+    pytest.param(
+        'Here is the entry:\n{"spec_reference": "4.2"}\nLet me know if you need more.',
+        {"spec_reference": "4.2"},
+        id="wrapped-in-prose",
+    ),
+    pytest.param(
+        'The "entry" is:\n```json\n{"spec_reference": "4.2"}\n```\n',
+        {"spec_reference": "4.2"},
+        id="fenced",
+    ),
+    pytest.param(
+        '{"comments": "use {placeholders} like \\"}\\"", "nested": {"a": "}", "b": ["{"]}}',
+        {"comments": 'use {placeholders} like "}"', "nested": {"a": "}", "b": ["{"]}},
+        id="braces-inside-strings",
+    ),
+    pytest.param(
+        'Result: {"spec_reference": "4.2"} (see section {4} for details)',
+        {"spec_reference": "4.2"},
+        id="prose-with-braces-after-object",
+    ),
+])
+def test_complete_responses(response_text, expected):
+    assert _extract(response_text) == (expected, True)
+
+
+def test_truncated_response_keeps_complete_fields():
+    value, complete = _extract('{"document_info": {"title": "URS"}, "sections": [{"heading": "Scope", "content": "The sys')
+
+    assert complete is False
+    assert value["document_info"] == {"title": "URS"}
+    assert value["sections"][0]["content"] == "The sys"
+
+
+def test_response_without_object_raises():
+    with pytest.raises(ValueError):
+        _parse_model_json("I could not generate an entry.")
+
+
+@pytest.mark.parametrize("chunks, closing_chunk, end", [
+    pytest.param(['{"a": 1}'], 0, 8, id="single-chunk"),
+    pytest.param(['{"a": "}', '", "b": {"c": 2}', '}  \n\n'], 2, 1, id="brace-in-string-across-chunks"),
+    pytest.param(['{"a": "\\', '"}"', '}'], 2, 1, id="escape-across-chunks"),
+    pytest.param(['Sure, "here": ', '{"a": 1}', ' trailing'], 1, 8, id="prose-with-stray-quote"),
+])
+def test_scanner_finds_end_of_object(chunks, closing_chunk, end):
+    scanner = _JsonObjectScanner()
+    results = [scanner.feed(chunk) for chunk in chunks[:closing_chunk + 1]]
+
+    assert results[:-1] == [None] * closing_chunk
+    assert results[-1] == end
+
+
+def test_scanner_waits_for_unclosed_object():
+    scanner = _JsonObjectScanner()
+    assert scanner.feed('{"a": {"b": 1}') is None
+    assert scanner.feed(', "c": "{"') is None
+    assert scanner.feed("}") == 1
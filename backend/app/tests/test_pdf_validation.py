@@ -0,0 +1,63 @@
+import pytest
+
+from app.services.document_processor import _MAX_PAGE_TREE_DEPTH, _validate_pdf_sync
+
+CATALOG = "<< /Type /Catalog /Pages 2 0 R >>"
+
+
+def _pdf(objects) -> bytes:
+    """Minimal PDF with the given objects numbered from 1 and object 1 as the root"""
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def _validate(tmp_path, objects):
+    path = tmp_path / "spec.pdf"
+    path.write_bytes(_pdf(objects))
+    return _validate_pdf_sync(str(path))
+
+
+def test_single_page(tmp_path):
+    result = _validate(tmp_path, [
+        CATALOG,
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 10 10] >>",
+    ])
+    assert result["valid"] is True
+    assert result["content_info"]["pages"] == 1
+
+
+def test_page_tree_listing_itself_is_rejected(tmp_path):
+    result = _validate(tmp_path, [CATALOG, "<< /Type /Pages /Kids [2 0 R] /Count 1 >>"])
+    assert result == {"valid": False, "error": "Invalid PDF file: Page tree contains a loop"}
+
+
+def test_page_tree_cycle_is_rejected(tmp_path):
+    result = _validate(tmp_path, [
+        CATALOG,
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Pages /Kids [2 0 R] /Count 1 >>",
+    ])
+    assert result == {"valid": False, "error": "Invalid PDF file: Page tree contains a loop"}
+
+
+def test_deep_page_tree_is_rejected(tmp_path):
+    levels = _MAX_PAGE_TREE_DEPTH + 1
+    nodes = [f"<< /Type /Pages /Kids [{number + 1} 0 R] /Count 1 >>" for number in range(2, levels + 2)]
+    result = _validate(tmp_path, [CATALOG] + nodes + ["<< /Type /Page >>"])
+    assert result == {"valid": False, "error": "Invalid PDF file: Page tree is too deep"}
+
+
+@pytest.mark.parametrize("count", ["-3", "1.5", "(1)"])
+def test_malformed_page_count_is_rejected(tmp_path, count):
+    result = _validate(tmp_path, [CATALOG, f"<< /Type /Pages /Kids [] /Count {count} >>"])
+    assert result == {"valid": False, "error": "Invalid PDF file: malformed page count"}
@@ -0,0 +1,55 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from app.services.document_processor import DocumentProcessor
+
+
+class ChunkedFile(io.BytesIO):
+    """Returns at most 4 bytes per read, so an upload takes several reads"""
+
+    def read(self, size=-1):
+        return super().read(4)
+
+
+@pytest.fixture
+def processor(tmp_path):
+    processor = DocumentProcessor()
+    processor.upload_dir = tmp_path
+    processor._upload_root = tmp_path.resolve()
+    return processor
+
+
+def _stored_files(tmp_path):
+    return [path for path in tmp_path.rglob("*") if path.is_file()]
+
+
+@pytest.mark.asyncio
+async def test_validation_error_removes_the_file(processor, tmp_path, monkeypatch):
+    async def broken_pool(*args):
+        raise RuntimeError("validation pool is broken")
+
+    monkeypatch.setattr(processor, "_validate_content_by_type", broken_pool)
+    upload = UploadFile(io.BytesIO(b"%PDF-1.4 spec"), filename="spec.pdf")
+
+    with pytest.raises(RuntimeError):
+        await processor.save_upload(upload, project_id=1)
+    assert _stored_files(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_removes_the_file(processor, tmp_path):
+    class DisconnectingUpload(UploadFile):
+        async def read(self, size=-1):
+            # The client goes away after the first chunk
+            if self.file.tell():
+                raise asyncio.CancelledError()
+            return await super().read(size)
+
+    upload = DisconnectingUpload(ChunkedFile(b"%PDF-1.4 spec"), filename="spec.pdf")
+
+    with pytest.raises(asyncio.CancelledError):
+        await processor.save_upload(upload, project_id=1)
+    assert _stored_files(tmp_path) == []
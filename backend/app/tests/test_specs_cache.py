@@ -0,0 +1,38 @@
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import matrix_generator
+from app.services.matrix_generator import MatrixGenerator
+
+
+class FakeSession:
+    def __init__(self):
+        self.spec_queries = 0
+
+    async def execute(self, stmt, params):
+        if stmt is matrix_generator._DOCUMENT_VERSIONS_STMT:
+            return SimpleNamespace(all=lambda: [(params["project_id"], "2026-01-01")])
+        self.spec_queries += 1
+        return SimpleNamespace(all=lambda: [])
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    monkeypatch.setattr(MatrixGenerator, "_specs_cache", OrderedDict())
+    monkeypatch.setattr(MatrixGenerator, "SPECS_CACHE_SIZE", 2)
+    return MatrixGenerator.__new__(MatrixGenerator)
+
+
+@pytest.mark.asyncio
+async def test_specs_cache_evicts_least_recently_used_project(generator):
+    db = FakeSession()
+    for project_id in (1, 2, 1, 3):
+        await generator._project_specifications(project_id, db)
+
+    assert list(MatrixGenerator._specs_cache) == [1, 3]
+    assert db.spec_queries == 3
+
+    await generator._project_specifications(2, db)
+    assert db.spec_queries == 4
@@ -0,0 +1,111 @@
+import io
+import struct
+import zipfile
+
+import pytest
+
+from app.services.document_processor import (
+    DocumentProcessor,
+    _ZIP_CD_HEADER,
+    _ZIP_EOCD,
+    _scan_zip_directory,
+)
+
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _archive(members, **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", **kwargs) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _docx() -> bytes:
+    return _archive([
+        ("[Content_Types].xml", "<Types/>"),
+        ("_rels/.rels", "<Relationships/>"),
+        ("word/document.xml", "<w:document/>"),
+    ])
+
+
+def test_normal_archive():
+    assert _scan_zip_directory(_docx(), ["word/document.xml"]) == (3, True)
+    assert _scan_zip_directory(_docx(), ["xl/workbook.xml"]) == (3, False)
+
+
+def test_archive_comment_is_skipped():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", "<w:document/>")
+        archive.comment = b"PK\x05\x06 looks like a directory end"
+    assert _scan_zip_directory(buffer.getvalue(), ["word/document.xml"]) == (1, True)
+
+
+def test_encrypted_member_is_still_listed():
+    content = bytearray(_docx())
+    eocd = content.rfind(b"PK\x05\x06")
+    cd_offset = _ZIP_EOCD.unpack_from(content, eocd)[6]
+    # General purpose flag bit 0: member is encrypted
+    flags_offset = cd_offset + 8
+    struct.pack_into("<H", content, flags_offset, struct.unpack_from("<H", content, flags_offset)[0] | 1)
+
+    assert _scan_zip_directory(bytes(content), ["word/document.xml"]) == (3, True)
+
+
+def test_zip64_member_is_parsed():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        with archive.open("word/document.xml", "w", force_zip64=True) as member:
+            member.write(b"<w:document/>")
+    assert _scan_zip_directory(buffer.getvalue(), ["word/document.xml"]) == (1, True)
+
+
+def test_zip64_directory_needs_full_parser():
+    content = bytearray(_docx())
+    eocd = content.rfind(b"PK\x05\x06")
+    # Directory offset beyond 4 GiB: stored in the ZIP64 record instead
+    struct.pack_into("<L", content, eocd + 16, 0xFFFFFFFF)
+
+    assert _scan_zip_directory(bytes(content), ["word/document.xml"]) is None
+
+
+@pytest.mark.parametrize("cut", [1, 10, _ZIP_EOCD.size, _ZIP_EOCD.size + _ZIP_CD_HEADER.size])
+def test_truncated_archive_needs_full_parser(cut):
+    assert _scan_zip_directory(_docx()[:-cut], ["word/document.xml"]) is None
+
+
+def test_prepended_data_needs_full_parser():
+    assert _scan_zip_directory(b"\x00" * 64 + _docx(), ["word/document.xml"]) is None
+
+
+def test_damaged_directory_entry_needs_full_parser():
+    content = bytearray(_docx())
+    eocd = content.rfind(b"PK\x05\x06")
+    cd_offset = _ZIP_EOCD.unpack_from(content, eocd)[6]
+    content[cd_offset:cd_offset + 4] = b"XXXX"
+
+    assert _scan_zip_directory(bytes(content), ["word/document.xml"]) is None
+
+
+def test_office_validation_of_truncated_archive(tmp_path):
+    path = tmp_path / "spec.docx"
+    path.write_bytes(_docx()[:-30])
+
+    result = DocumentProcessor._validate_office_document_sync(path, DOCX)
+
+    assert result["valid"] is False
+
+
+def test_office_validation_falls_back_to_zipfile(tmp_path):
+    # Self-extracting style prefix: the fast scan declines, zipfile copes
+    path = tmp_path / "spec.docx"
+    path.write_bytes(b"\x00" * 64 + _docx())
+
+    result = DocumentProcessor._validate_office_document_sync(path, DOCX)
+
+    assert result == {
+        "valid": True,
+        "content_info": {"type": "office_document", "mime_type": DOCX, "files_count": 3}
+    }
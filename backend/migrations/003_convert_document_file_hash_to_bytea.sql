@@ -0,0 +1,10 @@
+-- Migration: Store document file hashes as raw bytes
+-- Date: 2026-10-15
+-- Description: Converts documents.file_hash from a 64-character hex string to the raw 32-byte SHA-256 digest
+
+-- Convert existing hex digests in place (decode() is built in, pgcrypto is not required)
+ALTER TABLE documents
+ALTER COLUMN file_hash TYPE BYTEA USING decode(file_hash, 'hex');
+
+-- Add comments for documentation
+COMMENT ON COLUMN documents.file_hash IS 'Raw SHA-256 digest (32 bytes) of the uploaded file for integrity verification';
@@ -0,0 +1,16 @@
+-- Migration: Consolidate project_access indexes
+-- Date: 2026-10-15
+-- Description: Replaces the single-column project_access indexes with composite indexes
+
+-- Step 1: Drop redundant single-column indexes
+-- unique_user_project_access (user_id, project_id) already serves lookups by user_id
+DROP INDEX IF EXISTS idx_project_access_user_id;
+DROP INDEX IF EXISTS idx_project_access_project_id;
+DROP INDEX IF EXISTS ix_project_access_user_id;
+DROP INDEX IF EXISTS ix_project_access_project_id;
+
+-- Step 2: Create reverse composite index for lookups by project
+CREATE INDEX IF NOT EXISTS ix_project_access_project_user ON project_access(project_id, user_id);
+
+-- Add comments for documentation
+COMMENT ON INDEX ix_project_access_project_user IS 'Serves lookups of users who have verified access to a project';
@@ -0,0 +1,17 @@
+-- Migration: Drop redundant audit_logs indexes
+-- Date: 2026-10-15
+-- Description: Removes single-column indexes that are prefixes of the composite audit indexes
+
+-- user_id is served by ix_audit_user_timestamp (user_id, timestamp)
+DROP INDEX IF EXISTS ix_audit_logs_user_id;
+
+-- action is served by ix_audit_action_timestamp (action, timestamp)
+DROP INDEX IF EXISTS ix_audit_logs_action;
+
+-- entity_type is served by ix_audit_entity_timestamp (entity_type, entity_id, timestamp)
+DROP INDEX IF EXISTS ix_audit_logs_entity_type;
+
+-- Ensure the composite indexes exist on databases created before they were added
+CREATE INDEX IF NOT EXISTS ix_audit_user_timestamp ON audit_logs(user_id, timestamp);
+CREATE INDEX IF NOT EXISTS ix_audit_entity_timestamp ON audit_logs(entity_type, entity_id, timestamp);
+CREATE INDEX IF NOT EXISTS ix_audit_action_timestamp ON audit_logs(action, timestamp);
@@ -0,0 +1,17 @@
+-- Migration: Partial composite indexes on requirements
+-- Date: 2026-10-15
+-- Description: Replaces single-column status/priority/category indexes with partial composite indexes
+
+-- Step 1: Create partial composite indexes for active (non-deleted) requirements
+CREATE INDEX IF NOT EXISTS ix_req_project_active
+ON requirements(project_id, status)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_req_project_category
+ON requirements(project_id, category)
+WHERE deleted_at IS NULL;
+
+-- Step 2: Drop single-column indexes that are no longer used
+DROP INDEX IF EXISTS ix_requirements_status;
+DROP INDEX IF EXISTS ix_requirements_priority;
+DROP INDEX IF EXISTS ix_requirements_category;
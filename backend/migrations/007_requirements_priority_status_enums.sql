@@ -0,0 +1,68 @@
+-- Migration: Native enum types for requirement priority and status
+-- Date: 2026-10-15
+-- Description: Converts requirements.priority and requirements.status from VARCHAR to PostgreSQL enum types
+
+-- Step 1: Refuse to convert while values exist that have no enum mapping: rewriting
+-- them here would silently change regulated records. Correct them through the
+-- application (so the change is audited), then re-run this migration
+DO $$
+DECLARE
+    unmapped TEXT;
+BEGIN
+    SELECT string_agg(format('%s: %L', id, priority), ', ' ORDER BY id) INTO unmapped
+    FROM requirements
+    WHERE priority IS NOT NULL
+      AND lower(trim(priority)) NOT IN ('high', 'medium', 'low');
+    IF unmapped IS NOT NULL THEN
+        RAISE EXCEPTION 'requirements.priority has values without an enum mapping (id: value): %', unmapped
+            USING HINT = 'Correct these requirements in the application, then re-run the migration';
+    END IF;
+
+    SELECT string_agg(format('%s: %L', id, status), ', ' ORDER BY id) INTO unmapped
+    FROM requirements
+    WHERE status IS NOT NULL
+      AND lower(trim(status)) NOT IN ('pending', 'in_progress', 'completed', 'in progress', 'in-progress');
+    IF unmapped IS NOT NULL THEN
+        RAISE EXCEPTION 'requirements.status has values without an enum mapping (id: value): %', unmapped
+            USING HINT = 'Correct these requirements in the application, then re-run the migration';
+    END IF;
+END $$;
+
+-- Step 2: Create enum types (idempotent)
+DO $$
+BEGIN
+    CREATE TYPE requirement_priority AS ENUM ('high', 'medium', 'low');
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$
+BEGIN
+    CREATE TYPE requirement_status AS ENUM ('pending', 'in_progress', 'completed');
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END $$;
+
+-- Step 3: Normalize spelling (case, whitespace, separators) of the mapped values
+UPDATE requirements
+SET priority = lower(trim(priority))
+WHERE priority IS DISTINCT FROM lower(trim(priority));
+
+UPDATE requirements
+SET status = CASE
+    WHEN lower(trim(status)) IN ('in progress', 'in-progress') THEN 'in_progress'
+    ELSE lower(trim(status))
+END
+WHERE status IS DISTINCT FROM lower(trim(status))
+   OR lower(trim(status)) IN ('in progress', 'in-progress');
+
+-- Step 4: Cast columns to the enum types (ix_req_project_active is rebuilt automatically)
+ALTER TABLE requirements
+ALTER COLUMN priority TYPE requirement_priority USING priority::requirement_priority;
+
+ALTER TABLE requirements
+ALTER COLUMN status TYPE requirement_status USING status::requirement_status;
+
+-- Add comments for documentation
+COMMENT ON COLUMN requirements.priority IS 'Requirement priority: high, medium, low';
+COMMENT ON COLUMN requirements.status IS 'Requirement workflow status: pending, in_progress, completed';
@@ -0,0 +1,22 @@
+-- Migration: Partial indexes for soft-deleted tables
+-- Date: 2026-10-15
+-- Description: Adds indexes over live (deleted_at IS NULL) rows of projects, documents and matrix_entries
+
+-- Projects: listing by owner and newest first
+CREATE INDEX IF NOT EXISTS ix_projects_owner_active
+ON projects(owner_id)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_projects_created_active
+ON projects(created_at)
+WHERE deleted_at IS NULL;
+
+-- Documents: per-project listings and counts
+CREATE INDEX IF NOT EXISTS ix_documents_project_active
+ON documents(project_id)
+WHERE deleted_at IS NULL;
+
+-- Matrix entries: per-requirement lookups and counts
+CREATE INDEX IF NOT EXISTS ix_matrix_requirement_active
+ON matrix_entries(requirement_id)
+WHERE deleted_at IS NULL;
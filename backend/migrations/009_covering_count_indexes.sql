@@ -0,0 +1,21 @@
+-- Migration: Covering partial indexes for project counts
+-- Date: 2026-10-15
+-- Description: Rebuilds the live-row indexes of documents, requirements and matrix_entries with INCLUDE columns so project counts and statistics use index-only scans (PostgreSQL 11+)
+
+-- Step 1: Drop the non-covering versions
+DROP INDEX IF EXISTS ix_documents_project_active;
+DROP INDEX IF EXISTS ix_req_project_active;
+DROP INDEX IF EXISTS ix_matrix_requirement_active;
+
+-- Step 2: Recreate them as covering indexes
+CREATE INDEX ix_documents_project_active
+ON documents(project_id) INCLUDE (id, extraction_status)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX ix_req_project_active
+ON requirements(project_id, status) INCLUDE (id)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX ix_matrix_requirement_active
+ON matrix_entries(requirement_id) INCLUDE (id, review_status, compliance_status)
+WHERE deleted_at IS NULL;
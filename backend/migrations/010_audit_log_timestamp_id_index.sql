@@ -0,0 +1,5 @@
+-- Migration: Keyset index for audit log listings
+-- Date: 2026-10-16
+-- Description: Adds an index on audit_logs(timestamp, id) so unfiltered newest-first listings and their (timestamp, id) cursor use a backward index scan instead of sorting the table
+
+CREATE INDEX IF NOT EXISTS ix_audit_timestamp_id ON audit_logs(timestamp, id);
@@ -3,53 +3,98 @@
 Database Migration Runner
 
 Runs SQL migration files against the PostgreSQL database.
-Uses asyncpg for async database operations.
+Uses asyncpg for async database operations; several files run in the
+given order over one connection. Each file commits without waiting for
+the WAL flush unless --durable is given. The SQL preview is printed only
+on a terminal or when MIGRATION_VERBOSE is set.
+
+Consecutive files whose leading comments contain the same
+"-- @parallel-group: name" line run concurrently, each on its own
+connection (only for migrations that touch disjoint objects).
+
+Seed data can be loaded with COPY instead of INSERTs:
+    -- @copy table_name (column_a, column_b)
+    1,"first row"
+    2,"second row"
+    \\.
 
 Usage:
-    python run_migration.py <migration_file.sql>
+    python run_migration.py [--durable] <migration_file.sql> [<migration_file.sql> ...]
 
 Example:
     python run_migration.py backend/migrations/001_initial_schema.sql
+    python run_migration.py backend/migrations/*.sql
 """
 
 import asyncio
+import functools
+import importlib
+import io
+import re
 import sys
 import os
+from collections import namedtuple
 from pathlib import Path
+from urllib.parse import quote, urlsplit
 
-try:
-    import asyncpg
-except ImportError:
-    print("Error: asyncpg is not installed")
-    print("Install with: pip install asyncpg")
-    sys.exit(1)
+# Dependencies are imported when first needed, so usage errors return instantly
 
-try:
-    from dotenv import load_dotenv
-except ImportError:
-    print("Error: python-dotenv is not installed")
-    print("Install with: pip install python-dotenv")
-    sys.exit(1)
 
+def require(module: str, package: str):
+    """Import a required dependency, exiting with an install hint when it is missing"""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        print(f"Error: {package} is not installed")
+        print(f"Install with: pip install {package}")
+        sys.exit(1)
 
-def load_env_file():
-    """Load environment variables from .env or .env.production"""
-    # Check for .env.production first (production environment)
-    if Path('.env.production').exists():
-        print("Loading environment from .env.production")
-        load_dotenv('.env.production')
-        return True
 
-    # Fall back to .env (development environment)
-    if Path('.env').exists():
-        print("Loading environment from .env")
-        load_dotenv('.env')
-        return True
+@functools.lru_cache(maxsize=None)
+def optional(module: str):
+    """Import an optional dependency (None when it is not installed)"""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return None
+
+
+# Environment files in order of preference, with the message shown when used
+ENV_FILES = [
+    ('.env.production', "Loading environment from .env.production"),
+    ('.env', "Loading environment from .env"),
+    ('.env.example', "Warning: Using .env.example (you should create .env or .env.production)"),
+]
 
-    # Try .env.example as last resort
-    if Path('.env.example').exists():
-        print("Warning: Using .env.example (you should create .env or .env.production)")
-        load_dotenv('.env.example')
+
+@functools.lru_cache(maxsize=4)
+def _parsed_env(path: str, mtime_ns: int) -> dict:
+    """Parsed environment file (re-parsed only when the file changes)"""
+    from dotenv import dotenv_values
+    return dotenv_values(path)
+
+
+def load_env_file():
+    """Load environment variables from .env or .env.production"""
+    require("dotenv", "python-dotenv")
+
+    # One directory scan instead of probing each candidate
+    names = {path for path, _ in ENV_FILES}
+    with os.scandir('.') as scan:
+        candidates = {entry.name: entry for entry in scan if entry.name in names and entry.is_file()}
+
+    # .env.production first (production environment), then .env (development),
+    # then .env.example as last resort
+    for path, message in ENV_FILES:
+        if path not in candidates:
+            continue
+        mtime_ns = candidates[path].stat().st_mtime_ns
+        print(message)
+        # Like load_dotenv: variables already set in the environment win
+        os.environ.update({
+            key: value for key, value in _parsed_env(path, mtime_ns).items()
+            if value is not None and key not in os.environ
+        })
         return True
 
     print("Error: No environment file found (.env.production, .env, or .env.example)")
@@ -58,70 +103,287 @@ def load_env_file():
 
 def get_database_url():
     """Get database URL from environment variables"""
-    database_url = os.getenv('DATABASE_URL')
+    env = os.environ
+    database_url = env.get('DATABASE_URL')
 
     if not database_url:
-        # Try to construct from individual components
-        db_name = os.getenv('POSTGRES_DB', 'pharmaspec')
-        db_user = os.getenv('POSTGRES_USER', 'pharma_user')
-        db_pass = os.getenv('POSTGRES_PASSWORD', 'pharma_pass_2024')
-        db_host = os.getenv('POSTGRES_HOST', 'localhost')
-        db_port = os.getenv('POSTGRES_PORT', '5432')
+        # Try to construct from individual components (credentials URL-quoted,
+        # so a password containing '@' or '/' cannot break the URL)
+        db_name = env.get('POSTGRES_DB', 'pharmaspec')
+        db_user = quote(env.get('POSTGRES_USER', 'pharma_user'), safe='')
+        db_pass = quote(env.get('POSTGRES_PASSWORD', 'pharma_pass_2024'), safe='')
+        db_host = env.get('POSTGRES_HOST', 'localhost')
+        db_port = env.get('POSTGRES_PORT', '5432')
 
         # Use standard asyncpg connection format (not SQLAlchemy format)
-        database_url = f"postgresql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
+        return f"postgresql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
 
     # Convert SQLAlchemy format to asyncpg format if needed
     if database_url.startswith('postgresql+asyncpg://'):
-        database_url = database_url.replace('postgresql+asyncpg://', 'postgresql://')
+        database_url = 'postgresql://' + database_url[len('postgresql+asyncpg://'):]
 
     return database_url
 
 
-async def run_migration(migration_file: str):
-    """Run a SQL migration file"""
+def display_url(database_url: str) -> str:
+    """Host, port and database of a database URL (credentials left out)"""
+    parts = urlsplit(database_url)
+    return f"{parts.hostname}:{parts.port or 5432}/{parts.path.lstrip('/')}"
+
+
+_DOLLAR_TAG_RE = re.compile(r"\$[A-Za-z_]*\$")
+
+# Single-table INSERT ... VALUES (...): table, column list, row tuples
+_INSERT_VALUES_RE = re.compile(
+    r"INSERT\s+INTO\s+([\w.\"]+)\s*(\([^()]*\))\s*VALUES\s*(\(.*\))\s*;?\Z",
+    re.IGNORECASE | re.DOTALL
+)
+_INSERT_EXCLUDED_RE = re.compile(r"\bON\s+CONFLICT\b|\bRETURNING\b", re.IGNORECASE)
+
+# Seed data block: "-- @copy table (col, ...)", CSV rows, then a "\\." line
+_COPY_SENTINEL_RE = re.compile(r"^--[ \t]*@copy[ \t]+([\w.\"]+)[ \t]*\(([^()\n]*)\)[ \t]*\r?$", re.MULTILINE)
+_COPY_END_RE = re.compile(r"^\\\.[ \t]*\r?$", re.MULTILINE)
+
+CopyBlock = namedtuple("CopyBlock", ["table", "columns", "data"])
+
+# Session settings sent with the startup packet (no separate SET round trips).
+# A migration waiting on a lock held by the running application fails after
+# lock_timeout instead of queueing every other query behind it; it is all or
+# nothing, so it can simply be run again.
+MIGRATION_SERVER_SETTINGS = {
+    'application_name': 'pharmaspec_migrator',
+    'statement_timeout': '0',  # Index builds may legitimately take long
+    'lock_timeout': '5s',
+    'idle_in_transaction_session_timeout': '30s',
+}
+
+# Migrations whose leading comments name the same group may run concurrently
+_PARALLEL_GROUP_RE = re.compile(r"--\s*@parallel-group:\s*(\S+)")
+
+# Statements sent to the server per round trip
+MIGRATION_BATCH_SIZE = 25
+
+
+def split_statements(sql: str) -> list:
+    """
+    Split a migration script into individual statements
+    Semicolons inside quotes, comments and dollar-quoted bodies (DO $$ ... $$)
+    do not end a statement. Parts without SQL (only comments) are dropped.
+    Uses pglast when installed, this Python scanner otherwise.
+    """
+    # libpg_query bindings: split with PostgreSQL's own scanner
+    pglast = optional("pglast")
+    if pglast is not None:
+        try:
+            return [statement.strip() for statement in pglast.split(sql, with_parser=False)
+                    if statement.strip()]
+        except Exception as e:
+            # The Python scanner below is more lenient; the server reports real errors
+            print(f"Warning: pglast could not split the migration ({e}), using the built-in splitter")
+
+    statements = []
+    start = 0
+    i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if char == "'" and sql[i - 1:i] in ("E", "e") and not sql[i - 2:i - 1].replace("_", "a").isalnum():
+            # Escape string literal (E'...'): a backslash escapes the next character
+            i += 1
+            while i < length and sql[i] != "'":
+                i += 2 if sql[i] == "\\" else 1
+            i += 1
+        elif char in ("'", '"'):
+            # Quoted literal or identifier (doubled quotes re-enter the loop)
+            end = sql.find(char, i + 1)
+            i = length if end == -1 else end + 1
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = length if end == -1 else end + 1
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+        elif char == "$" and (match := _DOLLAR_TAG_RE.match(sql, i)):
+            end = sql.find(match.group(), match.end())
+            i = length if end == -1 else end + len(match.group())
+        elif char == ";":
+            statements.append(sql[start:i + 1])
+            start = i = i + 1
+        else:
+            i += 1
+    statements.append(sql[start:])
+
+    def has_sql(statement: str) -> bool:
+        code = re.sub(r"--[^\n]*|/\*.*?\*/", "", statement, flags=re.DOTALL)
+        return bool(code.strip(" \t\r\n;"))
+
+    return [statement.strip() for statement in statements if has_sql(statement)]
+
+
+def split_copy_blocks(sql: str) -> list:
+    """
+    Split a migration into SQL text and seed data blocks
+    A data block starts with a "-- @copy table (col, ...)" line, holds CSV rows
+    and ends at a line with only "\\." (as in psql's COPY FROM STDIN) or at
+    the end of the file. Returns SQL strings and CopyBlocks in file order.
+    """
+    parts = []
+    position = 0
+    while match := _COPY_SENTINEL_RE.search(sql, position):
+        parts.append(sql[position:match.start()])
+        data_start = match.end() + 1
+        end = _COPY_END_RE.search(sql, data_start)
+        columns = [column.strip().strip('"') for column in match.group(2).split(",") if column.strip()]
+        parts.append(CopyBlock(
+            match.group(1), columns, sql[data_start:end.start() if end else len(sql)]
+        ))
+        position = end.end() if end else len(sql)
+    parts.append(sql[position:])
+    return parts
+
+
+async def copy_block(conn, block: CopyBlock) -> None:
+    """Load a seed data block with COPY (CSV, so the server parses the values)"""
+    schema, _, table = block.table.rpartition(".")
+    await conn.copy_to_table(
+        table.strip('"'),
+        schema_name=schema.strip('"') or None,
+        columns=block.columns,
+        source=io.BytesIO(block.data.encode()),
+        format="csv"
+    )
+
+
+def coalesce_inserts(statements: list) -> list:
+    """
+    Merge runs of INSERT ... VALUES statements into the same table and columns
+    into one multi-row INSERT, so the server parses and plans the run once.
+    INSERTs with ON CONFLICT or RETURNING (or anything else the pattern does
+    not recognize) are left as they are.
+    """
+    coalesced = []
+    run_target = None
+    for statement in statements:
+        match = _INSERT_VALUES_RE.match(statement)
+        if match and _INSERT_EXCLUDED_RE.search(statement):
+            match = None
+        target = (match.group(1).lower(), re.sub(r"\s+", "", match.group(2)).lower()) if match else None
+        if target is not None and target == run_target:
+            coalesced[-1] = coalesced[-1].rstrip(";").rstrip() + ",\n" + match.group(3) + ";"
+        else:
+            coalesced.append(statement)
+        run_target = target
+    return coalesced
+
+
+def batch_statements(statements: list, size: int = MIGRATION_BATCH_SIZE, first_number: int = 1) -> list:
+    """
+    Group statements into scripts of up to ``size`` statements
+    A multi-statement script is sent as one simple query: the server runs the
+    statements in order, at the cost of a single round trip
+    """
+    batches = []
+    for first in range(0, len(statements), size):
+        batch = statements[first:first + size]
+        # A statement can end in a comment; the separator goes on its own line
+        script = "\n".join(
+            statement if statement.endswith(";") else statement + "\n;"
+            for statement in batch
+        )
+        batches.append((first_number + first, batch, script))
+    return batches
+
+
+def statement_summary(statement: str) -> str:
+    """First line of SQL in a statement (comments skipped), for progress output"""
+    for line in statement.splitlines():
+        line = line.strip()
+        if line and not line.startswith("--"):
+            return line if len(line) <= 70 else line[:67] + "..."
+    return ""
+
+
+def read_migration(migration_file: str):
+    """Read and decode a SQL migration file (None when it cannot be run)"""
 
     # Check if migration file exists
     if not Path(migration_file).exists():
         print(f"Error: Migration file not found: {migration_file}")
-        return False
+        return None
 
     # Read migration file
     print(f"Reading migration file: {migration_file}")
-    with open(migration_file, 'r') as f:
-        sql = f.read()
+    sql_bytes = Path(migration_file).read_bytes()
 
-    if not sql.strip():
+    # isspace() scans in place; strip() would copy the whole file
+    if not sql_bytes or sql_bytes.isspace():
         print("Error: Migration file is empty")
-        return False
+        return None
+
+    print(f"Migration SQL ({len(sql_bytes)} bytes)")
+    # Preview only for a terminal (or MIGRATION_VERBOSE), not in CI logs
+    if sys.stdout.isatty() or os.getenv('MIGRATION_VERBOSE'):
+        print("-" * 80)
+        print(sql_bytes[:500].decode('utf-8', errors='replace'))  # Show first 500 bytes
+        if len(sql_bytes) > 500:
+            print("... (truncated)")
+        print("-" * 80)
+
+    # Decoded once, independent of the locale (asyncpg sends str as UTF-8)
+    try:
+        return sql_bytes.decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        print(f"Error: Migration file is not valid UTF-8: {e}")
+        return None
 
-    print(f"Migration SQL ({len(sql)} characters):")
-    print("-" * 80)
-    print(sql[:500])  # Show first 500 characters
-    if len(sql) > 500:
-        print("... (truncated)")
-    print("-" * 80)
 
-    # Get database URL
-    database_url = get_database_url()
+async def run_migration(conn, migration_file: str, durable: bool = False):
+    """
+    Run a SQL migration file on an open connection
+    Unless ``durable``, the commit does not wait for the WAL flush: a crash right
+    after it can lose the migration, which is then simply run again
+    """
 
-    print(f"\nConnecting to database...")
-    print(f"URL: {database_url.split('@')[1]}")  # Don't print password
+    import asyncpg
 
-    try:
-        # Connect to database
-        conn = await asyncpg.connect(database_url)
-        print("Connected successfully!")
+    # Off the event loop: seed migrations can be large
+    sql = await asyncio.to_thread(read_migration, migration_file)
+    if sql is None:
+        return False
 
-        # Execute migration
-        print("\nExecuting migration...")
-        await conn.execute(sql)
+    try:
+        # Execute migration in batches of statements in one transaction
+        # (all or nothing, with progress for long migrations); seed data
+        # blocks are loaded with COPY in between
+        steps = [
+            part if isinstance(part, CopyBlock) else coalesce_inserts(split_statements(part))
+            for part in split_copy_blocks(sql)
+        ]
+        total = sum(1 if isinstance(step, CopyBlock) else len(step) for step in steps)
+        print(f"\nExecuting migration ({total} statements)...")
+        number = 1
+        async with conn.transaction():
+            if not durable:
+                await conn.execute("SET LOCAL synchronous_commit = off")
+            for step in steps:
+                if isinstance(step, CopyBlock):
+                    print(f"  [{number}/{total}] COPY {step.table} ({', '.join(step.columns)})")
+                    await copy_block(conn, step)
+                    number += 1
+                    continue
+                for first, batch, script in batch_statements(step, first_number=number):
+                    # One write per batch rather than per statement
+                    print("\n".join(
+                        f"  [{index}/{total}] {statement_summary(statement)}"
+                        for index, statement in enumerate(batch, start=first)
+                    ))
+                    try:
+                        await conn.execute(script)
+                    except asyncpg.PostgresError:
+                        print(f"  ✗ Failed in statements {first}-{first + len(batch) - 1}")
+                        raise
+                number += len(step)
         print("✓ Migration executed successfully!")
-
-        # Close connection
-        await conn.close()
-        print("Database connection closed.")
-
         return True
 
     except asyncpg.PostgresError as e:
@@ -134,18 +396,131 @@ async def run_migration(migration_file: str):
         return False
 
 
+def parallel_group(migration_file: str):
+    """
+    Parallel group named in a migration's leading comments
+    ("-- @parallel-group: name"), or None when it must run on its own
+    """
+    try:
+        with open(migration_file, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("--"):
+                    break
+                if match := _PARALLEL_GROUP_RE.match(line):
+                    return match.group(1)
+    except OSError:
+        pass  # Reported when the migration is run
+    return None
+
+
+def group_migrations(migration_files: list) -> list:
+    """
+    Split migration files into steps that run one after another
+    Consecutive files naming the same parallel group form one step; every
+    other file is a step of its own, so the given order is kept
+    """
+    steps = []
+    previous = None
+    for migration_file in migration_files:
+        group = parallel_group(migration_file)
+        if group is not None and group == previous:
+            steps[-1].append(migration_file)
+        else:
+            steps.append([migration_file])
+        previous = group
+    return steps
+
+
+def print_server_message(conn, message) -> None:
+    """Show NOTICE/WARNING messages the server sends during a migration"""
+    sys.stderr.write(f"  [{message.severity}] {message.message}\n")
+
+
+async def connect(database_url: str):
+    """Open a migration connection (server messages are shown as they arrive)"""
+
+    import asyncpg
+
+    conn = await asyncpg.connect(database_url, server_settings=MIGRATION_SERVER_SETTINGS)
+    conn.add_log_listener(print_server_message)
+    return conn
+
+
+async def run_parallel_migration(database_url: str, migration_file: str, durable: bool):
+    """Run a migration of a parallel group on a connection of its own"""
+
+    try:
+        conn = await connect(database_url)
+    except Exception as e:
+        print(f"\n✗ Connection failed for {migration_file}: {e}")
+        return False
+    try:
+        return await run_migration(conn, migration_file, durable)
+    finally:
+        await conn.close()
+
+
+async def run_migrations(migration_files: list, durable: bool = False):
+    """
+    Run SQL migration files in order over one database connection
+    Consecutive files of the same parallel group run concurrently, each on its
+    own connection. Stops at the first failed migration (later ones may
+    depend on it)
+    """
+
+    # Get database URL
+    database_url = get_database_url()
+
+    print("Connecting to database...")
+    print(f"URL: {display_url(database_url)}")  # Don't print password
+
+    try:
+        # Connect to database (once for all files)
+        conn = await connect(database_url)
+    except Exception as e:
+        print(f"\n✗ Connection failed: {e}")
+        return False
+    print("Connected successfully!")
+
+    try:
+        number = 1
+        for step in group_migrations(migration_files):
+            if len(step) == 1:
+                print(f"\n[{number}/{len(migration_files)}] {step[0]}")
+                succeeded = await run_migration(conn, step[0], durable)
+            else:
+                print(f"\n[{number}-{number + len(step) - 1}/{len(migration_files)}] "
+                      f"In parallel: {', '.join(step)}")
+                results = await asyncio.gather(
+                    *(run_parallel_migration(database_url, migration_file, durable) for migration_file in step)
+                )
+                succeeded = all(results)
+            if not succeeded:
+                return False
+            number += len(step)
+        return True
+    finally:
+        # Close connection
+        await conn.close()
+        print("Database connection closed.")
+
+
 def main():
     """Main entry point"""
 
     # Check command line arguments
-    if len(sys.argv) != 2:
-        print("Usage: python run_migration.py <migration_file.sql>")
+    if {"-h", "--help"} & set(sys.argv[1:]):
+        print(__doc__)
+        sys.exit(0)
+    durable = "--durable" in sys.argv[1:]
+    migration_files = [arg for arg in sys.argv[1:] if arg != "--durable"]
+    if not migration_files:
+        print("Usage: python run_migration.py [--durable] <migration_file.sql> [<migration_file.sql> ...]")
         print("\nExample:")
         print("  python run_migration.py backend/migrations/001_initial_schema.sql")
         sys.exit(1)
 
-    migration_file = sys.argv[1]
-
     print("=" * 80)
     print("PharmaSpec Validator - Database Migration Runner")
     print("=" * 80)
@@ -157,8 +532,11 @@ def main():
 
     print()
 
-    # Run migration
-    success = asyncio.run(run_migration(migration_file))
+    # Run migrations (all files on one event loop, uvloop when available)
+    require("asyncpg", "asyncpg")
+    uvloop = optional("uvloop")  # Faster event loop (installed with uvicorn[standard])
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop else None) as runner:
+        success = runner.run(run_migrations(migration_files, durable))
 
     print()
     print("=" * 80)
@@ -0,0 +1,168 @@
+import pytest
+
+import run_migration
+from run_migration import (
+    CopyBlock,
+    batch_statements,
+    coalesce_inserts,
+    split_copy_blocks,
+    split_statements,
+)
+
+
+@pytest.fixture(autouse=True)
+def builtin_splitter(monkeypatch):
+    """Test the built-in scanner even where pglast is installed"""
+    monkeypatch.setattr(run_migration, "optional", lambda module: None)
+
+
+@pytest.mark.parametrize("sql, expected", [
+    pytest.param(
+        "CREATE TABLE a (id int);\nCREATE TABLE b (id int);",
+        ["CREATE TABLE a (id int);", "CREATE TABLE b (id int);"],
+        id="plain",
+    ),
+    pytest.param(
+        "SELECT 1;\nSELECT 2",
+        ["SELECT 1;", "SELECT 2"],
+        id="last-without-semicolon",
+    ),
+    pytest.param(
+        "DO $$\nBEGIN\n    CREATE TYPE t AS ENUM ('a');\nEXCEPTION\n    WHEN duplicate_object THEN NULL;\nEND $$;\nSELECT 1;",
+        ["DO $$\nBEGIN\n    CREATE TYPE t AS ENUM ('a');\nEXCEPTION\n    WHEN duplicate_object THEN NULL;\nEND $$;",
+         "SELECT 1;"],
+        id="dollar-quoted-body",
+    ),
+    pytest.param(
+        "CREATE FUNCTION f() RETURNS text AS $body$ SELECT '$$;'; $body$ LANGUAGE sql;\nSELECT 2;",
+        ["CREATE FUNCTION f() RETURNS text AS $body$ SELECT '$$;'; $body$ LANGUAGE sql;", "SELECT 2;"],
+        id="tagged-dollar-body-containing-$$",
+    ),
+    pytest.param(
+        "SELECT $1::int;\nSELECT 2;",
+        ["SELECT $1::int;", "SELECT 2;"],
+        id="positional-parameter-is-not-a-tag",
+    ),
+    pytest.param(
+        "SELECT 1; -- first; still a comment\nSELECT 2;",
+        ["SELECT 1;", "-- first; still a comment\nSELECT 2;"],
+        id="line-comment",
+    ),
+    pytest.param(
+        "SELECT /* a; b */ 1;\nSELECT 2;",
+        ["SELECT /* a; b */ 1;", "SELECT 2;"],
+        id="block-comment",
+    ),
+    pytest.param(
+        "SELECT 'it''s; fine';\nSELECT 2;",
+        ["SELECT 'it''s; fine';", "SELECT 2;"],
+        id="doubled-quote-escape",
+    ),
+    pytest.param(
+        "SELECT E'it\\'s; fine', e'\\\\';\nSELECT 2;",
+        ["SELECT E'it\\'s; fine', e'\\\\';", "SELECT 2;"],
+        id="backslash-escape-string",
+    ),
+    pytest.param(
+        "SELECT 'ends in e';\nSELECT 2;",
+        ["SELECT 'ends in e';", "SELECT 2;"],
+        id="plain-string-after-identifier",
+    ),
+    pytest.param(
+        'SELECT "odd;name" FROM t;\nSELECT 2;',
+        ['SELECT "odd;name" FROM t;', "SELECT 2;"],
+        id="quoted-identifier",
+    ),
+    pytest.param(
+        "-- Migration header\n/* notes; more */\nSELECT 1;\n-- trailing comment\n",
+        ["-- Migration header\n/* notes; more */\nSELECT 1;"],
+        id="comment-only-parts-dropped",
+    ),
+])
+def test_split_statements(sql, expected):
+    assert split_statements(sql) == expected
+
+
+@pytest.mark.parametrize("statements, expected", [
+    pytest.param(
+        ["INSERT INTO roles (id, name) VALUES (1, 'a;b');", "insert into roles(id,name) values (2, 'c'), (3, 'd');"],
+        ["INSERT INTO roles (id, name) VALUES (1, 'a;b'),\n(2, 'c'), (3, 'd');"],
+        id="same-table-and-columns-merge",
+    ),
+    pytest.param(
+        ["INSERT INTO roles (id) VALUES (1);", "INSERT INTO roles (id, name) VALUES (2, 'b');"],
+        ["INSERT INTO roles (id) VALUES (1);", "INSERT INTO roles (id, name) VALUES (2, 'b');"],
+        id="different-columns",
+    ),
+    pytest.param(
+        ["INSERT INTO a (id) VALUES (1);", "INSERT INTO b (id) VALUES (2);", "INSERT INTO a (id) VALUES (3);"],
+        ["INSERT INTO a (id) VALUES (1);", "INSERT INTO b (id) VALUES (2);", "INSERT INTO a (id) VALUES (3);"],
+        id="other-table-breaks-run",
+    ),
+    pytest.param(
+        ["INSERT INTO a (id) VALUES (1);", "UPDATE a SET id = 2;", "INSERT INTO a (id) VALUES (3);"],
+        ["INSERT INTO a (id) VALUES (1);", "UPDATE a SET id = 2;", "INSERT INTO a (id) VALUES (3);"],
+        id="other-statement-breaks-run",
+    ),
+    pytest.param(
+        ["INSERT INTO a (id) VALUES (1);", "INSERT INTO a (id) VALUES (2) ON CONFLICT DO NOTHING;"],
+        ["INSERT INTO a (id) VALUES (1);", "INSERT INTO a (id) VALUES (2) ON CONFLICT DO NOTHING;"],
+        id="on-conflict-not-merged",
+    ),
+    pytest.param(
+        ["INSERT INTO a (id) VALUES (1) RETURNING (id);", "INSERT INTO a (id) VALUES (2) RETURNING (id);"],
+        ["INSERT INTO a (id) VALUES (1) RETURNING (id);", "INSERT INTO a (id) VALUES (2) RETURNING (id);"],
+        id="returning-not-merged",
+    ),
+    pytest.param(
+        ["INSERT INTO a (id) SELECT id FROM b;", "INSERT INTO a (id) SELECT id FROM c;"],
+        ["INSERT INTO a (id) SELECT id FROM b;", "INSERT INTO a (id) SELECT id FROM c;"],
+        id="insert-select-not-merged",
+    ),
+    pytest.param(
+        ["INSERT INTO a (id) VALUES (1);", "-- second\nINSERT INTO a (id) VALUES (2);"],
+        ["INSERT INTO a (id) VALUES (1);", "-- second\nINSERT INTO a (id) VALUES (2);"],
+        id="leading-comment-not-merged",
+    ),
+    pytest.param(
+        ["INSERT INTO a (id) VALUES (1);", "INSERT INTO a (id) VALUES (2)"],
+        ["INSERT INTO a (id) VALUES (1),\n(2);"],
+        id="last-without-semicolon",
+    ),
+])
+def test_coalesce_inserts(statements, expected):
+    assert coalesce_inserts(statements) == expected
+
+
+def test_batches_keep_statements_ending_in_comments_separate():
+    statements = ["SELECT 1 -- note", "SELECT 2;", "SELECT 3;"]
+    batches = batch_statements(statements, size=2, first_number=4)
+
+    assert [(first, batch) for first, batch, _ in batches] == [(4, statements[:2]), (6, statements[2:])]
+    assert batches[0][2] == "SELECT 1 -- note\n;\nSELECT 2;"
+
+
+def test_split_copy_blocks():
+    sql = (
+        "CREATE TABLE t (a int, b text);\n"
+        "-- @copy public.t (a, \"b\")\n"
+        "1,\"x; -- not a comment\"\n"
+        "2,\"it's\"\n"
+        "\\.\n"
+        "INSERT INTO t (a, b) VALUES (3, 'z');\n"
+        "-- @copy t (a)\n"
+        "4\n"
+    )
+
+    assert split_copy_blocks(sql) == [
+        "CREATE TABLE t (a int, b text);\n",
+        CopyBlock("public.t", ["a", "b"], "1,\"x; -- not a comment\"\n2,\"it's\"\n"),
+        "\nINSERT INTO t (a, b) VALUES (3, 'z');\n",
+        CopyBlock("t", ["a"], "4\n"),
+        "",
+    ]
+
+
+def test_split_copy_blocks_without_sentinel_is_unchanged():
+    sql = "-- copy of the old table\nCREATE TABLE t (a int);\n"
+    assert split_copy_blocks(sql) == [sql]